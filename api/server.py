@@ -6,15 +6,28 @@ MoneyMore RESTful API 服务
 """
 
 import os
+import hashlib
 import json
+import math
 import socket
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, render_template, send_from_directory, redirect, url_for
+import zlib
+from datetime import datetime, timedelta, timezone
+from flask import Flask, Response, request, jsonify, render_template, send_file, send_from_directory, redirect, url_for
 from flask_cors import CORS
 from dotenv import load_dotenv
 import tushare_parquet as tsp
+from tushare_parquet import expiry
+from tushare_parquet import providers
+from tushare_parquet import search
+from tushare_parquet import wire
+import numpy as np
 import pandas as pd
 
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
 # 加载环境变量
 load_dotenv()
 
@@ -24,9 +37,31 @@ app = Flask(__name__,
             static_folder='../views')
 CORS(app)  # 允许跨域请求
 
-# 设置 tushare_parquet token
+# 设置上游数据源（TUSHARE_PARQUET_PROVIDER=replay 时离线回放，见 tushare_parquet.providers）和 token
+tsp.set_provider(providers.from_env())
 tsp.set_token(os.getenv('TUSHARE_TOKEN'))
 
+# 设置 TUSHARE_PARQUET_STALE_WHILE_REVALIDATE=true 时，缓存过期后先返回旧数据并在后台刷新，
+# 避免 TTL 到期时请求等待上游；默认关闭，过期后总是等待最新数据
+# TUSHARE_PARQUET_MAX_STALE_MINUTES 控制超过 TTL 后最多提供旧数据的时间
+tsp.set_stale_while_revalidate(
+    os.getenv('TUSHARE_PARQUET_STALE_WHILE_REVALIDATE', 'false').lower() == 'true',
+    int(os.getenv('TUSHARE_PARQUET_MAX_STALE_MINUTES', 1440))
+)
+
+# 设置 TUSHARE_PARQUET_WARM_SNAPSHOT=true 时启动时加载预热快照（python -m tushare_parquet cache snapshot 生成），
+# stock_basic、trade_cal 的首个请求直接命中内存缓存
+if os.getenv('TUSHARE_PARQUET_WARM_SNAPSHOT', 'false').lower() == 'true':
+    from tushare_parquet import warm
+    warm.load()
+
+# 后台定期按容量和闲置期限淘汰缓存（TUSHARE_PARQUET_MAX_CACHE_MB、TUSHARE_PARQUET_MAX_AGE_DAYS），
+# 默认关闭：每个工作进程都会执行这段代码，多进程部署时只在一个进程中设置，或用定时任务运行命令行
+CACHE_MAINTENANCE_MINUTES = int(os.getenv('TUSHARE_PARQUET_MAINTENANCE_MINUTES', 0))
+if CACHE_MAINTENANCE_MINUTES > 0:
+    from tushare_parquet import maintenance
+    maintenance.start_background(CACHE_MAINTENANCE_MINUTES * 60)
+
 # API 版本
 API_VERSION = 'v1'
 API_PREFIX = f'/api/{API_VERSION}'
@@ -73,39 +108,233 @@ def handle_api_error(func):
     return wrapper
 
 
-def format_response(data, message='success'):
-    """格式化 API 响应"""
-    import math
-    
-    def clean_nan_values(obj):
-        """递归清理所有NaN值"""
-        if isinstance(obj, dict):
-            return {k: clean_nan_values(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [clean_nan_values(item) for item in obj]
-        elif isinstance(obj, float) and (math.isnan(obj) or obj != obj):  # 检查NaN
-            return None
-        else:
-            return obj
-    
+# DataFrame 响应的数据形式：records 为行对象列表（默认），columns 为按列组织的数组
+RESPONSE_ORIENTS = ('records', 'columns')
+
+
+def clean_nan_values(obj):
+    """递归清理所有NaN值"""
+    if isinstance(obj, dict):
+        return {k: clean_nan_values(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [clean_nan_values(item) for item in obj]
+    elif isinstance(obj, float) and (math.isnan(obj) or obj != obj):  # 检查NaN
+        return None
+    else:
+        return obj
+
+
+# 超过该行数的 DataFrame 响应分块生成 JSON，每块 STREAM_CHUNK_ROWS 行
+STREAM_ROWS = 20000
+STREAM_CHUNK_ROWS = 5000
+
+
+def _json_default(obj):
+    """json.dumps 无法直接序列化的值：numpy 标量转为 Python 值，其他（如时间戳）转为字符串。"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return str(obj)
+
+
+def column_values(values):
+    """
+    把一列转换为可以直接 json.dumps 的 Python 列表，空值（NaN、None、NA）为 None
+
+    整数、布尔和浮点列整列转换，浮点列只对非有限值逐个替换；
+    其他类型（字符串、分类、可空整数）由 pandas 一次性转换为对象数组并填充空值。
+    """
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iub':
+        return values.to_numpy().tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        array = values.to_numpy()
+        result = array.tolist()
+        for i in np.flatnonzero(~np.isfinite(array)).tolist():
+            result[i] = None
+        return result
+    return values.to_numpy(dtype=object, na_value=None).tolist()
+
+
+def frame_payload(df, orient='records'):
+    """
+    按列转换 DataFrame，返回响应中的数据字段
+
+    返回:
+        dict: orient 为 records 时为 {'data': [{列名: 值}]}，
+              为 columns 时为 {'columns': [列名], 'data': {列名: [值]}}
+    """
+    columns = [str(col) for col in df.columns]
+    values = [column_values(df.iloc[:, i]) for i in range(len(columns))]
+    if orient == 'columns':
+        return {'columns': columns, 'data': dict(zip(columns, values))}
+    return {'data': [dict(zip(columns, row)) for row in zip(*values)]}
+
+
+def dumps(obj):
+    """序列化响应，使用紧凑的分隔符，大响应的体积和编码时间都更小。"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_json_default)
+
+
+def iter_json(head, df, orient, tail):
+    """
+    分块生成 DataFrame 响应的 JSON，内容与一次性序列化 {**head, 数据字段, **tail} 相同
+
+    records 每次转换 STREAM_CHUNK_ROWS 行，columns 每次转换一列。
+    """
+    yield dumps(head)[:-1]
+    if orient == 'columns':
+        columns = [str(col) for col in df.columns]
+        yield ',"columns":' + dumps(columns) + ',"data":{'
+        for i, column in enumerate(columns):
+            yield (',' if i else '') + dumps(column) + ':' + dumps(column_values(df.iloc[:, i]))
+        yield '}'
+    else:
+        yield ',"data":['
+        for start in range(0, len(df), STREAM_CHUNK_ROWS):
+            rows = frame_payload(df.iloc[start:start + STREAM_CHUNK_ROWS])['data']
+            yield (',' if start else '') + dumps(rows)[1:-1]
+        yield ']'
+    yield ',' + dumps(tail)[1:]
+
+
+def response_format():
+    """
+    按 format 参数或 Accept 头选择 DataFrame 响应的格式
+
+    返回:
+        str: json、arrow 或 parquet；format 参数优先，Accept 头没有偏好二进制格式时为 json
+    """
+    fmt = request.args.get('format')
+    if fmt is not None:
+        fmt = fmt.lower()
+        if fmt != 'json' and fmt not in wire.FORMATS:
+            raise ValueError(f"format 只支持: json, {', '.join(wire.FORMATS)}")
+        return fmt
+    best = request.accept_mimetypes.best_match(['application/json', *wire.MIME_TYPES])
+    return wire.MIME_TYPES.get(best, 'json')
+
+
+def binary_response(df, fmt, api_name=None, cache_params=None):
+    """
+    返回 Arrow IPC 流或 Parquet 格式的响应
+
+    Parquet 响应的列类型与 JSON 和 Arrow 响应一致；cache_params 为接口的查询参数、
+    缓存文件又不需要还原编码时，直接发送缓存文件。行数和过期标记放在响应头中。
+    """
+    headers = {'X-Row-Count': str(len(df))}
+    if df.attrs.get('stale'):
+        headers['X-Cache-Stale'] = 'true'
+        headers['X-Cache-Timestamp'] = df.attrs.get('cache_timestamp')
+    if fmt == 'parquet' and api_name is not None and cache_params is not None:
+        path = tsp.core.cached_file(api_name, **cache_params)
+        if path is not None and wire.is_plain_file(path):
+            response = send_file(path, mimetype=wire.PARQUET, etag=False, conditional=False)
+            response.headers.update(headers)
+            return response
+    body = wire.encode(df, fmt, api_name)
+    return Response(body.to_pybytes(), mimetype=wire.FORMATS[fmt], headers=headers)
+
+
+def cache_validators(api_name, params, ttl_minutes):
+    """
+    由缓存清单生成响应的校验信息，不读取数据文件
+
+    ETag 由数据文件签名、请求路径和参数以及协商的响应格式决定，
+    Last-Modified 为缓存写入时间，max_age 为距离缓存过期的秒数，
+    timestamp 为缓存写入时间的 ISO 格式，JSON 响应体中的 timestamp 使用它，
+    ETag 相同的响应内容完全相同。
+
+    返回:
+        dict: {'etag', 'last_modified', 'max_age', 'timestamp'}，缓存不存在或已经过期时返回 None
+    """
+    state = tsp.core.cache_state(api_name, ttl_minutes, **params)
+    if state is None:
+        return None
+    hasher = hashlib.md5()
+    for part in (api_name, state['signature'] or state['timestamp'].isoformat(),
+                 request.full_path, response_format()):
+        hasher.update(str(part).encode('utf-8'))
+    return {
+        'etag': hasher.hexdigest(),
+        'last_modified': state['timestamp'].astimezone(timezone.utc).replace(microsecond=0),
+        'max_age': max(0, int((state['expires_at'] - expiry.now()).total_seconds())),
+        'timestamp': state['timestamp'].isoformat()
+    }
+
+
+def apply_validators(response, validators, force_refresh=False):
+    """设置 ETag、Last-Modified 和 Cache-Control，强制刷新的响应不允许客户端缓存。"""
+    response.vary.add('Accept')
+    if force_refresh:
+        response.cache_control.no_store = True
+        return response
+    if validators is None:
+        return response
+    response.set_etag(validators['etag'])
+    response.last_modified = validators['last_modified']
+    response.cache_control.max_age = validators['max_age']
+    return response
+
+
+def not_modified(api_name, params, ttl_minutes, force_refresh=False):
+    """
+    处理 If-None-Match / If-Modified-Since 条件请求
+
+    客户端持有的数据与缓存一致时返回 304 响应，不读取 Parquet、不序列化数据；
+    否则返回 None，由接口照常生成响应。
+    """
+    if force_refresh or (not request.if_none_match and request.if_modified_since is None):
+        return None
+    validators = cache_validators(api_name, params, ttl_minutes)
+    if validators is None:
+        return None
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(validators['etag'])
+    else:
+        matched = validators['last_modified'] <= request.if_modified_since
+    if not matched:
+        return None
+    return apply_validators(Response(status=304), validators)
+
+
+def format_response(data, message='success', orient=None, api_name=None, cache_params=None,
+                    ttl_minutes=None, force_refresh=False):
+    """
+    格式化 API 响应
+
+    DataFrame 按列转换空值和类型，不逐个单元格遍历；
+    orient 为 None 时读取请求参数 orient（records 或 columns，默认 records）。
+    请求 Arrow 或 Parquet 格式时（见 response_format）返回二进制数据，
+    api_name 和 cache_params 用于找到可以直接发送的缓存文件，
+    并与 ttl_minutes 一起生成 ETag、Last-Modified 和 Cache-Control（见 cache_validators）。
+    超过 STREAM_ROWS 行的 JSON 响应分块发送，压缩由 compress_response 统一处理。
+    """
     if isinstance(data, pd.DataFrame):
-        # 将 DataFrame 转换为字典列表
-        data_dict = data.to_dict('records')
-        # 递归清理所有NaN值
-        data_dict = clean_nan_values(data_dict)
-        response_data = {
-            'success': True,
-            'message': message,
-            'data': data_dict,
-            'count': len(data_dict),
-            'timestamp': datetime.now().isoformat()
-        }
-        # 使用json.dumps确保NaN值被正确处理为null
-        return app.response_class(
-            response=json.dumps(response_data, ensure_ascii=False),
-            status=200,
-            mimetype='application/json'
-        )
+        validators = None
+        if cache_params is not None and not data.attrs.get('stale'):
+            validators = cache_validators(api_name, cache_params, ttl_minutes)
+        fmt = response_format()
+        if fmt != 'json':
+            return apply_validators(binary_response(data, fmt, api_name, cache_params), validators, force_refresh)
+        if orient is None:
+            orient = request.args.get('orient', 'records')
+        if orient not in RESPONSE_ORIENTS:
+            raise ValueError(f"orient 只支持: {', '.join(RESPONSE_ORIENTS)}")
+        head = {'success': True, 'message': message}
+        # 带 ETag 的响应使用缓存的写入时间，同一份缓存每次生成的响应体相同
+        timestamp = validators['timestamp'] if validators is not None else expiry.now().isoformat()
+        tail = {'count': len(data), 'timestamp': timestamp}
+        # 缓存过期后返回的旧数据（后台正在刷新），告知客户端数据的缓存时间
+        if data.attrs.get('stale'):
+            tail['stale'] = True
+            tail['cache_timestamp'] = data.attrs.get('cache_timestamp')
+        if len(data) > STREAM_ROWS:
+            # 大结果分块生成，不同时持有全部行对象和完整的 JSON 字符串
+            body = iter_json(head, data, orient, tail)
+        else:
+            body = dumps({**head, **frame_payload(data, orient), **tail})
+        response = app.response_class(response=body, status=200, mimetype='application/json')
+        return apply_validators(response, validators, force_refresh)
     else:
         # 清理非DataFrame数据中的NaN值
         cleaned_data = clean_nan_values(data)
@@ -113,7 +342,7 @@ def format_response(data, message='success'):
             'success': True,
             'message': message,
             'data': cleaned_data,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': expiry.now().isoformat()
         }
         return app.response_class(
             response=json.dumps(response_data, ensure_ascii=False),
@@ -122,6 +351,73 @@ def format_response(data, message='success'):
         )
 
 
+# 压缩的响应类型，Parquet 自身已经压缩，不再处理
+COMPRESS_MIMETYPES = ('application/json', wire.ARROW_STREAM)
+# 小于该字节数的响应不压缩
+COMPRESS_MIN_BYTES = 1024
+# 动态内容使用较低的压缩级别，压缩率与 CPU 开销比较均衡
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+def accepted_encoding():
+    """按 Accept-Encoding 选择压缩算法：br（已安装 brotli 时）或 gzip，都不接受时返回 None。"""
+    encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(encodings)
+
+
+def _compressor(encoding):
+    """返回 (压缩一块数据, 结束并输出剩余数据) 两个函数。"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def compress_chunks(chunks, encoding):
+    """逐块压缩流式响应，每个输入块压缩后立即发送。"""
+    compress, finish = _compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+@app.after_request
+def compress_response(response):
+    """
+    按 Accept-Encoding 压缩 JSON 和 Arrow 响应
+
+    流式响应逐块压缩；压缩后的 ETag 改为弱校验值，条件请求按弱比较仍然可以命中。
+    """
+    if response.mimetype not in COMPRESS_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_chunks(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_BYTES:
+            return response
+        compress, finish = _compressor(encoding)
+        response.set_data(compress(body) + finish())
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 @app.route('/')
 def index():
     """首页 - 显示长江电力K线图"""
@@ -170,7 +466,7 @@ def get_stock_data():
         end_date (str, 可选): 结束日期，格式 YYYYMMDD
         adj (str, 可选): 复权类型，qfq-前复权 hfq-后复权 None-不复权，默认None
         freq (str, 可选): 数据频度，支持D/W/M，默认D
-        ttl_minutes (int, 可选): 缓存时间（分钟），默认1440（24小时）
+        ttl_minutes (int, 可选): 缓存时间（分钟），默认按交易日历过期（抓取后的下一次收盘）
     """
     ts_code = request.args.get('ts_code')
     if not ts_code:
@@ -192,9 +488,14 @@ def get_stock_data():
     # 移除空值参数
     params = {k: v for k, v in params.items() if v is not None}
     
-    ttl_minutes = int(request.args.get('ttl_minutes', 1440))
+    ttl_minutes = request.args.get('ttl_minutes', type=int)
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('pro_bar', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.pro_bar(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -206,7 +507,8 @@ def get_stock_data():
             'count': 0
         })
     
-    return format_response(df, '股票行情数据获取成功')
+    return format_response(df, '股票行情数据获取成功', api_name='pro_bar', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/dividend')
@@ -238,6 +540,11 @@ def get_dividend():
     ttl_minutes = int(request.args.get('ttl_minutes', 1440))
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('dividend', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.dividend(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -249,7 +556,8 @@ def get_dividend():
             'count': 0
         })
     
-    return format_response(df, '分红数据获取成功')
+    return format_response(df, '分红数据获取成功', api_name='dividend', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/income')
@@ -285,6 +593,11 @@ def get_income():
     ttl_minutes = int(request.args.get('ttl_minutes', 43200))
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('income', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.income(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -296,7 +609,8 @@ def get_income():
             'count': 0
         })
     
-    return format_response(df, '利润表数据获取成功')
+    return format_response(df, '利润表数据获取成功', api_name='income', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/stock_basic')
@@ -326,6 +640,11 @@ def get_stock_basic():
     ttl_minutes = int(request.args.get('ttl_minutes', 43200))
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('stock_basic', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.stock_basic(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -337,7 +656,8 @@ def get_stock_basic():
             'count': 0
         })
     
-    return format_response(df, '股票基础信息获取成功')
+    return format_response(df, '股票基础信息获取成功', api_name='stock_basic', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/trade_cal')
@@ -367,6 +687,11 @@ def get_trade_cal():
     ttl_minutes = int(request.args.get('ttl_minutes', 43200))
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('trade_cal', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.trade_cal(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -378,7 +703,8 @@ def get_trade_cal():
             'count': 0
         })
     
-    return format_response(df, '交易日历数据获取成功')
+    return format_response(df, '交易日历数据获取成功', api_name='trade_cal', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/fina_indicator')
@@ -418,6 +744,11 @@ def get_fina_indicator():
     ttl_minutes = int(request.args.get('ttl_minutes', 43200))
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('fina_indicator', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.fina_indicator(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -429,7 +760,8 @@ def get_fina_indicator():
             'count': 0
         })
     
-    return format_response(df, '财务指标数据获取成功')
+    return format_response(df, '财务指标数据获取成功', api_name='fina_indicator', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/disclosure_date')
@@ -459,6 +791,11 @@ def get_disclosure_date():
     ttl_minutes = int(request.args.get('ttl_minutes', 43200))
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     
+    # 客户端持有的数据仍然最新时直接返回 304
+    cached = not_modified('disclosure_date', params, ttl_minutes, force_refresh)
+    if cached is not None:
+        return cached
+
     # 调用 tushare_parquet 接口
     df = tsp.disclosure_date(ttl_minutes=ttl_minutes, force_refresh=force_refresh, **params)
     
@@ -470,7 +807,8 @@ def get_disclosure_date():
             'count': 0
         })
     
-    return format_response(df, '财报披露计划数据获取成功')
+    return format_response(df, '财报披露计划数据获取成功', api_name='disclosure_date', cache_params=params,
+                           ttl_minutes=ttl_minutes, force_refresh=force_refresh)
 
 
 @app.route(f'{API_PREFIX}/earnings')
@@ -497,7 +835,8 @@ def get_earnings():
     
     try:
         # 获取财报披露计划数据
-        disclosure_data = tsp.disclosure_date(ts_code=ts_code, ttl_minutes=ttl_minutes, force_refresh=force_refresh)
+        disclosure_data = tsp.disclosure_date(ts_code=ts_code, ttl_minutes=ttl_minutes, force_refresh=force_refresh,
+                                              columns=['ts_code', 'end_date', 'pre_date', 'actual_date'])
         
         if disclosure_data is None or disclosure_data.empty:
             return jsonify({
@@ -519,7 +858,8 @@ def get_earnings():
             })
         
         # 获取交易日历数据
-        trade_cal = tsp.trade_cal(ttl_minutes=ttl_minutes, force_refresh=force_refresh)
+        trade_cal = tsp.trade_cal(ttl_minutes=ttl_minutes, force_refresh=force_refresh,
+                                  columns=['cal_date', 'is_open'])
         trading_days = set(trade_cal[trade_cal['is_open'] == 1]['cal_date'].astype(str))
         
         # 处理财报数据，调整到最近的交易日
@@ -551,7 +891,7 @@ def get_earnings():
             'message': '财报数据获取成功',
             'data': earnings_data,
             'count': len(earnings_data),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': expiry.now().isoformat()
         })
         
     except Exception as e:
@@ -679,80 +1019,28 @@ def search_stocks():
     query = request.args.get('q', '').strip()
     limit = int(request.args.get('limit', 20))
     
-    # 获取股票基础信息
     force_refresh = request.args.get('force_refresh', 'false').lower() == 'true'
     try:
-        df = tsp.stock_basic(ttl_minutes=1440, force_refresh=force_refresh)  # 缓存1天
+        # 使用由股票基础信息构建的搜索索引（缓存1天，刷新后自动重建），不逐行遍历
+        index = search.get_index(ttl_minutes=1440, force_refresh=force_refresh)
         
-        if df is None or df.empty:
+        if index is None or len(index) == 0:
             return jsonify({
                 'success': False,
                 'message': '无法获取股票基础信息',
                 'data': []
             })
         
-        # 如果没有查询条件，返回前N个活跃股票
+        # 按精确代码、前缀、子串的顺序返回上市股票；没有查询条件时返回前N个
+        matched_stocks = index.search(query, limit)
         if not query:
-            # 过滤掉退市股票（如果有list_status字段的话）
-            if 'list_status' in df.columns:
-                active_stocks = df[df['list_status'] == 'L'].head(limit)
-            else:
-                # 如果没有list_status字段，直接取前N个
-                active_stocks = df.head(limit)
-            
-            result = []
-            for _, row in active_stocks.iterrows():
-                result.append({
-                    'code': row['ts_code'],
-                    'name': row['name'],
-                    'industry': row.get('industry', ''),
-                    'area': row.get('area', ''),
-                    'market': row.get('market', ''),
-                    'list_date': row.get('list_date', ''),
-                    'cnspell': row.get('cnspell', '')  # 返回拼音缩写信息
-                })
             return jsonify({
                 'success': True,
                 'message': '获取股票列表成功',
-                'data': result,
-                'count': len(result)
+                'data': matched_stocks,
+                'count': len(matched_stocks)
             })
         
-        # 进行搜索匹配
-        query_lower = query.lower()
-        matched_stocks = []
-        
-        for _, row in df.iterrows():
-            # 跳过退市股票（如果有list_status字段的话）
-            if 'list_status' in df.columns and row.get('list_status') != 'L':
-                continue
-                
-            ts_code = str(row['ts_code']).lower()
-            name = str(row['name']).lower()
-            cnspell = str(row.get('cnspell', '')).lower()  # 获取拼音缩写
-            
-            # 匹配股票代码、名称或拼音缩写
-            if (query_lower in ts_code or 
-                query_lower in name or
-                query_lower in cnspell or  # 支持拼音缩写搜索
-                query in str(row['ts_code']) or
-                query in str(row['name']) or
-                query in str(row.get('cnspell', ''))):
-                
-                matched_stocks.append({
-                    'code': row['ts_code'],
-                    'name': row['name'],
-                    'industry': row.get('industry', ''),
-                    'area': row.get('area', ''),
-                    'market': row.get('market', ''),
-                    'list_date': row.get('list_date', ''),
-                    'cnspell': row.get('cnspell', '')  # 返回拼音缩写信息
-                })
-                
-                # 限制返回数量
-                if len(matched_stocks) >= limit:
-                    break
-        
         return jsonify({
             'success': True,
             'message': f'找到 {len(matched_stocks)} 个匹配结果',
@@ -788,6 +1076,18 @@ def method_not_allowed(error):
     }), 405
 
 
+@app.route(f'{API_PREFIX}/metrics')
+def get_metrics():
+    """
+    缓存运行指标（Prometheus 文本格式）
+
+    按接口统计缓存命中、上游调用、字节数以及 lookup/read/fetch/write 各环节的耗时，
+    指标按进程统计，多进程部署时需要分别抓取。
+    """
+    from tushare_parquet import metrics
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route(f'{API_PREFIX}/cache_info')
 @handle_api_error
 def get_cache_info():
@@ -816,21 +1116,23 @@ def get_cache_info():
             # 移除空值参数
             params = {k: v for k, v in params.items() if v is not None}
             
-            cache_key = tsp.core._generate_cache_key('pro_bar', **params)
             cache_type = f'股票数据 ({ts_code})'
+            if tsp.bar_store.is_storable(params):
+                # 日/周/月线使用区间合并存储，与请求的时间窗口和复权类型无关
+                cache_key = tsp.core._get_bar_store_key(ts_code, params.get('freq'))
+            else:
+                cache_key = tsp.core._generate_cache_key('pro_bar', **params)
         else:
             # 查询 stock_basic 的缓存信息
             cache_key = tsp.core._generate_cache_key('stock_basic')
             cache_type = '股票基础信息'
         
-        metadata_file_path = tsp.core._get_metadata_file_path(cache_key)
+        # 从缓存清单中查询，一次主键查询即可
+        metadata = tsp.core._read_metadata(cache_key)
         
-        if os.path.exists(metadata_file_path):
-            with open(metadata_file_path, 'r') as f:
-                metadata = json.load(f)
-            
+        if metadata is not None:
             # 解析时间戳
-            cache_time = datetime.fromisoformat(metadata['timestamp'])
+            cache_time = expiry.parse(metadata['timestamp'])
             
             return jsonify({
                 'success': True,
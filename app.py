@@ -14,8 +14,8 @@ load_dotenv()
 
 def main():
     """主程序入口"""
-    # 检查环境变量
-    if not os.getenv('TUSHARE_TOKEN'):
+    # 检查环境变量，离线回放数据源不需要 token
+    if not os.getenv('TUSHARE_TOKEN') and os.getenv('TUSHARE_PARQUET_PROVIDER', 'tushare').lower() != 'replay':
         print("错误: 请设置 TUSHARE_TOKEN 环境变量")
         print("请在 .env 文件中添加: TUSHARE_TOKEN=your_token_here")
         sys.exit(1)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tushare_parquet 与 API 服务的基准测试
+
+全部使用 ReplayProvider 的合成数据，在临时缓存目录中运行，不访问网络：
+    - cache.*: _fetch_and_cache 的冷读（清空内存缓存，从 Parquet 解码）、
+      热读（命中内存缓存）和未命中（调用上游并写入缓存），数据规模为 1k/10k/100k 行；
+    - serialize.*: format_response 把 DataFrame 序列化为 JSON（行格式和按列格式）；
+    - endpoint.*: 通过 Flask test client 请求主要接口（缓存已预热）；
+    - startup.*: 在新的解释器进程中导入 API 服务并完成第一个 stock_basic 请求（磁盘缓存已存在），
+      分别在不加载和加载预热快照时测量，包含解释器启动时间。
+每项记录多次运行的中位数、p95、最小值和平均值（秒），结果写成 JSON，便于跨提交对比。
+
+用法:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --quick --filter cache
+    python benchmarks/run.py --compare baseline.json results.json --threshold 1.1
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIZES = (1_000, 10_000, 100_000)
+QUICK_SIZES = (1_000, 10_000)
+DEFAULT_REPEAT = 20
+QUICK_REPEAT = 5
+# 冷启动每次都要启动新的解释器，重复次数更少
+STARTUP_REPEAT = 5
+QUICK_STARTUP_REPEAT = 3
+
+ENDPOINTS = {
+    'stock_basic': '/api/v1/stock_basic',
+    'stock_data': '/api/v1/stock_data?ts_code=000001.SZ&start_date=20200101&end_date=20231231',
+    'stock_data_qfq': '/api/v1/stock_data?ts_code=000001.SZ&start_date=20200101&end_date=20231231&adj=qfq',
+    'trade_cal': '/api/v1/trade_cal?start_date=20200101&end_date=20241231',
+    'fina_indicator': '/api/v1/fina_indicator?ts_code=000001.SZ',
+    'search_stocks': '/api/v1/search_stocks?q=6001&limit=20',
+    'search_stocks_empty': '/api/v1/search_stocks?q=zzzz&limit=20',
+}
+
+
+def _setup_environment(cache_dir):
+    """在导入 tushare_parquet 之前配置离线数据源和独立的缓存目录。"""
+    os.environ['TUSHARE_PARQUET_CACHE_DIR'] = cache_dir
+    os.environ['TUSHARE_PARQUET_PROVIDER'] = 'replay'
+    os.environ['TUSHARE_PARQUET_REPLAY_LATENCY_MS'] = '0'
+    os.environ['TUSHARE_PARQUET_MAINTENANCE_MINUTES'] = '0'
+    os.environ['TUSHARE_PARQUET_WARM_SNAPSHOT'] = 'false'
+    os.environ.pop('TUSHARE_PARQUET_REPLAY_CALLS_PER_MINUTE', None)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def measure(fn, repeat, setup=None):
+    """运行 fn repeat 次（之前先运行一次预热），返回耗时统计（秒）。"""
+    if setup is not None:
+        setup()
+    fn()
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        'repeat': repeat,
+        'median': statistics.median(times),
+        'p95': times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        'min': times[0],
+        'mean': statistics.fmean(times),
+    }
+
+
+def _bars_frame(rows):
+    """合成 rows 行日线：多只股票、每只约 1000 个交易日。"""
+    import pandas as pd
+    from tushare_parquet import synthetic
+
+    codes = synthetic.stock_codes(max(1, -(-rows // 1000)))
+    frames = [synthetic.generate('daily', ts_code=code, start_date='20200101', end_date='20231231')
+              for code in codes]
+    return pd.concat(frames, ignore_index=True).head(rows)
+
+
+def bench_cache(sizes, repeat):
+    """_fetch_and_cache 的冷读、热读和未命中。"""
+    from tushare_parquet import core, memory_cache
+
+    core.set_rate_limit('daily', 10 ** 9)
+    results = {}
+    for rows in sizes:
+        frame = _bars_frame(rows)
+
+        def fetch(**kwargs):
+            return frame
+
+        def call(force_refresh=False):
+            return core._fetch_and_cache('daily', fetch, 1440, force_refresh=force_refresh, bench_rows=rows)
+
+        results[f'cache.miss.{rows}'] = measure(lambda: call(force_refresh=True), repeat)
+        results[f'cache.cold.{rows}'] = measure(call, repeat, setup=memory_cache.clear)
+        results[f'cache.warm.{rows}'] = measure(call, repeat)
+        results[f'cache.cold_projected.{rows}'] = measure(
+            lambda: core._fetch_and_cache('daily', fetch, 1440, columns=['ts_code', 'trade_date', 'close'],
+                                          filters=[('trade_date', '>=', '20230101')], bench_rows=rows),
+            repeat, setup=memory_cache.clear)
+    return results
+
+
+def bench_serialize(sizes, repeat):
+    """format_response 的 DataFrame 到 JSON 序列化。"""
+    from api.server import app, format_response
+
+    results = {}
+    for rows in sizes:
+        frame = _bars_frame(rows)
+        frame.loc[frame.index[::7], 'change'] = float('nan')
+
+        for orient in ('records', 'columns'):
+            def run():
+                with app.test_request_context():
+                    format_response(frame, orient=orient)
+
+            name = 'format_response' if orient == 'records' else f'format_response_{orient}'
+            results[f'serialize.{name}.{rows}'] = measure(run, repeat)
+    return results
+
+
+def bench_endpoints(repeat):
+    """主要 API 接口的热缓存请求。"""
+    from api.server import app
+
+    client = app.test_client()
+    results = {}
+    for name, url in ENDPOINTS.items():
+        def run():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} 返回 {response.status_code}")
+
+        results[f'endpoint.{name}'] = measure(run, repeat)
+    return results
+
+
+# 冷启动子进程执行的代码：导入 API 服务，只有给出接口路径时才发出第一个请求
+STARTUP_SCRIPT = '''
+import sys
+from api.server import app
+if len(sys.argv) > 1 and app.test_client().get(sys.argv[1]).status_code != 200:
+    sys.exit(1)
+'''
+
+
+def bench_startup(repeat):
+    """新进程导入 API 服务和完成第一个请求的耗时，对比是否加载预热快照。"""
+    from api.server import app
+    from tushare_parquet import core, warm
+
+    # 先在磁盘上准备好缓存和快照，子进程与当前进程共用缓存目录
+    app.test_client().get(ENDPOINTS['stock_basic'])
+    warm.save()
+    core._manifest.flush()
+
+    def run(snapshot, *args):
+        env = dict(os.environ, TUSHARE_PARQUET_WARM_SNAPSHOT='true' if snapshot else 'false')
+        subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, *args], cwd=ROOT, env=env, check=True)
+
+    return {
+        'startup.import_server': measure(lambda: run(False), repeat),
+        'startup.first_request': measure(lambda: run(False, ENDPOINTS['stock_basic']), repeat),
+        'startup.first_request_snapshot': measure(lambda: run(True, ENDPOINTS['stock_basic']), repeat),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment():
+    import numpy
+    import pandas
+    import pyarrow
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'pyarrow': pyarrow.__version__,
+    }
+
+
+def run(quick=False, name_filter=None):
+    """运行全部基准测试，返回结果字典。"""
+    sizes = QUICK_SIZES if quick else SIZES
+    repeat = QUICK_REPEAT if quick else DEFAULT_REPEAT
+    groups = {
+        'cache': lambda: bench_cache(sizes, repeat),
+        'serialize': lambda: bench_serialize(sizes, repeat),
+        'endpoint': lambda: bench_endpoints(repeat),
+        'startup': lambda: bench_startup(QUICK_STARTUP_REPEAT if quick else STARTUP_REPEAT),
+    }
+    results = {}
+    for group, bench in groups.items():
+        if name_filter and group != name_filter:
+            continue
+        for name, stats in bench().items():
+            results[name] = stats
+            print(f"{name:<40} median {stats['median'] * 1000:9.3f}ms  p95 {stats['p95'] * 1000:9.3f}ms",
+                  flush=True)
+    return {'environment': _environment(), 'quick': quick, 'results': results}
+
+
+def compare(baseline_path, current_path, threshold):
+    """对比两次结果的中位数，返回变慢超过 threshold 倍的基准项。"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)['results']
+
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name]['median'], current[name]['median']
+        ratio = after / before if before else float('inf')
+        flag = ' 变慢' if ratio > threshold else (' 变快' if ratio < 1 / threshold else '')
+        print(f"{name:<40} {before * 1000:10.3f}ms {after * 1000:10.3f}ms {ratio:8.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<40} 只存在于{'基准' if name in baseline else '当前'}结果中")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='tushare_parquet 基准测试（离线合成数据）')
+    parser.add_argument('--output', help='结果 JSON 的输出路径')
+    parser.add_argument('--quick', action='store_true', help='减少重复次数并跳过 100k 行规模')
+    parser.add_argument('--filter', help='只运行一组：cache、serialize、endpoint 或 startup')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='对比两次结果')
+    parser.add_argument('--threshold', type=float, default=1.1, help='中位数变慢超过该倍数视为退化，默认 1.1')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        return 1 if regressions else 0
+
+    with tempfile.TemporaryDirectory(prefix='tushare_parquet_bench_') as cache_dir:
+        _setup_environment(cache_dir)
+        result = run(quick=args.quick, name_filter=args.filter)
+        # 退出前写入访问记录，避免临时目录删除后再落盘
+        from tushare_parquet import core
+        core._manifest.flush()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
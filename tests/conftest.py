@@ -0,0 +1,57 @@
+"""
+测试共用的夹具
+
+全部使用 ReplayProvider 的合成数据，不访问网络；
+每个测试使用独立的临时缓存目录和缓存清单，进程内的内存缓存和交易日历在前后清空。
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 在导入 tushare_parquet 和 API 服务之前配置，避免写入正式缓存、启动后台维护线程
+os.environ['TUSHARE_PARQUET_CACHE_DIR'] = tempfile.mkdtemp(prefix='tushare_parquet_test_')
+os.environ['TUSHARE_PARQUET_PROVIDER'] = 'replay'
+os.environ['TUSHARE_PARQUET_MAINTENANCE_MINUTES'] = '0'
+os.environ['TUSHARE_PARQUET_WARM_SNAPSHOT'] = 'false'
+os.environ.pop('TUSHARE_PARQUET_REPLAY_CALLS_PER_MINUTE', None)
+
+import pytest
+
+from tushare_parquet import core
+from tushare_parquet import expiry
+from tushare_parquet import manifest
+from tushare_parquet import memory_cache
+from tushare_parquet import providers
+from tushare_parquet import scheduler
+
+
+@pytest.fixture(autouse=True)
+def unthrottled(monkeypatch):
+    """每个测试使用新的调度器，不按 Tushare 的每分钟配额等待。"""
+    monkeypatch.setattr(scheduler, '_scheduler', scheduler.Scheduler(default_limit=10 ** 6, limits={}))
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    """切换到独立的缓存目录和回放数据源，返回数据源以便检查上游调用次数。"""
+    cache_dir = str(tmp_path)
+    monkeypatch.setattr(core, '_cache_dir', cache_dir)
+    monkeypatch.setattr(core, '_metadata_dir', os.path.join(cache_dir, 'metadata'))
+    monkeypatch.setattr(core, '_bar_dir', os.path.join(cache_dir, 'bars'))
+    monkeypatch.setattr(core, '_lock_dir', os.path.join(cache_dir, 'locks'))
+    monkeypatch.setattr(core, '_manifest', manifest.Manifest(os.path.join(cache_dir, 'manifest.db')))
+    monkeypatch.setattr(core, '_legacy_metadata_imported', True)
+    monkeypatch.setattr(core, '_stale_while_revalidate', False)
+    replay = providers.ReplayProvider()
+    monkeypatch.setattr(core, '_provider', replay)
+    monkeypatch.setattr(core, '_pro', None)
+    memory_cache.clear()
+    expiry.clear()
+    yield replay
+    memory_cache.clear()
+    expiry.clear()
@@ -0,0 +1,41 @@
+import pandas.testing as tm
+import pytest
+
+import tushare_parquet as tp
+from tushare_parquet import core
+
+ts = pytest.importorskip('tushare')
+
+WINDOW = {'start_date': '20210104', 'end_date': '20211231'}
+
+
+def _expected(provider, adj, **window):
+    """用 tushare.pro_bar 在同一个回放客户端上计算的结果。"""
+    df = ts.pro_bar(api=provider.pro_api(), ts_code='000001.SZ', adj=adj, **window)
+    return df.reset_index(drop=True)
+
+
+@pytest.mark.parametrize('adj', [None, 'qfq', 'hfq'])
+def test_derive_matches_pro_bar(provider, adj):
+    result = tp.pro_bar(ts_code='000001.SZ', adj=adj, **WINDOW)
+    expected = _expected(provider, adj, **WINDOW)
+    tm.assert_frame_equal(result, expected[result.columns.tolist()], check_dtype=False)
+
+
+@pytest.mark.parametrize('adj', ['qfq', 'hfq'])
+def test_derive_matches_pro_bar_inside_a_wider_store(provider, adj):
+    # 存储覆盖更宽的区间时，前复权仍以请求窗口内最新的复权因子为基准
+    tp.pro_bar(ts_code='000001.SZ', start_date='20200101', end_date='20221231')
+    result = tp.pro_bar(ts_code='000001.SZ', adj=adj, **WINDOW)
+    expected = _expected(provider, adj, **WINDOW)
+    tm.assert_frame_equal(result, expected[result.columns.tolist()], check_dtype=False)
+
+
+def test_unadjusted_pre_close_uses_the_previous_stored_bar(provider):
+    tp.pro_bar(ts_code='000001.SZ', start_date='20201201', end_date='20211231')
+    result = tp.pro_bar(ts_code='000001.SZ', **WINDOW)
+    expected = _expected(provider, None, **WINDOW)
+    # 窗口最早一行的 pre_close 取存储中更早一根 K 线，tushare 在这里为空
+    tm.assert_frame_equal(result.iloc[:-1], expected[result.columns.tolist()].iloc[:-1], check_dtype=False)
+    bars = core._provider.pro_api().daily(ts_code='000001.SZ', start_date='20201201', end_date='20210104')
+    assert result['pre_close'].iloc[-1] == bars['close'].iloc[1]
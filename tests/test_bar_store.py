@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pandas.testing as tm
+
+import tushare_parquet as tp
+from tushare_parquet import bar_store
+from tushare_parquet import core
+from tushare_parquet import expiry
+
+
+def test_merge_ranges_joins_overlapping_and_adjacent():
+    ranges = [['20240110', '20240120'], ['20240101', '20240105'], ['20240106', '20240108'],
+              ['20240115', '20240125'], ['20240201', '20240210']]
+    assert bar_store.merge_ranges(ranges) == [['20240101', '20240108'], ['20240110', '20240125'],
+                                              ['20240201', '20240210']]
+
+
+def test_missing_ranges():
+    coverage = [['20240105', '20240110'], ['20240120', '20240125']]
+    assert bar_store.missing_ranges(coverage, '20240101', '20240131') == [
+        ['20240101', '20240104'], ['20240111', '20240119'], ['20240126', '20240131']]
+    assert bar_store.missing_ranges(coverage, '20240106', '20240109') == []
+    assert bar_store.missing_ranges([], '20240101', '20240102') == [['20240101', '20240102']]
+
+
+def test_effective_coverage_clips_expired_tail():
+    fetched_at = datetime(2024, 3, 5, 10, 0, tzinfo=expiry.TIMEZONE)
+    metadata = {'coverage': [['20240101', '20240305']], 'end_fetched_at': fetched_at.isoformat()}
+    fresh = bar_store.effective_coverage(metadata, 60, now=fetched_at + timedelta(minutes=30))
+    assert fresh == [['20240101', '20240305']]
+    expired = bar_store.effective_coverage(metadata, 60, now=fetched_at + timedelta(minutes=61))
+    assert expired == [['20240101', '20240304']]
+
+
+def test_merge_keeps_the_row_with_more_fields():
+    existing = pd.DataFrame({'trade_date': ['20240103', '20240102'], 'close': [10.0, None],
+                             'vol': [100.0, None], 'adj_factor': [1.0, 1.0]})
+    piece = pd.DataFrame({'trade_date': ['20240102', '20240101'], 'close': [9.0, 8.0],
+                          'vol': [90.0, 80.0], 'adj_factor': [None, 0.5]})
+    merged = bar_store.merge(existing, piece)
+    assert merged['trade_date'].tolist() == ['20240103', '20240102', '20240101']
+    assert merged['close'].tolist() == [10.0, 9.0, 8.0]
+    # 缺失的复权因子沿用更早一根 K 线的因子
+    assert merged['adj_factor'].tolist() == [1.0, 0.5, 0.5]
+
+
+def test_pro_bar_fetches_only_the_missing_range(provider):
+    first = tp.pro_bar(ts_code='000001.SZ', start_date='20230101', end_date='20230630')
+    assert provider.calls['daily'] == 1
+    wider = tp.pro_bar(ts_code='000001.SZ', start_date='20230101', end_date='20231231')
+    assert provider.calls['daily'] == 2
+    assert set(first['trade_date']) < set(wider['trade_date'])
+
+    # 窗口已经覆盖时不再访问上游，不同复权类型共用同一份存储
+    tp.pro_bar(ts_code='000001.SZ', start_date='20230301', end_date='20231031', adj='qfq')
+    assert provider.calls['daily'] == 2
+
+    metadata = core._read_metadata(core._get_bar_store_key('000001.SZ'))
+    assert metadata['coverage'] == [['20230101', '20231231']]
+
+
+def test_merged_store_matches_a_single_fetch(provider, tmp_path, monkeypatch):
+    tp.pro_bar(ts_code='600000.SH', start_date='20220701', end_date='20221231')
+    tp.pro_bar(ts_code='600000.SH', start_date='20220101', end_date='20220630')
+    merged = tp.pro_bar(ts_code='600000.SH', start_date='20220101', end_date='20221231', adj='hfq')
+
+    monkeypatch.setattr(core, '_bar_dir', str(tmp_path / 'other_bars'))
+    single = tp.pro_bar(ts_code='600000.SH', start_date='20220101', end_date='20221231', adj='hfq')
+    tm.assert_frame_equal(merged, single, check_dtype=False)
+
+
+def test_capped_fetch_pages_back_to_the_start(provider):
+    # 合成数据从 2000 年开始，日线单次最多返回 6000 行
+    df = tp.pro_bar(ts_code='000001.SZ', end_date='20241231')
+    assert df['trade_date'].min() == '20000103'
+    assert provider.calls['daily'] == 2
+    assert df['trade_date'].is_unique
+
+    # 已经记为覆盖的早期窗口不再访问上游，而且数据完整
+    early = tp.pro_bar(ts_code='000001.SZ', start_date='19991110', end_date='20050101')
+    assert provider.calls['daily'] == 2
+    assert early['trade_date'].min() == '20000103'
+    assert early['trade_date'].max() == '20041231'
+
+
+def test_fetch_pages_stops_at_an_empty_page():
+    pages = {('20000101', '20001231'): pd.DataFrame({'trade_date': ['20001231', '20001230']})}
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return pages.get((start, end), pd.DataFrame({'trade_date': []}))
+
+    result = bar_store.fetch_pages(fetch, '20000101', '20001231', row_limit=2)
+    assert calls == [('20000101', '20001231'), ('20000101', '20001229')]
+    assert [page['trade_date'].tolist() for page in result] == [['20001231', '20001230']]
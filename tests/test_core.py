@@ -0,0 +1,56 @@
+import pytest
+
+import tushare_parquet as tp
+from tushare_parquet import core
+from tushare_parquet import providers
+
+
+def test_cache_hit_reads_the_manifest_once(provider, monkeypatch):
+    tp.stock_basic(list_status='L')
+    lookups = []
+    get = core._manifest.get
+    monkeypatch.setattr(core._manifest, 'get', lambda key: lookups.append(key) or get(key))
+    df = tp.stock_basic(list_status='L')
+    assert len(df) > 0
+    assert len(lookups) == 1
+    assert provider.calls['stock_basic'] == 1
+
+
+def test_force_refresh_calls_upstream(provider):
+    tp.trade_cal(exchange='SSE', start_date='20240101', end_date='20241231')
+    tp.trade_cal(exchange='SSE', start_date='20240101', end_date='20241231', force_refresh=True)
+    assert provider.calls['trade_cal'] == 2
+
+
+def test_pro_bar_cache_hit_does_not_build_the_client(provider, monkeypatch):
+    # 带 ma 参数的请求不走区间合并存储，按完整参数缓存
+    tp.pro_bar(ts_code='000001.SZ', start_date='20240101', end_date='20240630', ma=[5])
+    monkeypatch.setattr(core, '_provider', providers.TushareProvider())
+    monkeypatch.setattr(core, '_token', None)
+
+    def fail():
+        raise AssertionError('命中缓存时不应创建客户端')
+
+    monkeypatch.setattr(core, '_get_scheduled_api', fail)
+    df = tp.pro_bar(ts_code='000001.SZ', start_date='20240101', end_date='20240630', ma=[5])
+    assert len(df) > 0
+
+
+def test_cached_file_never_serves_storable_pro_bar(provider):
+    params = {'ts_code': '000001.SZ', 'start_date': '20240101', 'end_date': '20240630'}
+    # 旧版本按完整参数缓存的 pro_bar 条目
+    key = core._generate_cache_key('pro_bar', **params)
+    core._write_cache(key, tp.pro_bar(**params), {'api_name': 'pro_bar', 'params': params})
+    assert core.cached_file('pro_bar', **params) is None
+    assert core.cached_file('pro_bar', ma=[5], **params) is None
+    tp.pro_bar(ma=[5], **params)
+    assert core.cached_file('pro_bar', ma=[5], **params) is not None
+
+
+@pytest.mark.parametrize('columns, filters', [(['ts_code', 'name'], None),
+                                              (None, [('ts_code', '>=', '600000')])])
+def test_columns_and_filters_match_on_miss_and_hit(provider, columns, filters):
+    miss = tp.stock_basic(list_status='L', columns=columns, filters=filters)
+    hit = tp.stock_basic(list_status='L', columns=columns, filters=filters)
+    assert miss.columns.tolist() == hit.columns.tolist()
+    assert miss['ts_code'].tolist() == hit['ts_code'].tolist()
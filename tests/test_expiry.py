@@ -0,0 +1,94 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+
+from tushare_parquet import bar_store
+from tushare_parquet import expiry
+
+# 2024 年国庆节：10 月 1 日至 7 日休市
+HOLIDAYS = {f'202410{day:02d}' for day in range(1, 8)}
+
+
+def _at(*args):
+    """北京时间"""
+    return datetime(*args, tzinfo=expiry.TIMEZONE)
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    dates = set()
+    day = date(2024, 1, 1)
+    while day.year == 2024:
+        if day.weekday() < 5 and day.strftime('%Y%m%d') not in HOLIDAYS:
+            dates.add(day.strftime('%Y%m%d'))
+        day += timedelta(days=1)
+    monkeypatch.setattr(expiry, '_calendars', {2024: (dates, None)})
+    monkeypatch.setattr(expiry, 'CLOSE_TIME', time(15, 0))
+
+
+def test_fetch_before_the_close_expires_at_the_close(calendar):
+    assert expiry.expires_at(_at(2024, 9, 24, 14, 59), None) == _at(2024, 9, 24, 15, 0)
+
+
+def test_fetch_at_the_close_expires_at_the_next_session(calendar):
+    assert expiry.expires_at(_at(2024, 9, 24, 15, 0), None) == _at(2024, 9, 25, 15, 0)
+
+
+def test_weekends_and_holidays_are_skipped(calendar):
+    # 周五收盘后抓取，下一次收盘在下周一
+    assert expiry.expires_at(_at(2024, 9, 20, 16, 0), None) == _at(2024, 9, 23, 15, 0)
+    # 节前最后一个交易日收盘后抓取，假期结束后的第一个交易日收盘才过期
+    assert expiry.expires_at(_at(2024, 9, 30, 16, 0), None) == _at(2024, 10, 8, 15, 0)
+
+
+def test_close_is_in_beijing_time_on_any_host(calendar):
+    # 部署在 UTC 的机器上：北京时间 15:00 是 UTC 07:00
+    assert expiry.expires_at(datetime(2024, 9, 24, 6, 59, tzinfo=timezone.utc), None) == _at(2024, 9, 24, 15, 0)
+    assert expiry.expires_at(datetime(2024, 9, 24, 7, 0, tzinfo=timezone.utc), None) == _at(2024, 9, 25, 15, 0)
+    assert expiry.parse('2024-09-24T07:00:00+00:00') == _at(2024, 9, 24, 15, 0)
+    assert expiry.now().utcoffset() == timedelta(hours=8)
+
+
+def test_fixed_ttl(calendar):
+    assert expiry.expires_at(_at(2024, 9, 20, 16, 0), 30) == _at(2024, 9, 20, 16, 30)
+
+
+def test_last_close(calendar):
+    assert expiry.last_close(_at(2024, 10, 5, 12, 0)) == _at(2024, 9, 30, 15, 0)
+    assert expiry.last_close(_at(2024, 10, 8, 14, 0)) == _at(2024, 9, 30, 15, 0)
+    assert expiry.last_close(_at(2024, 10, 8, 15, 0)) == _at(2024, 10, 8, 15, 0)
+
+
+def test_awaiting_publish(calendar):
+    after_close = _at(2024, 9, 24, 15, 5)
+    assert expiry.awaiting_publish('20240924', '20240923', now=after_close)
+    assert expiry.awaiting_publish('20240924', None, now=after_close)
+    assert not expiry.awaiting_publish('20240924', '20240924', now=after_close)
+    # 抓取窗口不包含最新交易日
+    assert not expiry.awaiting_publish('20240920', '20240920', now=after_close)
+    # 超过发布窗口仍然没有数据（停牌），按正常的交易日历过期
+    late = _at(2024, 9, 24, 15, 0) + timedelta(minutes=expiry.PUBLISH_WINDOW_MINUTES + 1)
+    assert not expiry.awaiting_publish('20240924', '20240923', now=late)
+
+
+def test_unpublished_tail_is_retried(calendar):
+    fetched_at = _at(2024, 9, 24, 15, 5)
+    metadata = {'coverage': [['20240101', '20240924']], 'end_fetched_at': fetched_at.isoformat(),
+                'end_pending': True}
+    retry = fetched_at + timedelta(minutes=expiry.PUBLISH_RETRY_MINUTES)
+    assert bar_store.tail_expires_at(metadata, None) == retry
+    assert bar_store.effective_coverage(metadata, None, now=retry - timedelta(seconds=1)) == [
+        ['20240101', '20240924']]
+    # 重试时间到了以后，当天重新抓取
+    assert bar_store.effective_coverage(metadata, None, now=retry + timedelta(seconds=1)) == [
+        ['20240101', '20240923']]
+
+    metadata['end_pending'] = False
+    assert bar_store.tail_expires_at(metadata, None) == _at(2024, 9, 25, 15, 0)
+
+
+def test_calendar_falls_back_to_weekdays(monkeypatch):
+    monkeypatch.setattr(expiry, '_calendars', {})
+    monkeypatch.setattr(expiry, '_load_year', lambda year: None)
+    assert expiry.is_trading_day(date(2024, 10, 1))
+    assert not expiry.is_trading_day(date(2024, 10, 5))
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import tushare_parquet as tp
+from tushare_parquet import locks
+
+
+def test_single_flight_coalesces_concurrent_calls(tmp_path):
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(locks.single_flight('key', fetch, str(tmp_path))))
+               for _ in range(8)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == ['result'] * 8
+
+
+def test_single_flight_shares_the_error(tmp_path):
+    started = threading.Event()
+
+    def fetch():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError('upstream down')
+
+    errors = []
+
+    def run():
+        try:
+            locks.single_flight('key', fetch, str(tmp_path))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=run)
+    follower.start()
+    leader.join()
+    follower.join()
+    assert errors == ['upstream down'] * 2
+
+    # 失败的调用结束后，同一个键可以再次执行
+    assert locks.single_flight('key', lambda: 'retry', str(tmp_path)) == 'retry'
+
+
+def test_concurrent_cache_misses_call_upstream_once(provider):
+    provider.latency = 0.2
+    barrier = threading.Barrier(6)
+    frames = []
+
+    def run():
+        barrier.wait()
+        frames.append(tp.stock_basic(list_status='L'))
+
+    threads = [threading.Thread(target=run) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert provider.calls['stock_basic'] == 1
+    assert len(frames) == 6 and all(len(df) == len(frames[0]) for df in frames)
+
@@ -0,0 +1,38 @@
+import os
+import time
+
+import tushare_parquet as tp
+from tushare_parquet import core
+from tushare_parquet import maintenance
+
+
+def test_fractional_max_age_keeps_recent_entries(provider, monkeypatch):
+    monkeypatch.setenv('TUSHARE_PARQUET_MAX_AGE_DAYS', '0.5')
+    assert maintenance._env_number('TUSHARE_PARQUET_MAX_AGE_DAYS') == 0.5
+    tp.stock_basic(list_status='L')
+    assert maintenance.prune(max_age_days=0.5)['removed'] == 0
+    assert maintenance.prune(max_age_days=0)['removed'] == 1
+
+
+def test_vacuum_skips_files_removed_concurrently(provider, monkeypatch):
+    os.makedirs(core._cache_dir, exist_ok=True)
+    old = time.time() - 2 * maintenance.STALE_FILE_SECONDS
+    for name in ('a.parquet.tmp', 'b.parquet'):
+        path = os.path.join(core._cache_dir, name)
+        open(path, 'wb').close()
+        os.utime(path, (old, old))
+
+    remove = os.remove
+
+    def racing_remove(path):
+        # 模拟另一个进程先删除了孤立文件
+        if path.endswith('b.parquet'):
+            remove(path)
+            raise FileNotFoundError(path)
+        remove(path)
+
+    monkeypatch.setattr(maintenance.os, 'remove', racing_remove)
+    result = maintenance.vacuum(compact=False)
+    assert result['tmp_files'] == 1
+    assert result['orphan_files'] == 0
+    assert not {'a.parquet.tmp', 'b.parquet'} & set(os.listdir(core._cache_dir))
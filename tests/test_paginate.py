@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+import tushare_parquet as tp
+from tushare_parquet import paginate
+from tushare_parquet import scheduler
+
+PAGE_SIZE = 100
+
+
+class FakeReports:
+    """每年 8 条记录的报告数据，单次最多返回 PAGE_SIZE 条。"""
+
+    def __init__(self, first_year, last_year=2024):
+        self.rows = pd.DataFrame({'end_date': [f'{year}{month:02d}{28 + i % 2}'
+                                               for year in range(last_year, first_year - 1, -1)
+                                               for month in (12, 9, 6, 3) for i in range(2)]})
+        self.rows['value'] = range(len(self.rows))
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        start = kwargs.get('start_date') or '00000000'
+        end = kwargs.get('end_date') or '99999999'
+        rows = self.rows[(self.rows['end_date'] >= start) & (self.rows['end_date'] <= end)]
+        return rows.head(PAGE_SIZE).reset_index(drop=True)
+
+
+def test_window_makes_one_call_when_the_result_fits():
+    fetch = FakeReports(2015)
+    df = paginate.fetch_by_window('fina_indicator', fetch, PAGE_SIZE, ts_code='000001.SZ')
+    assert fetch.calls == [{'ts_code': '000001.SZ'}]
+    assert len(df) == len(fetch.rows)
+
+
+def test_window_splits_when_the_result_is_full():
+    fetch = FakeReports(1995)
+    df = paginate.fetch_by_window('fina_indicator', fetch, PAGE_SIZE, ts_code='000001.SZ')
+    assert len(fetch.calls) > 1
+    assert sorted(df['value']) == sorted(fetch.rows['value'])
+
+
+def test_window_halves_a_single_full_chunk():
+    fetch = FakeReports(2010)
+    df = paginate.fetch_by_window('fina_indicator', fetch, PAGE_SIZE, ts_code='000001.SZ',
+                                  start_date='20200101', end_date='20241231')
+    assert sorted(df['value']) == sorted(fetch.rows.loc[fetch.rows['end_date'] >= '20200101', 'value'])
+
+
+def test_window_refuses_to_return_a_truncated_day():
+    fetch = FakeReports(2000)
+    fetch.rows['end_date'] = '20240628'
+    with pytest.raises(RuntimeError):
+        paginate.fetch_by_window('fina_indicator', fetch, PAGE_SIZE, ts_code='000001.SZ',
+                                 start_date='20240101', end_date='20241231')
+
+
+def test_chunks_leave_throttle_retries_to_the_outer_call(monkeypatch):
+    monkeypatch.setattr(scheduler, 'BACKOFF_BASE_SECONDS', 0)
+    fetch = FakeReports(1995)
+    calls = []
+
+    def throttled(**kwargs):
+        calls.append(kwargs)
+        if len(calls) > 1:
+            raise Exception('抱歉，您每分钟最多访问该接口60次')
+        return fetch(**kwargs)
+
+    with pytest.raises(Exception, match='最多访问'):
+        scheduler.call('fina_indicator', paginate.fetch_by_window, 'fina_indicator', throttled, PAGE_SIZE,
+                       max_workers=1, ts_code='000001.SZ')
+    # 失败的分块不在内层重试；外层每次重试时第一次调用就失败
+    assert len(calls) == 2 + scheduler.MAX_RETRIES
+
+
+def test_offset_stops_at_the_first_short_page():
+    rows = pd.DataFrame({'value': range(250)})
+    calls = []
+
+    def fetch(offset, limit, **kwargs):
+        calls.append(offset)
+        return rows.iloc[offset:offset + limit].reset_index(drop=True)
+
+    df = paginate.fetch_by_offset('disclosure_date', fetch, PAGE_SIZE, max_workers=2)
+    assert df['value'].tolist() == list(range(250))
+    assert sorted(calls) == [0, 100, 200]
+
+    calls.clear()
+    assert len(paginate.fetch_by_offset('disclosure_date', fetch, 300)) == 250
+    assert calls == [0]
+
+
+def test_fina_indicator_miss_with_a_short_history_calls_upstream_once(provider):
+    df = tp.fina_indicator(ts_code='000001.SZ', start_date='20200101')
+    assert provider.calls['fina_indicator'] == 1
+    assert len(df) < PAGE_SIZE
+    tp.fina_indicator(ts_code='000001.SZ', start_date='20200101')
+    assert provider.calls['fina_indicator'] == 1
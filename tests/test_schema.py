@@ -0,0 +1,40 @@
+import pandas as pd
+
+from tushare_parquet import query
+from tushare_parquet import schema
+
+
+def _roundtrip(df, api_name=None):
+    table, _ = schema.to_table(df, api_name)
+    return schema.decode(table.to_pandas(), schema.read_info(table.schema.metadata))
+
+
+def _bars():
+    return pd.DataFrame({
+        'ts_code': ['000001.SZ', '000001.SZ', '600000.SH', '600000.SH'],
+        'trade_date': ['20240103', '20240102', '20240103', None],
+        'close': [10.12, 10.05, 7.3, 7.25],
+        'vol': [123456.78, 2345.5, 0.0, 1.0],
+    })
+
+
+def test_roundtrip_restores_values_and_dtypes():
+    df = _bars()
+    restored = _roundtrip(df, 'pro_bar')
+    assert restored['ts_code'].dtype == object
+    assert restored['trade_date'].tolist() == ['20240103', '20240102', '20240103', None]
+    assert restored['close'].dtype == 'float64'
+    assert restored['close'].tolist() == df['close'].tolist()
+    assert restored['vol'].tolist() == df['vol'].tolist()
+
+
+def test_range_filter_on_a_decoded_category_column():
+    restored = _roundtrip(_bars(), 'pro_bar')
+    filtered = query.apply(restored, None, [('ts_code', '>=', '600000')])
+    assert filtered['ts_code'].tolist() == ['600000.SH', '600000.SH']
+
+
+def test_date_filters_are_encoded_to_integers():
+    info = {'dates': ['trade_date'], 'decimals': {}}
+    assert schema.encode_filters([[('trade_date', '>=', '20240101'), ('ts_code', '==', '000001.SZ')]], info) \
+        == [[('trade_date', '>=', 20240101), ('ts_code', '==', '000001.SZ')]]
@@ -0,0 +1,122 @@
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip('flask')
+pa = pytest.importorskip('pyarrow')
+
+from api import server
+from tushare_parquet import schema
+from tushare_parquet import search
+from tushare_parquet import wire
+
+STOCK_BASIC = '/api/v1/stock_basic'
+STOCK_DATA = '/api/v1/stock_data?ts_code=000001.SZ&start_date=20240101&end_date=20240630'
+
+
+@pytest.fixture
+def client(provider):
+    search.clear()
+    yield server.app.test_client()
+    search.clear()
+
+
+def test_columns_orient_matches_records(client):
+    records = json.loads(client.get(STOCK_DATA).data)
+    columns = json.loads(client.get(STOCK_DATA + '&orient=columns').data)
+    assert columns['count'] == records['count'] > 0
+    assert columns['columns'] == list(records['data'][0])
+    for name in columns['columns']:
+        assert columns['data'][name] == [row[name] for row in records['data']]
+
+
+def test_missing_values_are_null(client):
+    df = server.pd.DataFrame({'a': [1.5, float('nan')], 'b': ['x', None]})
+    with server.app.test_request_context('/'):
+        body = json.loads(server.format_response(df).get_data())
+    assert body['data'] == [{'a': 1.5, 'b': 'x'}, {'a': None, 'b': None}]
+
+
+@pytest.mark.parametrize('url', [STOCK_BASIC, STOCK_DATA])
+def test_same_etag_means_same_body(client, url):
+    first = client.get(url)
+    second = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.data == second.data
+    assert 'max-age' in first.headers['Cache-Control']
+
+
+@pytest.mark.parametrize('url', [STOCK_BASIC, STOCK_DATA])
+def test_if_none_match_returns_304_without_reading_data(client, provider, url, monkeypatch):
+    etag = client.get(url).headers['ETag']
+    calls = dict(provider.calls)
+    monkeypatch.setattr(server.tsp.memory_cache, 'read_parquet', None)
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert dict(provider.calls) == calls
+
+
+def test_if_modified_since(client):
+    last_modified = client.get(STOCK_BASIC).headers['Last-Modified']
+    assert client.get(STOCK_BASIC, headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get(STOCK_BASIC, headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+
+
+def test_etag_depends_on_the_response_format(client):
+    etag = client.get(STOCK_BASIC).headers['ETag']
+    response = client.get(STOCK_BASIC + '?format=arrow', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_force_refresh_is_not_cacheable(client):
+    etag = client.get(STOCK_BASIC).headers['ETag']
+    response = client.get(STOCK_BASIC + '?force_refresh=true', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in response.headers
+
+
+def test_body_timestamp_is_the_cache_time(client):
+    response = client.get(STOCK_BASIC)
+    body = json.loads(response.data)
+    state = server.tsp.core.cache_state('stock_basic', 43200, list_status='L')
+    assert body['timestamp'] == state['timestamp'].isoformat()
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_binary_formats_match_json(client, fmt):
+    rows = json.loads(client.get(STOCK_DATA).data)['data']
+    response = client.get(STOCK_DATA + f'&format={fmt}')
+    assert response.headers['Content-Type'] == wire.FORMATS[fmt]
+    df = wire.read_frame(response.data, response.headers['Content-Type'])
+    assert df['trade_date'].tolist() == [row['trade_date'] for row in rows]
+    assert df['close'].tolist() == [row['close'] for row in rows]
+
+
+@pytest.mark.parametrize('url', [STOCK_BASIC, STOCK_DATA])
+def test_parquet_response_has_logical_types(client, url):
+    client.get(url)
+    response = client.get(url + ('&' if '?' in url else '?') + 'format=parquet')
+    table = wire.read_table(response.data, response.headers['Content-Type'])
+    for field in table.schema:
+        assert not pa.types.is_dictionary(field.type)
+        assert not pa.types.is_integer(field.type) or field.name not in schema.DATE_COLUMNS
+        assert field.type != pa.float32()
+    assert schema.read_info(table.schema.metadata) is None
+
+
+def test_gzip_response(client):
+    response = client.get(STOCK_DATA, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'].startswith('W/')
+    assert json.loads(gzip.decompress(response.data))['count'] > 0
+
+
+def test_search_stocks(client):
+    body = json.loads(client.get('/api/v1/search_stocks?q=000001&limit=5').data)
+    assert body['data'][0]['code'] == '000001.SZ'
@@ -0,0 +1,26 @@
+import pickle
+
+import tushare_parquet as tp
+from tushare_parquet import memory_cache
+from tushare_parquet import warm
+
+
+def test_snapshot_roundtrip_preloads_the_memory_cache(provider, monkeypatch):
+    expected = tp.stock_basic(list_status='L')
+    assert warm.save()['entries'] == 1
+    memory_cache.clear()
+    assert warm.load() == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError('快照中的条目不应再读取 Parquet')
+
+    monkeypatch.setattr(memory_cache.schema, 'read_parquet', fail)
+    df = tp.stock_basic(list_status='L')
+    assert df['ts_code'].tolist() == expected['ts_code'].tolist()
+    assert df['ts_code'].dtype == expected['ts_code'].dtype
+
+
+def test_snapshot_is_not_unpickled(provider):
+    with open(warm.default_path(), 'wb') as f:
+        pickle.dump([('x', (0, 0), None)], f)
+    assert warm.load() == 0
@@ -1,16 +1,42 @@
 """
 Tushare pro_bar Caching Package
+
+导入本包不会加载 pandas、pyarrow 和 tushare，
+第一次访问下面的接口函数或子模块时才导入 core 等模块。
 """
 
-from .core import pro_bar, set_token, dividend, income, stock_basic, trade_cal, fina_indicator, disclosure_date
+import importlib
 
 __all__ = [
     'pro_bar',
     'set_token',
+    'set_memory_cache_size',
+    'set_rate_limit',
+    'set_cache_quota',
+    'set_stale_while_revalidate',
+    'set_provider',
     'dividend',
     'income',
     'stock_basic',
     'trade_cal',
     'fina_indicator',
     'disclosure_date'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        value = getattr(importlib.import_module('.core', __name__), name)
+    else:
+        try:
+            value = importlib.import_module(f'.{name}', __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f'{__name__}.{name}':
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
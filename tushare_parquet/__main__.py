@@ -0,0 +1,174 @@
+"""
+tushare_parquet 命令行入口
+
+用法:
+    python -m tushare_parquet bulk --apis daily,dividend --workers 8
+    python -m tushare_parquet ingest
+    python -m tushare_parquet cache stats
+    python -m tushare_parquet cache prune --max-mb 2048 --max-age-days 30
+    python -m tushare_parquet cache snapshot
+"""
+
+import argparse
+import os
+import sys
+
+from . import core
+from . import providers
+
+
+def _set_token(args):
+    """按环境变量设置数据源，并从参数或环境变量 TUSHARE_TOKEN 设置 token。"""
+    provider = providers.from_env()
+    core.set_provider(provider)
+    token = args.token or os.getenv('TUSHARE_TOKEN')
+    if not token and not provider.requires_token:
+        return
+    if not token:
+        print("错误: 请通过 --token 或 TUSHARE_TOKEN 环境变量提供 Tushare token", file=sys.stderr)
+        sys.exit(1)
+    core.set_token(token)
+
+
+def _cmd_bulk(args):
+    """批量下载全市场数据。"""
+    from . import bulk
+
+    _set_token(args)
+    ts_codes = args.ts_codes.split(',') if args.ts_codes else None
+
+    def progress(done, total, api_name, ts_code, error):
+        status = f"失败: {error}" if error is not None else "完成"
+        print(f"[{done}/{total}] {api_name} {ts_code} {status}", flush=True)
+
+    result = bulk.download_market(
+        dataset_dir=args.out,
+        apis=tuple(args.apis.split(',')),
+        start_date=args.start_date,
+        end_date=args.end_date,
+        adj=args.adj,
+        list_status=args.list_status,
+        ts_codes=ts_codes,
+        max_workers=args.workers,
+        resume=not args.restart,
+        progress=progress
+    )
+    print(f"共 {result['total']} 个任务，本次完成 {result['done']}，"
+          f"跳过 {result['skipped']}，失败 {len(result['failed'])}")
+    return 1 if result['failed'] else 0
+
+
+def _cmd_ingest(args):
+    """按交易日拉取全市场日线并写入 pro_bar 存储。"""
+    from . import ingest
+
+    _set_token(args)
+
+    def progress(trade_date, rows):
+        print(f"{trade_date}: {rows} 条", flush=True)
+
+    result = ingest.ingest_daily(start_date=args.start_date, end_date=args.end_date,
+                                 max_workers=args.workers, progress=progress)
+    print(f"入库 {len(result['trade_dates'])} 个交易日，更新 {result['stocks']} 只股票，"
+          f"上游调用 {result['calls']} 次")
+    return 0
+
+
+def _format_bytes(n):
+    """把字节数格式化为 MB。"""
+    return f"{(n or 0) / 1024 / 1024:.1f}MB"
+
+
+def _cmd_cache(args):
+    """缓存维护：统计、淘汰、清理、校验和生成预热快照。"""
+    from . import maintenance
+
+    if args.action == 'stats':
+        result = maintenance.stats()
+        for api_name, api in result['apis'].items():
+            hit_rate = f"{api['hit_rate']:.1%}" if api['hit_rate'] is not None else '-'
+            print(f"{api_name}: {api['entries']} 条, {api['rows']} 行, "
+                  f"{_format_bytes(api['bytes'])}, 命中率 {hit_rate}")
+        max_bytes, max_age_days = result['max_bytes'], result['max_age_days']
+        print(f"合计 {result['entries']} 条, {_format_bytes(result['bytes'])}, "
+              f"磁盘占用 {_format_bytes(result['disk_bytes'])}, "
+              f"容量上限 {_format_bytes(max_bytes) if max_bytes is not None else '不限'}, "
+              f"闲置期限 {f'{max_age_days} 天' if max_age_days is not None else '不限'}")
+        return 0
+
+    if args.action == 'prune':
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        result = maintenance.prune(max_bytes=max_bytes, max_age_days=args.max_age_days,
+                                   dry_run=args.dry_run)
+        verb = '将删除' if args.dry_run else '删除'
+        print(f"{verb} {result['removed']} 条, 释放 {_format_bytes(result['freed_bytes'])}")
+        return 0
+
+    if args.action == 'vacuum':
+        result = maintenance.vacuum(dry_run=args.dry_run)
+        print(f"孤立文件 {result['orphan_files']}, 缺失数据的记录 {result['missing_entries']}, "
+              f"临时文件 {result['tmp_files']}, 锁文件 {result['lock_files']}, "
+              f"释放 {_format_bytes(result['freed_bytes'])}")
+        return 0
+
+    if args.action == 'snapshot':
+        from . import warm
+        result = warm.save()
+        print(f"预热快照收录 {result['entries']} 条, {_format_bytes(result['bytes'])}: {warm.default_path()}")
+        return 0
+
+    result = maintenance.verify(repair=args.repair)
+    for key, problem in result['problems'].items():
+        print(f"{key}: {problem}")
+    print(f"检查 {result['checked']} 条, 问题 {len(result['problems'])} 条"
+          + (", 已删除" if args.repair and result['problems'] else ""))
+    return 1 if result['problems'] and not args.repair else 0
+
+
+def build_parser():
+    """构建命令行参数解析器。"""
+    parser = argparse.ArgumentParser(prog='python -m tushare_parquet',
+                                     description='tushare_parquet 缓存与数据下载工具')
+    parser.add_argument('--token', help='Tushare token，默认读取 TUSHARE_TOKEN 环境变量')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bulk_parser = subparsers.add_parser('bulk', help='批量下载全市场数据到分区数据集')
+    bulk_parser.add_argument('--out', help='数据集目录，默认 ~/.tushare_parquet_cache/dataset')
+    bulk_parser.add_argument('--apis', default='daily,dividend,fina_indicator',
+                             help='要下载的数据集，逗号分隔')
+    bulk_parser.add_argument('--start-date', help='开始日期 YYYYMMDD')
+    bulk_parser.add_argument('--end-date', help='结束日期 YYYYMMDD')
+    bulk_parser.add_argument('--adj', choices=['qfq', 'hfq'], help='日线复权类型，默认不复权')
+    bulk_parser.add_argument('--list-status', default='L', help='股票上市状态，默认 L')
+    bulk_parser.add_argument('--ts-codes', help='只下载指定股票，逗号分隔')
+    bulk_parser.add_argument('--workers', type=int, default=8, help='并发线程数，默认 8')
+    bulk_parser.add_argument('--restart', action='store_true', help='忽略上次进度，重新下载全部')
+    bulk_parser.set_defaults(func=_cmd_bulk)
+
+    ingest_parser = subparsers.add_parser('ingest', help='按交易日拉取全市场日线并写入 pro_bar 存储')
+    ingest_parser.add_argument('--start-date', help='开始日期 YYYYMMDD，默认接着上次入库')
+    ingest_parser.add_argument('--end-date', help='结束日期 YYYYMMDD，默认今天')
+    ingest_parser.add_argument('--workers', type=int, default=8, help='写入存储的并发线程数，默认 8')
+    ingest_parser.set_defaults(func=_cmd_ingest)
+
+    cache_parser = subparsers.add_parser('cache', help='缓存维护：统计、淘汰、清理、校验和生成预热快照')
+    cache_parser.add_argument('action', choices=['stats', 'prune', 'vacuum', 'verify', 'snapshot'],
+                              help='stats 统计, prune 按容量和期限淘汰, vacuum 清理孤立文件并压缩, verify 校验, '
+                                   'snapshot 生成 stock_basic、trade_cal 的预热快照')
+    cache_parser.add_argument('--max-mb', type=float, help='prune 的容量上限（MB），默认使用 TUSHARE_PARQUET_MAX_CACHE_MB')
+    cache_parser.add_argument('--max-age-days', type=float, help='prune 的闲置期限（天），默认使用 TUSHARE_PARQUET_MAX_AGE_DAYS')
+    cache_parser.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+    cache_parser.add_argument('--repair', action='store_true', help='verify 时删除损坏的条目')
+    cache_parser.set_defaults(func=_cmd_cache)
+
+    return parser
+
+
+def main(argv=None):
+    """命令行主函数。"""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+本地复权计算
+
+区间合并存储只保存不复权行情和复权因子，前复权、后复权在读取时用 NumPy 向量化计算，
+口径与 tushare.pro_bar 保持一致：
+    - 后复权: 价格 × 当日复权因子
+    - 前复权: 价格 × 当日复权因子 ÷ 请求窗口内最新交易日的复权因子
+    - 不复权: pre_close 取上一根 K 线的收盘价
+价格保留两位小数，change 和 pct_chg 由复权后的价格重新计算。
+"""
+
+import numpy as np
+
+# 复权时需要乘以复权因子的价格列
+PRICE_COLS = ['open', 'high', 'low', 'close', 'pre_close']
+
+
+def _round2(values):
+    """
+    与 tushare 的 '%.2f' 格式一致，保留两位小数
+
+    np.round 先乘 100 再取整，在 x.xx5 这类边界上与 '%.2f' 按二进制精确值舍入的结果不同，
+    这里按相同的格式化方式舍入，保证和 pro_bar 逐位一致。
+    """
+    values = np.asarray(values, dtype=float)
+    return np.char.mod('%.2f', values).astype(float)
+
+
+def _recompute_change(out, close, pre_close):
+    """根据收盘价和前收盘价重新计算 change 和 pct_chg。"""
+    change = close - pre_close
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct_chg = _round2(change / pre_close * 100)
+    if 'change' in out.columns:
+        out['change'] = change
+    if 'pct_chg' in out.columns:
+        out['pct_chg'] = pct_chg
+
+
+def derive(df, start, end, adj=None):
+    """
+    从存储中切出 [start, end] 窗口并计算指定复权类型的行情
+
+    参数:
+        df (pandas.DataFrame): 存储数据，按 trade_date 降序，包含 adj_factor 列
+        start (str): 开始日期 YYYYMMDD
+        end (str): 结束日期 YYYYMMDD
+        adj (str, 可选): None 不复权、qfq 前复权、hfq 后复权
+
+    返回:
+        pandas.DataFrame: 与 tushare.pro_bar 相同列和顺序的数据（不含 adj_factor）
+    """
+    if df is None:
+        return None
+
+    dates = df['trade_date'].to_numpy()
+    # 存储按日期降序，窗口是一段连续的行
+    positions = np.flatnonzero((dates >= start) & (dates <= end))
+    if positions.size == 0:
+        return df.iloc[0:0].drop(columns=['adj_factor'], errors='ignore').reset_index(drop=True)
+    first, last = positions[0], positions[-1] + 1
+
+    out = df.iloc[first:last].drop(columns=['adj_factor'], errors='ignore').reset_index(drop=True)
+
+    if adj is None:
+        # pro_bar 不复权时 pre_close 取上一根 K 线的收盘价，
+        # 窗口最早一行使用存储中更早一根 K 线，存储中没有时为空
+        close = df['close'].to_numpy(dtype=float)
+        previous = np.append(close[1:], np.nan)
+        pre_close = previous[first:last]
+        out['pre_close'] = pre_close
+        _recompute_change(out, out['close'].to_numpy(dtype=float), pre_close)
+        return out
+
+    factors = df['adj_factor'].to_numpy(dtype=float)[first:last]
+    # 前复权以窗口内最新交易日的复权因子为基准，运算顺序与 pro_bar 相同以避免舍入差异
+    base = factors[0] if adj == 'qfq' else 1.0
+
+    for col in PRICE_COLS:
+        if col in out.columns:
+            out[col] = _round2(out[col].to_numpy(dtype=float) * factors / base)
+    _recompute_change(out, out['close'].to_numpy(dtype=float), out['pre_close'].to_numpy(dtype=float))
+    return out
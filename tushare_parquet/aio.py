@@ -0,0 +1,137 @@
+"""
+tushare_parquet 的 asyncio 接口
+
+各接口函数与同步版本参数相同，上游调用和 Parquet 读写在专用线程池中执行，不阻塞事件循环。
+线程中沿用调用方的上下文（如 scheduler.priority 设置的优先级），
+缓存键的请求合并、限流和原子写入与同步版本完全一致。
+
+    import tushare_parquet.aio as tpa
+
+    df = await tpa.pro_bar(ts_code='000001.SZ', start_date='20240101')
+    bars = await tpa.pro_bar_many(['000001.SZ', '600036.SH'], start_date='20240101', limit=8)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core
+
+# 线程池大小，上游调用实际的并发度还受调度器的每分钟限额约束
+DEFAULT_MAX_WORKERS = 16
+# gather 默认同时执行的任务数
+DEFAULT_CONCURRENCY = 8
+
+_max_workers = DEFAULT_MAX_WORKERS
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def set_max_workers(max_workers):
+    """设置执行同步调用的线程池大小，已有的线程池在当前任务完成后关闭。"""
+    global _max_workers, _executor
+    if max_workers < 1:
+        raise ValueError("max_workers 至少为 1")
+    with _executor_lock:
+        _max_workers = max_workers
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers,
+                                           thread_name_prefix='tushare_parquet_aio')
+        return _executor
+
+
+async def run(fn, *args, **kwargs):
+    """在线程池中执行同步函数并等待结果，沿用调用方的上下文变量。"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+async def pro_bar(**kwargs):
+    """tushare_parquet.pro_bar 的异步版本。"""
+    return await run(core.pro_bar, **kwargs)
+
+
+async def dividend(**kwargs):
+    """tushare_parquet.dividend 的异步版本。"""
+    return await run(core.dividend, **kwargs)
+
+
+async def income(**kwargs):
+    """tushare_parquet.income 的异步版本。"""
+    return await run(core.income, **kwargs)
+
+
+async def stock_basic(**kwargs):
+    """tushare_parquet.stock_basic 的异步版本。"""
+    return await run(core.stock_basic, **kwargs)
+
+
+async def trade_cal(**kwargs):
+    """tushare_parquet.trade_cal 的异步版本。"""
+    return await run(core.trade_cal, **kwargs)
+
+
+async def fina_indicator(**kwargs):
+    """tushare_parquet.fina_indicator 的异步版本。"""
+    return await run(core.fina_indicator, **kwargs)
+
+
+async def disclosure_date(**kwargs):
+    """tushare_parquet.disclosure_date 的异步版本。"""
+    return await run(core.disclosure_date, **kwargs)
+
+
+async def gather(*aws, limit=DEFAULT_CONCURRENCY, return_exceptions=False):
+    """
+    与 asyncio.gather 相同，但同时最多执行 limit 个任务
+
+    参数:
+        *aws: 协程或其他可等待对象，按传入顺序返回结果
+        limit (int): 同时执行的任务数上限，None 表示不限制
+        return_exceptions (bool): 为 True 时把异常作为结果返回，而不是抛出第一个异常
+
+    返回:
+        list: 各任务的结果
+    """
+    if limit is None:
+        return await asyncio.gather(*aws, return_exceptions=return_exceptions)
+    if limit < 1:
+        raise ValueError("limit 至少为 1")
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(bounded(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+async def pro_bar_many(ts_codes, limit=DEFAULT_CONCURRENCY, return_exceptions=False, **kwargs):
+    """
+    并发获取多只股票的 K 线
+
+    参数:
+        ts_codes (list): 股票代码列表
+        limit (int): 同时获取的股票数上限
+        return_exceptions (bool): 为 True 时失败的股票对应的值为异常对象，否则抛出第一个异常
+        **kwargs: 传给 pro_bar 的其他参数（如 start_date、end_date、adj）
+
+    返回:
+        dict: ts_code -> pandas.DataFrame，顺序与 ts_codes 一致
+    """
+    ts_codes = list(dict.fromkeys(ts_codes))
+    results = await gather(*(pro_bar(ts_code=ts_code, **kwargs) for ts_code in ts_codes),
+                           limit=limit, return_exceptions=return_exceptions)
+    return dict(zip(ts_codes, results))
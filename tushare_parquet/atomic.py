@@ -0,0 +1,77 @@
+"""
+缓存文件的原子发布
+
+数据先写入同目录下的临时文件，fsync 后再用 os.replace 重命名到最终路径，
+读者要么看到旧文件，要么看到完整的新文件。缓存清单中记录数据文件的签名
+(mtime_ns, size)，读者据此确认数据和元数据属于同一次提交。
+写入方需要持有缓存键的独占锁（见 locks.key_lock），读取方无需加锁。
+"""
+
+import os
+import threading
+
+
+def file_signature(path):
+    """返回文件签名 (mtime_ns, size)，文件不存在时抛出 OSError。"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _fsync_dir(directory):
+    """同步目录项，确保重命名在断电后依然生效。"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # Windows 不支持打开目录
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write):
+    """
+    原子地写入文件
+
+    write(tmp_path) 负责把内容写到临时路径，返回发布后文件的签名。
+    目标目录不存在时自动创建。
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp_path)
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        signature = file_signature(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+    return signature
+
+
+def write_parquet(df, path, **kwargs):
+    """原子地写入 Parquet 文件，返回文件签名。"""
+    return atomic_write(path, lambda tmp_path: df.to_parquet(tmp_path, **kwargs))
+
+
+def write_table(table, path, **kwargs):
+    """原子地写入 Arrow 表，kwargs 传给 pyarrow.parquet.write_table，返回文件签名。"""
+    import pyarrow.parquet as pq
+    return atomic_write(path, lambda tmp_path: pq.write_table(table, tmp_path, **kwargs))
+
+
+def is_consistent(metadata, data_path):
+    """检查数据文件是否与元数据记录的签名一致，旧版本元数据没有签名时视为一致。"""
+    expected = metadata.get('data_signature')
+    if not expected:
+        return True
+    try:
+        return file_signature(data_path) == tuple(expected)
+    except OSError:
+        return False
@@ -0,0 +1,249 @@
+"""
+pro_bar 区间合并存储
+
+每个 (ts_code, freq) 只保留一份规范化的 Parquet 文件，存放不复权行情和当日的
+复权因子（adj_factor 列），并在元数据中记录已经覆盖的日期区间。
+请求任意时间窗口时，只从上游补齐缺失的区间，然后在本地切片，
+前复权、后复权由 adjust 模块在读取时计算。
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from . import atomic
+from . import expiry
+from . import memory_cache
+from . import schema
+
+# 支持区间合并的数据频度
+STORE_FREQS = ('D', 'W', 'M')
+# 支持区间合并的 pro_bar 参数，其余参数（如 ma、factors）走普通缓存
+STORE_PARAMS = ('ts_code', 'start_date', 'end_date', 'adj', 'freq')
+# 各频度对应的不复权行情接口
+BAR_APIS = {'D': 'daily', 'W': 'weekly', 'M': 'monthly'}
+# A 股最早交易日，未指定 start_date 时从这里开始覆盖
+EARLIEST_DATE = '19901219'
+# 各频度行情接口单次返回的行数上限，返回满额时更早的数据被截断
+ROW_LIMITS = {'D': 6000, 'W': 4500, 'M': 4500}
+
+DATE_FORMAT = '%Y%m%d'
+
+
+def is_storable(kwargs):
+    """判断 pro_bar 的参数组合是否可以使用区间合并存储。"""
+    if any(key not in STORE_PARAMS for key in kwargs):
+        return False
+    if kwargs.get('adj') not in (None, 'qfq', 'hfq'):
+        return False
+    return str(kwargs.get('freq') or 'D').upper() in STORE_FREQS
+
+
+def store_name(ts_code, freq='D'):
+    """生成存储文件名（不含扩展名），不同复权类型共用同一份存储。"""
+    return f"{ts_code.upper()}_{(freq or 'D').upper()}"
+
+
+def shift_date(date_str, days):
+    """将 YYYYMMDD 格式的日期平移指定天数。"""
+    return (datetime.strptime(date_str, DATE_FORMAT) + timedelta(days=days)).strftime(DATE_FORMAT)
+
+
+def normalize_window(start_date=None, end_date=None, today=None):
+    """补全并规范化请求窗口，结束日期不超过今天。"""
+    today = today or expiry.now().strftime(DATE_FORMAT)
+    start = (start_date or EARLIEST_DATE).replace('-', '')
+    end = (end_date or today).replace('-', '')
+    return start, min(end, today)
+
+
+def load(manifest, key, data_path):
+    """从缓存清单和数据文件读取存储，不存在时返回 (None, 空元数据)。"""
+    metadata = manifest.get(key)
+    if metadata is None or not os.path.exists(data_path):
+        return None, {'coverage': [], 'end_fetched_at': None}
+    try:
+        # 数据文件正在被替换时视为空存储，调用方持锁后会重新加载
+        if not atomic.is_consistent(metadata, data_path):
+            return None, {'coverage': [], 'end_fetched_at': None}
+        return memory_cache.read_parquet(data_path), metadata
+    except Exception:
+        # 存储损坏时视为空存储，重新从上游补齐
+        return None, {'coverage': [], 'end_fetched_at': None}
+
+
+def save(manifest, key, df, metadata, data_path):
+    """原子地写入存储数据并更新缓存清单，调用方需持有该存储的锁。"""
+    table, options = schema.to_table(df, 'pro_bar')
+    signature = atomic.write_table(table, data_path, **options)
+    metadata.update({
+        'timestamp': expiry.now().isoformat(),
+        'row_count': len(df),
+        'byte_size': signature[1],
+        'start_date': df['trade_date'].min(),
+        'end_date': df['trade_date'].max(),
+        'data_signature': list(signature)
+    })
+    manifest.put(key, metadata)
+
+
+def merge_ranges(ranges):
+    """合并重叠或相邻的日期区间。"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= shift_date(merged[-1][1], 1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def tail_expires_at(metadata, ttl_minutes):
+    """返回覆盖区间尾部的过期时间，没有抓取记录时返回 None。"""
+    fetched_at = metadata.get('end_fetched_at')
+    if not fetched_at:
+        return None
+    return expiry.expires_at(expiry.parse(fetched_at), ttl_minutes,
+                             metadata.get('end_pending', False))
+
+
+def effective_coverage(metadata, ttl_minutes, now=None):
+    """
+    计算仍然可信的覆盖区间
+
+    历史区间一经写入不再变化；只有覆盖到最新日期的尾部会过期。
+    尾部过期时（超过 ttl_minutes 未更新，ttl_minutes 为 None 时按交易日历判断
+    抓取之后是否又有交易时段收盘，抓取时最新交易日尚未发布则几分钟后过期），
+    把覆盖区间截断到上次抓取日期的前一天，从而只重新获取上次收盘之后的数据。
+    """
+    now = now or expiry.now()
+    ranges = [list(r) for r in metadata.get('coverage', [])]
+    expires_at = tail_expires_at(metadata, ttl_minutes)
+    if not ranges or expires_at is None or now <= expires_at:
+        return ranges
+
+    fetched_at = expiry.parse(metadata['end_fetched_at'])
+    limit = shift_date(fetched_at.strftime(DATE_FORMAT), -1)
+    clipped = []
+    for start, end in ranges:
+        if start > limit:
+            continue
+        clipped.append([start, min(end, limit)])
+    return clipped
+
+
+def missing_ranges(coverage, start, end):
+    """返回 [start, end] 中未被覆盖的区间列表。"""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in merge_ranges(coverage):
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            gaps.append([cursor, shift_date(cov_start, -1)])
+        cursor = shift_date(cov_end, 1)
+        if cursor > end:
+            return gaps
+    if cursor <= end:
+        gaps.append([cursor, end])
+    return gaps
+
+
+def fetch_pages(fetch, start_date, end_date, row_limit, until=None):
+    """
+    分页抓取 [start_date, end_date] 内的全部数据
+
+    上游按 trade_date 降序返回，单次最多 row_limit 行。返回满额时（或者给出 until、
+    返回的数据还没有早到 until 时），以已返回的最早交易日的前一天为结束日期继续向前抓取，
+    避免长窗口中较早的数据被截断后却记为已覆盖。
+
+    参数:
+        fetch (callable): fetch(start_date, end_date) 调用上游，返回 DataFrame
+        start_date (str): 开始日期 YYYYMMDD
+        end_date (str): 结束日期 YYYYMMDD
+        row_limit (int): 上游单次返回的行数上限
+        until (str, 可选): 结果应当覆盖到的最早交易日
+
+    返回:
+        list: 各页的 DataFrame，从新到旧排列
+    """
+    pages = []
+    while start_date <= end_date:
+        df = fetch(start_date, end_date)
+        if df is None or df.empty:
+            break
+        pages.append(df)
+        earliest = df['trade_date'].min()
+        if len(df) < row_limit and (until is None or earliest <= until):
+            break
+        end_date = shift_date(earliest, -1)
+    return pages
+
+
+def _concat(pages):
+    """按顺序拼接分页结果。"""
+    return pages[0] if len(pages) == 1 else pd.concat(pages, ignore_index=True)
+
+
+def fetch_raw(api, ts_code, freq, start_date, end_date):
+    """
+    从上游获取不复权行情和复权因子
+
+    api 为 pro_api 客户端（通常是经过调度器的 ScheduledApi），每个缺口通常两次调用，
+    行情或复权因子被单次行数上限截断时继续向前抓取（见 fetch_pages）。
+    复权因子按 trade_date 左连接，周线、月线取各自最后一个交易日的因子。
+    """
+    method = getattr(api, BAR_APIS[freq])
+    pages = fetch_pages(lambda s, e: method(ts_code=ts_code, start_date=s, end_date=e),
+                        start_date, end_date, ROW_LIMITS[freq])
+    if not pages:
+        return None
+    bars = _concat(pages)
+    pages = fetch_pages(lambda s, e: api.adj_factor(ts_code=ts_code, start_date=s, end_date=e),
+                        start_date, end_date, ROW_LIMITS['D'], until=bars['trade_date'].min())
+    if not pages:
+        bars = bars.copy()
+        bars['adj_factor'] = float('nan')
+        return bars
+    factors = _concat(pages)
+    return bars.merge(factors[['trade_date', 'adj_factor']], on='trade_date', how='left')
+
+
+def _dedupe_key(trade_dates, freq):
+    """生成去重键，周线和月线按所属周期去重，保留最新的一根。"""
+    if freq == 'D':
+        return trade_dates
+    dates = pd.to_datetime(trade_dates, format=DATE_FORMAT)
+    period = 'W-FRI' if freq == 'W' else 'M'
+    return dates.dt.to_period(period).astype(str)
+
+
+def merge(existing, piece, freq='D'):
+    """
+    把新抓取的数据合并进存储
+
+    同一交易日同时存在时，保留非空字段更多的一行，数量相同则以新数据为准，
+    结果按 trade_date 降序排列，与 tushare 返回顺序一致。
+    缺失的复权因子沿用更早一根 K 线的因子，与 tushare.pro_bar 的处理一致。
+    """
+    if piece is None or piece.empty:
+        return existing
+    if existing is None or existing.empty:
+        combined = piece.copy()
+    else:
+        combined = pd.concat([existing, piece], ignore_index=True)
+
+    combined['_order'] = range(len(combined))
+    combined['_filled'] = combined.notna().sum(axis=1)
+    combined['_key'] = _dedupe_key(combined['trade_date'], freq)
+    combined = combined.sort_values(['_key', 'trade_date', '_filled', '_order'])
+    combined = combined.drop_duplicates('_key', keep='last')
+    combined = combined.drop(columns=['_order', '_filled', '_key'])
+    combined = combined.sort_values('trade_date', ascending=False).reset_index(drop=True)
+    if 'adj_factor' in combined.columns:
+        combined['adj_factor'] = combined['adj_factor'].bfill()
+    return combined
+
@@ -0,0 +1,182 @@
+"""
+全市场批量下载
+
+以 stock_basic 得到的股票列表为范围，用有界线程池并发下载日线、分红和财务指标，
+结果写入按 api/year/ts_code 分区的 Hive 风格 Parquet 数据集：
+
+    <dataset_dir>/api=daily/year=2024/ts_code=000001.SZ/part-0.parquet
+
+每完成一个 (api, ts_code) 任务就记录进度，中断后重新运行会跳过已完成的任务。
+所有上游调用以后台优先级经过调度器，不会挤占交互请求的配额。
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from . import atomic
+from . import core
+from . import scheduler
+
+# 默认下载的数据集
+DEFAULT_APIS = ('daily', 'dividend', 'fina_indicator')
+# 各数据集用于分区年份的日期列
+PARTITION_DATE_COLUMNS = {
+    'daily': 'trade_date',
+    'dividend': 'end_date',
+    'fina_indicator': 'end_date',
+}
+# 日期为空时使用的分区名，与 Hive 约定一致
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+DEFAULT_MAX_WORKERS = 8
+# 分区字段的类型，显式指定以避免按目录名推断出不一致的字典类型
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int32()), ('ts_code', pa.string())]),
+                               flavor='hive')
+
+
+def default_dataset_dir():
+    """默认的数据集目录，位于缓存目录下。"""
+    return os.path.join(core._cache_dir, 'dataset')
+
+
+def _fetch(api_name, ts_code, start_date=None, end_date=None, adj=None):
+    """下载单只股票的一个数据集。"""
+    if api_name == 'daily':
+        kwargs = {'ts_code': ts_code, 'adj': adj, 'start_date': start_date, 'end_date': end_date}
+        return core.pro_bar(**{k: v for k, v in kwargs.items() if v is not None})
+    if api_name == 'dividend':
+        return core.dividend(ts_code=ts_code)
+    if api_name == 'fina_indicator':
+        kwargs = {'ts_code': ts_code, 'start_date': start_date, 'end_date': end_date}
+        return core.fina_indicator(**{k: v for k, v in kwargs.items() if v is not None})
+    raise ValueError(f"不支持的批量下载数据集: {api_name}")
+
+
+def _write_partitions(df, dataset_dir, api_name, ts_code):
+    """按年份把单只股票的数据写入分区，返回写入的文件数。"""
+    date_col = PARTITION_DATE_COLUMNS[api_name]
+    if date_col in df.columns:
+        years = df[date_col].astype(str).str[:4].where(df[date_col].notna(), NULL_PARTITION)
+    else:
+        years = pd.Series(NULL_PARTITION, index=df.index)
+
+    written = 0
+    for year, part in df.groupby(years, sort=False):
+        directory = os.path.join(dataset_dir, f"api={api_name}", f"year={year}", f"ts_code={ts_code}")
+        os.makedirs(directory, exist_ok=True)
+        # 分区列由目录名表示，不重复写入文件
+        atomic.write_parquet(part.drop(columns=['ts_code'], errors='ignore').reset_index(drop=True),
+                             os.path.join(directory, 'part-0.parquet'), index=False)
+        written += 1
+    return written
+
+
+class _Progress:
+    """记录已完成的 (api, ts_code) 任务，用于断点续传。"""
+
+    def __init__(self, dataset_dir):
+        self.directory = os.path.join(dataset_dir, '_progress')
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, api_name):
+        return os.path.join(self.directory, f"{api_name}.done")
+
+    def completed(self, api_name):
+        try:
+            with open(self._path(api_name), 'r') as f:
+                return {line.strip() for line in f if line.strip()}
+        except OSError:
+            return set()
+
+    def mark(self, api_name, ts_code):
+        with self._lock:
+            with open(self._path(api_name), 'a') as f:
+                f.write(ts_code + '\n')
+
+    def reset(self, api_name):
+        if os.path.exists(self._path(api_name)):
+            os.remove(self._path(api_name))
+
+
+def download_market(dataset_dir=None, apis=DEFAULT_APIS, start_date=None, end_date=None,
+                    adj=None, list_status='L', ts_codes=None, max_workers=DEFAULT_MAX_WORKERS,
+                    resume=True, progress=None):
+    """
+    批量下载全市场数据并写入分区数据集
+
+    参数:
+        dataset_dir (str, 可选): 数据集目录，默认 ~/.tushare_parquet_cache/dataset
+        apis (tuple): 要下载的数据集，可选 daily、dividend、fina_indicator
+        start_date (str, 可选): 日线和财务指标的开始日期
+        end_date (str, 可选): 日线和财务指标的结束日期
+        adj (str, 可选): 日线复权类型
+        list_status (str): 股票范围的上市状态，默认 L
+        ts_codes (list, 可选): 指定股票列表，不指定时使用 stock_basic 的全部股票
+        max_workers (int): 并发线程数
+        resume (bool): 是否跳过上次已完成的任务，False 时重新下载全部
+        progress (callable, 可选): 每完成一个任务调用 progress(done, total, api_name, ts_code, error)
+
+    返回:
+        dict: {'total', 'done', 'skipped', 'failed': {(api_name, ts_code): 错误信息}}
+    """
+    dataset_dir = dataset_dir or default_dataset_dir()
+    for api_name in apis:
+        if api_name not in PARTITION_DATE_COLUMNS:
+            raise ValueError(f"不支持的批量下载数据集: {api_name}")
+
+    if ts_codes is None:
+        with scheduler.priority(scheduler.BACKGROUND):
+            universe = core.stock_basic(list_status=list_status)
+        ts_codes = [] if universe is None else universe['ts_code'].tolist()
+
+    state = _Progress(dataset_dir)
+    tasks = []
+    skipped = 0
+    for api_name in apis:
+        if not resume:
+            state.reset(api_name)
+        completed = state.completed(api_name)
+        for ts_code in ts_codes:
+            if ts_code in completed:
+                skipped += 1
+            else:
+                tasks.append((api_name, ts_code))
+
+    def run(api_name, ts_code):
+        with scheduler.priority(scheduler.BACKGROUND):
+            df = _fetch(api_name, ts_code, start_date, end_date, adj)
+        if df is not None and not df.empty:
+            _write_partitions(df, dataset_dir, api_name, ts_code)
+        state.mark(api_name, ts_code)
+
+    result = {'total': len(tasks) + skipped, 'done': 0, 'skipped': skipped, 'failed': {}}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run, api_name, ts_code): (api_name, ts_code)
+                   for api_name, ts_code in tasks}
+        for future in as_completed(futures):
+            api_name, ts_code = futures[future]
+            error = future.exception()
+            if error is None:
+                result['done'] += 1
+            else:
+                result['failed'][(api_name, ts_code)] = str(error)
+            if progress is not None:
+                progress(result['done'] + len(result['failed']), len(tasks), api_name, ts_code, error)
+    return result
+
+
+def read_dataset(api_name, dataset_dir=None, columns=None, filters=None):
+    """
+    读取分区数据集中的一个数据集
+
+    filters 使用 pyarrow 的过滤表达式，可以按分区裁剪，例如
+    [('year', '>=', 2020), ('ts_code', 'in', ['000001.SZ'])]。
+    """
+    dataset_dir = dataset_dir or default_dataset_dir()
+    path = os.path.join(dataset_dir, f"api={api_name}")
+    return pd.read_parquet(path, columns=columns, filters=filters, partitioning=PARTITIONING)
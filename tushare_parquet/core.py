@@ -1,30 +1,145 @@
-import tushare as ts
 import pandas as pd
 import os
+import atexit
+import functools
 import hashlib
-import json
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from . import adjust
+from . import atomic
+from . import bar_store
+from . import expiry
+from . import locks
+from . import manifest
+from . import memory_cache
+from . import metrics
+from . import paginate
+from . import providers
+from . import query
+from . import scheduler
+from . import schema
 
 _token = None
+# Pro API 客户端在第一次访问上游时才创建（同时才导入 tushare），缩短冷启动时间
 _pro = None
-_cache_dir = os.path.join(os.path.expanduser('~'), '.tushare_parquet_cache')
+_pro_lock = threading.Lock()
+_provider = providers.TushareProvider()
+# 缓存目录，离线压测时可以通过 TUSHARE_PARQUET_CACHE_DIR 与正式缓存分开
+_cache_dir = (os.getenv('TUSHARE_PARQUET_CACHE_DIR')
+              or os.path.join(os.path.expanduser('~'), '.tushare_parquet_cache'))
 _metadata_dir = os.path.join(_cache_dir, 'metadata')
+_bar_dir = os.path.join(_cache_dir, 'bars')
+_lock_dir = os.path.join(_cache_dir, 'locks')
+_manifest = manifest.Manifest(os.path.join(_cache_dir, 'manifest.db'))
+_legacy_metadata_imported = False
+
+# 过期后继续提供旧数据并在后台刷新（stale-while-revalidate）
+_stale_while_revalidate = False
+# 超过 TTL 之后最多还能提供多久的旧数据（分钟），超过后请求阻塞等待刷新
+_max_stale_minutes = 1440
+_refresh_workers = 2
+_refresh_executor = None
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+# 单次调用返回行数上限，超过时自动拆分请求
+FINA_INDICATOR_PAGE_SIZE = 100
+DISCLOSURE_DATE_PAGE_SIZE = 3000
 
-# 确保缓存目录存在
-os.makedirs(_cache_dir, exist_ok=True)
-os.makedirs(_metadata_dir, exist_ok=True)
+# 退出前写入尚未落盘的访问记录
+atexit.register(_manifest.flush)
 
 def set_token(token):
-    """设置 Tushare token。"""
+    """设置 Tushare token，客户端在第一次访问上游时创建。"""
     global _token, _pro
-    _token = token
-    _pro = ts.pro_api(_token)
+    with _pro_lock:
+        _token = token
+        _pro = None
+
+def set_provider(provider):
+    """设置上游数据源，默认为 providers.TushareProvider。
+
+    压测和 CI 中可以使用 providers.ReplayProvider，离线返回录制或合成的数据，
+    并模拟上游延迟和限流。不需要 token 的数据源设置后即可使用。
+    """
+    global _provider, _pro
+    with _pro_lock:
+        _provider = provider
+        _pro = None
+
+def set_memory_cache_size(max_bytes):
+    """设置进程内内存缓存的容量（字节），设为 0 关闭内存缓存。
+
+    默认容量为 256MB，也可以通过环境变量 TUSHARE_PARQUET_MEMORY_CACHE_MB 设置。
+    """
+    memory_cache.set_max_bytes(max_bytes)
+
+def set_rate_limit(api_name, calls_per_minute):
+    """设置上游接口每分钟的调用上限。
+
+    参数:
+        api_name (str): 接口名，如 fina_indicator、daily；为 None 时设置默认上限
+        calls_per_minute (int): 每分钟最多调用次数，应与账户积分档位对应
+    """
+    scheduler.set_rate_limit(api_name, calls_per_minute)
+
+def set_cache_quota(max_bytes=None, max_age_days=None):
+    """设置磁盘缓存的容量上限和闲置期限，由 maintenance.prune 按 LRU 淘汰。
+
+    也可以通过环境变量 TUSHARE_PARQUET_MAX_CACHE_MB、TUSHARE_PARQUET_MAX_AGE_DAYS 设置。
+
+    参数:
+        max_bytes (int, 可选): 缓存数据文件的总字节数上限，None 表示不限制
+        max_age_days (float, 可选): 超过这么多天未被访问的条目会被删除，None 表示不限制
+    """
+    from . import maintenance
+    maintenance.set_quota(max_bytes, max_age_days)
+
+def set_stale_while_revalidate(enabled=True, max_stale_minutes=1440):
+    """设置缓存过期后是否先返回旧数据、再在后台刷新。
+
+    开启后，缓存过期不超过 max_stale_minutes 分钟的请求立即返回旧数据
+    （DataFrame.attrs['stale'] 为 True），同时在后台以低优先级刷新；
+    过期更久的请求和 force_refresh 请求仍然阻塞等待上游数据。
+    各接口函数的 stale_while_revalidate 参数可以单独覆盖这里的设置。
+
+    参数:
+        enabled (bool): 是否开启
+        max_stale_minutes (int): 超过 TTL 后最多提供旧数据的分钟数
+    """
+    global _stale_while_revalidate, _max_stale_minutes
+    if max_stale_minutes < 0:
+        raise ValueError("max_stale_minutes 不能为负数")
+    _stale_while_revalidate = enabled
+    _max_stale_minutes = max_stale_minutes
 
 def _get_pro_api():
-    """获取 Tushare Pro API 实例。"""
-    if _pro is None:
-        raise ValueError("Tushare token 尚未设置。请先调用 set_token('your_token')。")
-    return _pro
+    """获取 Tushare Pro API 实例，首次调用时创建。"""
+    global _pro
+    with _pro_lock:
+        if _pro is None:
+            if _token is None and _provider.requires_token:
+                raise ValueError("Tushare token 尚未设置。请先调用 set_token('your_token')。")
+            _pro = _provider.pro_api(_token)
+        return _pro
+
+def _upstream(method):
+    """返回调用 Pro API 接口方法的函数，缓存命中时不会创建客户端。"""
+    def call(**kwargs):
+        return getattr(_get_pro_api(), method)(**kwargs)
+    call.__name__ = method
+    return call
+
+def _get_scheduled_api():
+    """获取经过调度器限流的 Pro API 实例，供 pro_bar 使用。
+
+    未调用 set_token 时与 ts.pro_bar 的默认行为一致，使用 tushare 本地保存的 token。
+    """
+    if _token is None and _provider.requires_token:
+        return scheduler.ScheduledApi(_provider.pro_api())
+    return scheduler.ScheduledApi(_get_pro_api())
 
 def _generate_cache_key(api_name, **kwargs):
     """根据 API 名称和参数生成唯一的缓存键。"""
@@ -42,88 +157,387 @@ def _get_cache_file_path(key):
     """获取缓存文件的完整路径。"""
     return os.path.join(_cache_dir, f"{key}.parquet")
 
-def _get_metadata_file_path(key):
-    """获取元数据文件的完整路径。"""
-    return os.path.join(_metadata_dir, f"{key}.json")
+def _get_manifest():
+    """获取缓存清单，首次使用时导入旧版本的 JSON 元数据文件。"""
+    global _legacy_metadata_imported
+    if not _legacy_metadata_imported:
+        _legacy_metadata_imported = True
+        _manifest.import_json_dir(_metadata_dir)
+    return _manifest
 
-def _is_cache_valid(key, ttl_minutes=1440, force_refresh=False): # 默认 TTL: 24 小时
-    """检查给定键的缓存是否仍然有效。"""
+def _read_metadata(key):
+    """读取缓存元数据，缓存不存在时返回 None。"""
+    return _get_manifest().get(key)
+
+def _write_cache(key, df, metadata):
+    """按接口的编码方案原子地写入缓存数据，并在清单中登记行数、大小和日期范围。"""
+    table, options = schema.to_table(df, metadata.get('api_name'))
+    signature = atomic.write_table(table, _get_cache_file_path(key), **options)
+    start_date, end_date = manifest.date_range(df)
+    metadata.update({
+        'timestamp': metadata.get('timestamp') or expiry.now().isoformat(),
+        'row_count': len(df),
+        'byte_size': signature[1],
+        'start_date': start_date,
+        'end_date': end_date,
+        'data_signature': list(signature)
+    })
+    _get_manifest().put(key, metadata)
+    return metadata
+
+def _metadata_timestamp(metadata):
+    """返回元数据中记录的缓存写入时间，缓存不存在时返回 None。"""
+    if metadata is None:
+        return None
+    return expiry.parse(metadata['timestamp'])
+
+def _get_cache_timestamp(key):
+    """读取缓存的写入时间，缓存不存在时返回 None。"""
+    return _metadata_timestamp(_read_metadata(key))
+
+def _is_metadata_valid(metadata, ttl_minutes=1440, force_refresh=False):
+    """根据已经读取的元数据检查缓存是否仍然有效，ttl_minutes 为 None 时按交易日历过期。"""
     # 如果强制刷新，则直接返回False
     if force_refresh:
         return False
     
-    metadata_path = _get_metadata_file_path(key)
-    if not os.path.exists(metadata_path):
+    timestamp = _metadata_timestamp(metadata)
+    if timestamp is None:
         return False
-    
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
-    
-    timestamp = datetime.fromisoformat(metadata['timestamp'])
-    if datetime.now() - timestamp > timedelta(minutes=ttl_minutes):
+    if expiry.now() > expiry.expires_at(timestamp, ttl_minutes):
         return False
         
     return True
 
-def _fetch_and_cache(api_name, fetch_callable, ttl_minutes, force_refresh=False, **kwargs):
-    """从可调用对象获取数据并进行缓存的通用函数。"""
+def _is_cache_valid(key, ttl_minutes=1440, force_refresh=False): # 默认 TTL: 24 小时
+    """检查给定键的缓存是否仍然有效，ttl_minutes 为 None 时按交易日历过期。"""
+    return _is_metadata_valid(_read_metadata(key), ttl_minutes, force_refresh)
+
+def _serve_stale(stale_while_revalidate, force_refresh, timestamp, ttl_minutes):
+    """判断过期的缓存能否先返回给调用方，再在后台刷新。"""
+    if stale_while_revalidate is None:
+        stale_while_revalidate = _stale_while_revalidate
+    if not stale_while_revalidate or force_refresh or timestamp is None:
+        return False
+    return expiry.now() <= expiry.expires_at(timestamp, ttl_minutes) + timedelta(minutes=_max_stale_minutes)
+
+def _mark_stale(df, timestamp):
+    """返回标记为过期数据的浅拷贝，attrs 中记录缓存写入时间。"""
+    df = df.copy(deep=False)
+    df.attrs['stale'] = True
+    df.attrs['cache_timestamp'] = timestamp.isoformat()
+    return df
+
+def _schedule_refresh(api_name, key, refresh):
+    """在后台线程中以低优先级刷新过期缓存，同一个键同时只有一个刷新任务。"""
+    global _refresh_executor
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=_refresh_workers,
+                                                   thread_name_prefix='tushare_parquet_refresh')
+
+    def run():
+        try:
+            with scheduler.priority(scheduler.BACKGROUND):
+                refresh()
+        except Exception:
+            # 刷新失败时继续提供旧数据，下一次请求会重新调度刷新
+            metrics.inc('refresh_failures_total', api=api_name)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    _refresh_executor.submit(run)
+
+def _fetch_upstream(api_name, fetch, **kwargs):
+    """调用上游并记录耗时、返回行数和错误次数。"""
+    try:
+        with metrics.timer('fetch', api_name):
+            df = fetch(**kwargs)
+    except Exception:
+        metrics.inc('upstream_errors_total', api=api_name)
+        raise
+    if df is not None:
+        metrics.inc('upstream_rows_total', len(df), api=api_name)
+    return df
+
+def _fetch_and_cache(api_name, fetch_callable, ttl_minutes, force_refresh=False,
+                     stale_while_revalidate=None, columns=None, filters=None, **kwargs):
+    """从可调用对象获取数据并进行缓存的通用函数。
+
+    缓存失效时，同一缓存键的并发请求（包括同一台机器上的其他进程）
+    只有一个会访问上游接口，其余请求等待并复用它的结果。
+    数据和元数据在持锁状态下原子发布，读取时无需加锁。
+    开启 stale-while-revalidate 时，过期不久的缓存直接返回并在后台刷新。
+    columns 和 filters 在读取缓存文件时下推到 pyarrow，只解码需要的列和行组。
+    命中情况和各环节耗时记录在 metrics 中。
+    """
     cache_key = _generate_cache_key(api_name, **kwargs)
     cache_file_path = _get_cache_file_path(cache_key)
-    metadata_file_path = _get_metadata_file_path(cache_key)
+    requested_at = expiry.now()
 
-    if _is_cache_valid(cache_key, ttl_minutes, force_refresh):
+    def load_cache(metadata, columns=None, filters=None):
+        # 数据文件与元数据不属于同一次提交时（正在写入），按未命中处理
+        if metadata is None or not atomic.is_consistent(metadata, cache_file_path):
+            return None
         try:
-            # 从缓存加载
-            return pd.read_parquet(cache_file_path)
+            # 从缓存加载（优先命中进程内内存缓存）
+            with metrics.timer('read', api_name):
+                df = memory_cache.read_parquet(cache_file_path, columns, filters)
         except Exception:
             # 从缓存加载失败，将从 API 获取
-            pass
+            return None
+        metrics.inc('served_bytes_total', metadata.get('byte_size') or 0, api=api_name)
+        return df
 
-    # 从 API 获取
-    df = fetch_callable(**kwargs)
-    
-    if df is not None and not df.empty:
-        df.to_parquet(cache_file_path)
-        metadata = {'timestamp': datetime.now().isoformat()}
-        with open(metadata_file_path, 'w') as f:
-            json.dump(metadata, f)
-            
+    # 命中路径只读取一次缓存清单，有效期判断、一致性校验和过期服务共用这份元数据
+    with metrics.timer('lookup', api_name):
+        metadata = _read_metadata(cache_key)
+        valid = _is_metadata_valid(metadata, ttl_minutes, force_refresh)
+    if valid:
+        df = load_cache(metadata, columns, filters)
+        if df is not None:
+            _get_manifest().touch(cache_key, hit=True)
+            metrics.inc('cache_requests_total', api=api_name, result='hit')
+            return df
+
+    def fetch():
+        # 持锁后再检查一次：等待期间其他进程可能已经写入了新数据，
+        # 强制刷新时只接受本次请求发起之后写入的缓存
+        current = _read_metadata(cache_key)
+        timestamp = _metadata_timestamp(current)
+        if timestamp is not None and (timestamp >= requested_at
+                                      or _is_metadata_valid(current, ttl_minutes, force_refresh)):
+            df = load_cache(current)
+            if df is not None:
+                _get_manifest().touch(cache_key, hit=True)
+                return df
+
+        # 从 API 获取（经过调度器限流和重试）
+        df = _fetch_upstream(api_name, functools.partial(scheduler.call, api_name, fetch_callable), **kwargs)
+        
+        if df is not None and not df.empty:
+            with metrics.timer('write', api_name):
+                written = _write_cache(cache_key, df, {'api_name': api_name, 'params': kwargs})
+            metrics.inc('written_bytes_total', written['byte_size'], api=api_name)
+            _get_manifest().touch(cache_key, hit=False)
+                
+        return df
+
+    timestamp = _metadata_timestamp(metadata)
+    if _serve_stale(stale_while_revalidate, force_refresh, timestamp, ttl_minutes):
+        df = load_cache(metadata, columns, filters)
+        if df is not None:
+            _get_manifest().touch(cache_key, hit=True)
+            metrics.inc('cache_requests_total', api=api_name, result='stale')
+            _schedule_refresh(api_name, cache_key, lambda: locks.single_flight(cache_key, fetch, _lock_dir))
+            return _mark_stale(df, timestamp)
+
+    metrics.inc('cache_requests_total', api=api_name, result='miss')
+    df = locks.single_flight(cache_key, fetch, _lock_dir)
+    # 合并的请求共享同一个完整结果（各自的 columns、filters 可能不同），各自筛选后返回浅拷贝
+    if isinstance(df, pd.DataFrame):
+        return query.apply(df.copy(deep=False), columns, filters)
     return df
 
-def pro_bar(ttl_minutes=1440, force_refresh=False, **kwargs):
-    """tushare.pro_bar 的缓存版本。"""
+def cached_file(api_name, **kwargs):
+    """返回接口缓存条目的数据文件路径，条目不存在或正在写入时返回 None。
+
+    kwargs 与调用接口函数时的查询参数相同（不含 ttl_minutes 等缓存参数）。
+    文件按 schema 的方案编码，可以直接发送给 tushare_parquet.wire 的客户端；
+    pro_bar 的区间合并存储保存的是整只股票的不复权数据，不通过这里返回；
+    可以使用区间合并存储的 pro_bar 请求总是返回 None，
+    即使清单中还有旧版本按完整参数缓存的条目，也不会发送与接口结果不一致的文件。
+    """
+    if api_name == 'pro_bar' and bar_store.is_storable(kwargs):
+        return None
+    key = _generate_cache_key(api_name, **kwargs)
+    path = _get_cache_file_path(key)
+    metadata = _read_metadata(key)
+    if metadata is None or not os.path.exists(path) or not atomic.is_consistent(metadata, path):
+        return None
+    return path
+
+def cache_state(api_name, ttl_minutes=None, **kwargs):
+    """返回接口缓存条目的写入时间、文件签名和过期时间，只读取缓存清单。
+
+    用于 HTTP 条件请求：条目有效时，接口函数会原样返回这份缓存，
+    调用方可以据此判断客户端持有的数据是否仍然最新，而不需要读取数据文件。
+    pro_bar 的区间合并存储要求请求窗口已经完全覆盖且尾部没有过期。
+
+    返回:
+        dict: {'timestamp': 写入时间, 'signature': 数据文件签名, 'expires_at': 过期时间}，
+              条目不存在、已经过期或需要从上游补齐时返回 None
+    """
+    if api_name == 'pro_bar' and bar_store.is_storable(kwargs):
+        freq = str(kwargs.get('freq') or 'D').upper()
+        metadata = _read_metadata(_get_bar_store_key(kwargs['ts_code'], freq))
+        if metadata is None or not metadata.get('end_fetched_at'):
+            return None
+        start, end = bar_store.normalize_window(kwargs.get('start_date'), kwargs.get('end_date'))
+        if bar_store.missing_ranges(bar_store.effective_coverage(metadata, ttl_minutes), start, end):
+            return None
+        expires_at = bar_store.tail_expires_at(metadata, ttl_minutes)
+    else:
+        metadata = _read_metadata(_generate_cache_key(api_name, **kwargs))
+        if metadata is None:
+            return None
+        expires_at = expiry.expires_at(expiry.parse(metadata['timestamp']), ttl_minutes)
+        if expiry.now() > expires_at:
+            return None
+    return {'timestamp': expiry.parse(metadata['timestamp']),
+            'signature': metadata.get('data_signature'),
+            'expires_at': expires_at}
+
+def _get_bar_store_key(ts_code, freq='D'):
+    """获取 pro_bar 区间合并存储在缓存清单中的键。"""
+    return f"bars_{bar_store.store_name(ts_code, freq)}"
+
+def _get_bar_store_path(ts_code, freq='D'):
+    """获取 pro_bar 区间合并存储的数据文件路径。"""
+    return os.path.join(_bar_dir, f"{bar_store.store_name(ts_code, freq)}.parquet")
+
+def _find_bar_gaps(metadata, start, end, ttl_minutes, force_refresh, requested_at):
+    """计算区间合并存储中需要从上游抓取的缺口。"""
+    fetched_at = metadata.get('end_fetched_at')
+    refreshed = fetched_at is not None and expiry.parse(fetched_at) >= requested_at
+    if force_refresh and not refreshed:
+        return [[start, end]] if start <= end else []
+    coverage = bar_store.effective_coverage(metadata, ttl_minutes)
+    return bar_store.missing_ranges(coverage, start, end)
+
+def _fetch_bars_incremental(ttl_minutes, force_refresh=False, stale_while_revalidate=None,
+                            columns=None, filters=None, **kwargs):
+    """
+    通过区间合并存储获取 K 线数据
+
+    每个 (ts_code, freq) 共用一份存储，保存不复权行情和复权因子，
+    只从上游抓取尚未覆盖的日期区间，请求窗口在本地切片并计算复权价格。
+    补齐缺口时持有该存储的锁，并发请求会等待并直接使用补齐后的数据。
+    开启 stale-while-revalidate 时，如果缺口只是因为尾部过期，
+    直接用已有数据返回并在后台补齐。
+    复权计算需要完整的行情列，columns 和 filters 在计算之后应用。
+    """
+    ts_code = kwargs['ts_code']
+    adj = kwargs.get('adj')
+    freq = str(kwargs.get('freq') or 'D').upper()
+    start, end = bar_store.normalize_window(kwargs.get('start_date'), kwargs.get('end_date'))
+    store_key = _get_bar_store_key(ts_code, freq)
+    data_path = _get_bar_store_path(ts_code, freq)
+    requested_at = expiry.now()
+
+    with metrics.timer('read', 'pro_bar'):
+        df, metadata = bar_store.load(_get_manifest(), store_key, data_path)
+    gaps = _find_bar_gaps(metadata, start, end, ttl_minutes, force_refresh, requested_at)
+    if not gaps:
+        _get_manifest().touch(store_key, hit=True)
+        metrics.inc('cache_requests_total', api='pro_bar', result='hit')
+        metrics.inc('served_bytes_total', metadata.get('byte_size') or 0, api='pro_bar')
+        return query.apply(adjust.derive(df, start, end, adj), columns, filters)
+
+    fetched_at = metadata.get('end_fetched_at')
+    timestamp = expiry.parse(fetched_at) if fetched_at else None
+    if (_serve_stale(stale_while_revalidate, force_refresh, timestamp, ttl_minutes)
+            and not bar_store.missing_ranges(metadata.get('coverage', []), start, end)):
+        _get_manifest().touch(store_key, hit=True)
+        metrics.inc('cache_requests_total', api='pro_bar', result='stale')
+        metrics.inc('served_bytes_total', metadata.get('byte_size') or 0, api='pro_bar')
+        _schedule_refresh('pro_bar', store_key, lambda: _fetch_bars_incremental(
+            ttl_minutes, stale_while_revalidate=False, **kwargs))
+        return _mark_stale(query.apply(adjust.derive(df, start, end, adj), columns, filters), timestamp)
+
+    metrics.inc('cache_requests_total', api='pro_bar', result='miss')
+    with locks.key_lock(store_key, _lock_dir):
+        # 持锁后重新加载，其他线程或进程可能已经补齐了缺口
+        df, metadata = bar_store.load(_get_manifest(), store_key, data_path)
+        gaps = _find_bar_gaps(metadata, start, end, ttl_minutes, force_refresh, requested_at)
+
+        coverage = metadata.get('coverage', [])
+        head = max((r[1] for r in coverage), default='')
+        for gap_start, gap_end in gaps:
+            piece = _fetch_upstream('pro_bar', bar_store.fetch_raw, api=_get_scheduled_api(), ts_code=ts_code,
+                                    freq=freq, start_date=gap_start, end_date=gap_end)
+            df = bar_store.merge(df, piece, freq)
+            coverage.append([gap_start, gap_end])
+            # 只有延伸到最新日期的抓取才刷新尾部的时间戳；
+            # 收盘后上游还没有发布最新交易日的日线时，尾部稍后重新抓取，而不是等到下一次收盘
+            if gap_end >= head:
+                latest = piece['trade_date'].max() if piece is not None and not piece.empty else None
+                metadata['end_fetched_at'] = expiry.now().isoformat()
+                metadata['end_pending'] = freq == 'D' and expiry.awaiting_publish(gap_end, latest)
+        metadata['coverage'] = bar_store.merge_ranges(coverage)
+        if gaps and df is not None and not df.empty:
+            metadata.update({'api_name': 'pro_bar',
+                             'params': {'ts_code': ts_code, 'freq': freq}})
+            with metrics.timer('write', 'pro_bar'):
+                bar_store.save(_get_manifest(), store_key, df, metadata, data_path)
+            metrics.inc('written_bytes_total', metadata['byte_size'], api='pro_bar')
+            _get_manifest().touch(store_key, hit=False)
+
+    return query.apply(adjust.derive(df, start, end, adj), columns, filters)
+
+def pro_bar(ttl_minutes=None, force_refresh=False, stale_while_revalidate=None,
+            columns=None, filters=None, **kwargs):
+    """tushare.pro_bar 的缓存版本。
+
+    ttl_minutes 默认为 None，按交易日历过期（见 expiry）：缓存在抓取之后的
+    第一个交易时段收盘时过期，周末和节假日不会重新抓取；传入分钟数时使用固定的缓存时间。
+    只包含 ts_code、start_date、end_date、adj、freq(D/W/M) 的请求使用区间合并存储，
+    同一股票的不同时间窗口和复权类型共享一份不复权行情和复权因子，
+    只增量抓取缺失的日期，复权价格在读取时本地计算；
+    其他参数组合（如 ma、factors、分钟线）按完整参数单独缓存。
+    stale_while_revalidate 为 None 时使用 set_stale_while_revalidate 的全局设置。
+    所有接口函数都支持 columns（列裁剪）和 filters（pyarrow 格式的行过滤），
+    读取缓存时下推到 pyarrow，只解码需要的列和行组。
+    """
     if 'ts_code' not in kwargs:
         raise ValueError("pro_bar 需要 ts_code 参数")
     
-    # pro_bar 是 tushare 包中的一个函数，而不是 pro_api 的方法
-    return _fetch_and_cache('pro_bar', ts.pro_bar, ttl_minutes, force_refresh, **kwargs)
+    if bar_store.is_storable(kwargs):
+        return _fetch_bars_incremental(ttl_minutes, force_refresh, stale_while_revalidate,
+                                       columns, filters, **kwargs)
+
+    # pro_bar 是 tushare 包中的一个函数，而不是 pro_api 的方法，
+    # 传入经过调度的客户端，使其内部的接口调用同样受限流控制；
+    # 客户端在真正访问上游时才创建，缓存命中时不会导入 tushare 或要求 token
+    def fetch(**kw):
+        return _provider.pro_bar(api=_get_scheduled_api(), **kw)
+    return _fetch_and_cache('pro_bar', fetch, ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
 
-def dividend(ttl_minutes=1440, force_refresh=False, **kwargs):
+def dividend(ttl_minutes=1440, force_refresh=False, stale_while_revalidate=None,
+             columns=None, filters=None, **kwargs):
     """tushare.pro.dividend 的缓存版本。"""
-    pro = _get_pro_api()
-    
     required_params = ['ts_code', 'ann_date', 'record_date', 'ex_date', 'imp_ann_date']
     if not any(param in kwargs and kwargs[param] is not None for param in required_params):
         raise ValueError(f"以下参数至少需要一个: {', '.join(required_params)}")
 
-    return _fetch_and_cache('dividend', pro.dividend, ttl_minutes, force_refresh, **kwargs)
+    return _fetch_and_cache('dividend', _upstream('dividend'), ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
 
-def income(ttl_minutes=43200, force_refresh=False, **kwargs):
+def income(ttl_minutes=43200, force_refresh=False, stale_while_revalidate=None,
+           columns=None, filters=None, **kwargs):
     """获取带缓存的利润表数据。"""
-    pro = _get_pro_api()
-    return _fetch_and_cache('income', pro.income, ttl_minutes, force_refresh, **kwargs)
+    return _fetch_and_cache('income', _upstream('income'), ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
 
-def stock_basic(ttl_minutes=43200, force_refresh=False, **kwargs):
+def stock_basic(ttl_minutes=43200, force_refresh=False, stale_while_revalidate=None,
+                columns=None, filters=None, **kwargs):
     """获取带缓存的基础信息数据。"""
-    pro = _get_pro_api()
-    return _fetch_and_cache('stock_basic', pro.stock_basic, ttl_minutes, force_refresh, **kwargs)
+    return _fetch_and_cache('stock_basic', _upstream('stock_basic'), ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
 
-def trade_cal(ttl_minutes=43200, force_refresh=False, **kwargs):
+def trade_cal(ttl_minutes=43200, force_refresh=False, stale_while_revalidate=None,
+              columns=None, filters=None, **kwargs):
     """获取带缓存的交易日历数据。"""
-    pro = _get_pro_api()
-    return _fetch_and_cache('trade_cal', pro.trade_cal, ttl_minutes, force_refresh, **kwargs)
+    return _fetch_and_cache('trade_cal', _upstream('trade_cal'), ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
 
-def fina_indicator(ttl_minutes=43200, force_refresh=False, **kwargs):
+def fina_indicator(ttl_minutes=43200, force_refresh=False, stale_while_revalidate=None,
+                   columns=None, filters=None, **kwargs):
     """获取带缓存的财务指标数据。
     
     参数:
@@ -134,24 +548,32 @@ def fina_indicator(ttl_minutes=43200, force_refresh=False, **kwargs):
         period (str, 可选): 报告期(每个季度最后一天的日期，如20171231表示年报)
         ttl_minutes (int): 缓存有效期，默认30天(43200分钟)
         force_refresh (bool): 是否强制刷新缓存，默认False
+        stale_while_revalidate (bool, 可选): 过期后是否先返回旧数据并在后台刷新，默认使用全局设置
+        columns (list, 可选): 只返回这些列，读取缓存时只解码这些列
+        filters (list, 可选): pyarrow 格式的行过滤条件，如 [('end_date', '>=', '20200101')]
         
     返回:
         pandas.DataFrame: 财务指标数据
         
     注意:
         - 需要至少2000积分才可以调取
-        - 每次请求最多返回100条记录
-        - 可通过设置日期多次请求获取更多数据
+        - 每次请求最多返回100条记录，未指定 ann_date、period 且返回满额时
+          按日期窗口自动拆分并发请求，合并后作为一个结果缓存
     """
-    pro = _get_pro_api()
-    
     # 验证必需参数
     if 'ts_code' not in kwargs:
         raise ValueError("fina_indicator 需要 ts_code 参数")
+
+    fetch = _upstream('fina_indicator')
+    if not any(kwargs.get(param) is not None for param in ('ann_date', 'period', 'offset', 'limit')):
+        fetch = functools.partial(paginate.fetch_by_window, 'fina_indicator', fetch,
+                                  FINA_INDICATOR_PAGE_SIZE)
     
-    return _fetch_and_cache('fina_indicator', pro.fina_indicator, ttl_minutes, force_refresh, **kwargs)
+    return _fetch_and_cache('fina_indicator', fetch, ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
 
-def disclosure_date(ttl_minutes=43200, force_refresh=False, **kwargs):
+def disclosure_date(ttl_minutes=43200, force_refresh=False, stale_while_revalidate=None,
+                    columns=None, filters=None, **kwargs):
     """获取带缓存的财报披露计划日期数据。
     
     参数:
@@ -161,6 +583,9 @@ def disclosure_date(ttl_minutes=43200, force_refresh=False, **kwargs):
         actual_date (str, 可选): 实际披露日期
         ttl_minutes (int): 缓存有效期，默认30天(43200分钟)
         force_refresh (bool): 是否强制刷新缓存，默认False
+        stale_while_revalidate (bool, 可选): 过期后是否先返回旧数据并在后台刷新，默认使用全局设置
+        columns (list, 可选): 只返回这些列，读取缓存时只解码这些列
+        filters (list, 可选): pyarrow 格式的行过滤条件，如 [('end_date', '>=', '20200101')]
         
     返回:
         pandas.DataFrame: 财报披露计划数据，包含以下字段：
@@ -173,7 +598,7 @@ def disclosure_date(ttl_minutes=43200, force_refresh=False, **kwargs):
         
     注意:
         - 需要至少500积分才可以调取
-        - 单次最大3000条记录，总量不限制
+        - 单次最大3000条记录，总量不限制；未指定 offset、limit 时自动分页并发请求
         - 积分越多权限越大
         
     示例:
@@ -186,6 +611,10 @@ def disclosure_date(ttl_minutes=43200, force_refresh=False, **kwargs):
         # 获取特定计划披露日期的数据
         df = disclosure_date(pre_date='20190131')
     """
-    pro = _get_pro_api()
+    fetch = _upstream('disclosure_date')
+    if kwargs.get('offset') is None and kwargs.get('limit') is None:
+        fetch = functools.partial(paginate.fetch_by_offset, 'disclosure_date', fetch,
+                                  DISCLOSURE_DATE_PAGE_SIZE)
     
-    return _fetch_and_cache('disclosure_date', pro.disclosure_date, ttl_minutes, force_refresh, **kwargs)
\ No newline at end of file
+    return _fetch_and_cache('disclosure_date', fetch, ttl_minutes, force_refresh, stale_while_revalidate,
+                            columns, filters, **kwargs)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+按交易日历计算缓存过期时间
+
+固定的 TTL 不适合行情数据：上午抓取的日线在当天收盘后就过时了，
+周五晚上抓取的日线却要到下周一收盘才会有新数据，长假期间更久。
+按交易日历过期时，行情缓存在抓取之后的第一个交易时段收盘时过期：
+周末和节假日不会重新抓取，收盘后的第一个请求就能拿到当天的数据。
+
+上游在收盘之后一段时间才发布当天的日线。收盘后不久抓取、结果中还没有最新交易日时，
+尾部只保留 PUBLISH_RETRY_MINUTES 分钟，之后重新抓取，直到数据出现或超过发布窗口
+（超过窗口仍然没有通常是停牌，按正常的交易日历过期）。
+
+交易日历来自缓存的 trade_cal（上交所，按年份读取并保存在进程内），
+某一年的日历无法获取或尚未发布时按周一至周五估计，稍后重试。
+收盘时间和缓存元数据中的时间戳都按北京时间（带时区）计算和比较，与部署机器的时区无关。
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# 交易所所在的时区
+TIMEZONE = ZoneInfo('Asia/Shanghai')
+
+# 收盘时间，可以通过环境变量 TUSHARE_PARQUET_CLOSE_TIME（HH:MM）调整
+CLOSE_TIME = datetime.strptime(os.getenv('TUSHARE_PARQUET_CLOSE_TIME', '15:00'), '%H:%M').time()
+# 收盘后等待上游发布当天日线的时间（分钟），可以通过环境变量 TUSHARE_PARQUET_PUBLISH_WINDOW_MINUTES 调整
+PUBLISH_WINDOW_MINUTES = int(os.getenv('TUSHARE_PARQUET_PUBLISH_WINDOW_MINUTES', 180))
+# 发布窗口内没有抓取到最新交易日时，重新抓取的间隔（分钟）
+PUBLISH_RETRY_MINUTES = 10
+# 读取交易日历使用的交易所
+EXCHANGE = 'SSE'
+# 日历获取失败时，按工作日估计的结果保留多久再重试（秒）
+FALLBACK_RETRY_SECONDS = 600
+# 向后查找下一个交易日的最大天数，超过时视为日历缺失
+MAX_CLOSED_DAYS = 60
+
+_lock = threading.Lock()
+# 年份 -> (交易日集合, 按工作日估计时的重试时间 / None)
+_calendars = {}
+
+
+def now():
+    """当前的北京时间（带时区），缓存元数据中的时间戳都用它生成。"""
+    return datetime.now(TIMEZONE)
+
+
+def parse(timestamp):
+    """解析缓存元数据中的 ISO 时间戳，没有时区的旧记录按本机时区解释，返回北京时间。"""
+    return datetime.fromisoformat(timestamp).astimezone(TIMEZONE)
+
+
+def _load_year(year):
+    """从缓存的 trade_cal 读取一年的交易日，返回 None 表示无法获取。"""
+    from . import core
+    try:
+        df = core.trade_cal(exchange=EXCHANGE, start_date=f'{year}0101', end_date=f'{year}1231',
+                            columns=['cal_date', 'is_open'])
+    except Exception:
+        return None
+    if df is None or df.empty:
+        return None
+    return set(df.loc[df['is_open'].astype(int) == 1, 'cal_date'].astype(str))
+
+
+def _open_dates(year):
+    """返回一年的交易日集合（YYYYMMDD），日历缺失时返回 None。"""
+    entry = _calendars.get(year)
+    if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+        return entry[0]
+    # 读取日历时不持有 _lock，其他年份的判断不会等待上游；
+    # 同一年份的并发读取由 trade_cal 的缓存合并为一次上游调用
+    dates = _load_year(year)
+    retry_at = time.monotonic() + FALLBACK_RETRY_SECONDS if dates is None else None
+    with _lock:
+        _calendars[year] = (dates, retry_at)
+    return dates
+
+
+def is_trading_day(day):
+    """判断日期是否为交易日，日历缺失时按周一至周五估计。"""
+    dates = _open_dates(day.year)
+    if dates is None:
+        return day.weekday() < 5
+    return day.strftime('%Y%m%d') in dates
+
+
+def next_close(after):
+    """返回 after 之后第一个交易时段的收盘时间（北京时间）。"""
+    after = after.astimezone(TIMEZONE)
+    day = after.date()
+    for _ in range(MAX_CLOSED_DAYS):
+        close = datetime.combine(day, CLOSE_TIME, tzinfo=TIMEZONE)
+        if close > after and is_trading_day(day):
+            return close
+        day += timedelta(days=1)
+    # 日历中连续很久没有交易日（通常是数据不完整），退回到一天之后过期
+    return after + timedelta(days=1)
+
+
+def last_close(before):
+    """返回 before 及之前最近一个交易时段的收盘时间（北京时间），日历中长期没有交易日时返回 None。"""
+    before = before.astimezone(TIMEZONE)
+    day = before.date()
+    for _ in range(MAX_CLOSED_DAYS):
+        close = datetime.combine(day, CLOSE_TIME, tzinfo=TIMEZONE)
+        if close <= before and is_trading_day(day):
+            return close
+        day -= timedelta(days=1)
+    return None
+
+
+def awaiting_publish(end_date, latest_date, now=None):
+    """
+    判断一次抓取是否因为上游尚未发布而缺少最新交易日的数据
+
+    参数:
+        end_date (str): 抓取窗口的结束日期（YYYYMMDD）
+        latest_date (str): 返回数据中最新的交易日，没有数据时为 None
+        now (datetime, 可选): 当前时间
+
+    返回:
+        bool: 最近一次收盘在 PUBLISH_WINDOW_MINUTES 分钟之内、抓取窗口包含该交易日
+              而返回的数据中没有它时为 True
+    """
+    now = now or datetime.now(TIMEZONE)
+    close = last_close(now)
+    if close is None or now > close + timedelta(minutes=PUBLISH_WINDOW_MINUTES):
+        return False
+    session = close.strftime('%Y%m%d')
+    return end_date >= session and (not latest_date or latest_date < session)
+
+
+def expires_at(fetched_at, ttl_minutes, pending=False):
+    """
+    计算缓存的过期时间
+
+    参数:
+        fetched_at (datetime): 缓存的抓取时间
+        ttl_minutes (int): 固定的缓存时间（分钟），None 表示按交易日历过期
+        pending (bool): 抓取时最新交易日的数据尚未发布（见 awaiting_publish），
+                        按交易日历过期时改为 PUBLISH_RETRY_MINUTES 分钟后过期
+
+    返回:
+        datetime: 过期时间，在此之前缓存有效
+    """
+    if ttl_minutes is None:
+        if pending:
+            return fetched_at + timedelta(minutes=PUBLISH_RETRY_MINUTES)
+        return next_close(fetched_at)
+    return fetched_at + timedelta(minutes=ttl_minutes)
+
+
+def clear():
+    """清空进程内的交易日历，trade_cal 缓存更新后下次判断时重新读取。"""
+    with _lock:
+        _calendars.clear()
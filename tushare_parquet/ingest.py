@@ -0,0 +1,147 @@
+"""
+按交易日的全市场日线入库
+
+daily 和 adj_factor 接口可以按 trade_date 一次返回全市场当天的数据。
+这里按 trade_cal 逐个开市日拉取全市场快照（每天两次上游调用），
+再按 ts_code 拆分写入 pro_bar 的区间合并存储（不复权行情 + 复权因子），
+之后任意复权类型的 pro_bar 读取都直接命中存储。
+每晚的增量更新从每只股票一次调用降为每个交易日两次调用。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from . import bar_store
+from . import core
+from . import expiry
+from . import locks
+from . import scheduler
+
+# 在缓存清单中记录入库进度的键
+STATE_KEY = 'ingest_daily'
+DEFAULT_MAX_WORKERS = 8
+
+
+def _fetch_snapshots(trade_days, progress=None):
+    """
+    逐日拉取全市场快照
+
+    某个交易日的数据为空时（通常是当天行情尚未发布），停止在前一个交易日。
+    返回 (bars, factors, 实际入库的交易日列表, 上游调用次数)。
+    """
+    api = core._get_scheduled_api()
+    bars, factors, ingested = [], [], []
+    calls = 0
+    for trade_date in trade_days:
+        daily = api.daily(trade_date=trade_date)
+        calls += 1
+        if daily is None or daily.empty:
+            break
+        adj_factor = api.adj_factor(trade_date=trade_date)
+        calls += 1
+        bars.append(daily)
+        if adj_factor is not None and not adj_factor.empty:
+            factors.append(adj_factor[['ts_code', 'trade_date', 'adj_factor']])
+        ingested.append(trade_date)
+        if progress is not None:
+            progress(trade_date, len(daily))
+
+    if not bars:
+        return None, None, [], calls
+    bars = pd.concat(bars, ignore_index=True)
+    factors = pd.concat(factors, ignore_index=True) if factors else None
+    return bars, factors, ingested, calls
+
+
+def _scatter(ts_code, piece, window):
+    """把一只股票的快照数据合并进它的区间合并存储。"""
+    store_key = core._get_bar_store_key(ts_code, 'D')
+    data_path = core._get_bar_store_path(ts_code, 'D')
+    with locks.key_lock(store_key, core._lock_dir):
+        df, metadata = bar_store.load(core._get_manifest(), store_key, data_path)
+        coverage = metadata.get('coverage', [])
+        head = max((r[1] for r in coverage), default='')
+
+        df = bar_store.merge(df, piece.sort_values('trade_date', ascending=False), 'D')
+
+        coverage.append(list(window))
+        metadata['coverage'] = bar_store.merge_ranges(coverage)
+        if window[1] >= head:
+            # 窗口只包含已经入库的交易日，不存在尚未发布的尾部
+            metadata['end_fetched_at'] = expiry.now().isoformat()
+            metadata['end_pending'] = False
+        metadata.update({'api_name': 'pro_bar',
+                         'params': {'ts_code': ts_code, 'freq': 'D'}})
+        bar_store.save(core._get_manifest(), store_key, df, metadata, data_path)
+
+
+def last_ingested_date():
+    """返回上次入库的最后一个交易日，从未入库时返回 None。"""
+    metadata = core._read_metadata(STATE_KEY)
+    return metadata.get('last_trade_date') if metadata else None
+
+
+def ingest_daily(start_date=None, end_date=None, exchange='SSE',
+                 max_workers=DEFAULT_MAX_WORKERS, progress=None):
+    """
+    按交易日拉取全市场日线并写入各股票的 pro_bar 存储
+
+    参数:
+        start_date (str, 可选): 开始日期，默认从上次入库的下一个交易日开始
+        end_date (str, 可选): 结束日期，默认今天
+        exchange (str): 用于确定开市日的交易所日历，默认 SSE
+        max_workers (int): 拆分写入存储的并发线程数
+        progress (callable, 可选): 每拉取一个交易日调用 progress(trade_date, 行数)
+
+    返回:
+        dict: {'trade_dates': 入库的交易日列表, 'stocks': 写入的股票数,
+               'calls': daily 和 adj_factor 的上游调用次数}
+    """
+    end_date = end_date or expiry.now().strftime(bar_store.DATE_FORMAT)
+    if start_date is None:
+        last = last_ingested_date()
+        start_date = bar_store.shift_date(last, 1) if last else end_date
+    if start_date > end_date:
+        return {'trade_dates': [], 'stocks': 0, 'calls': 0}
+
+    with scheduler.priority(scheduler.BACKGROUND):
+        cal = core.trade_cal(exchange=exchange, start_date=start_date, end_date=end_date,
+                             ttl_minutes=60)
+        if cal is None or cal.empty:
+            return {'trade_dates': [], 'stocks': 0, 'calls': 0}
+        cal = cal[cal['is_open'].astype(int) == 1].sort_values('cal_date')
+        trade_days = cal['cal_date'].astype(str).tolist()
+        bars, factors, ingested, calls = _fetch_snapshots(trade_days, progress)
+
+    if not ingested:
+        return {'trade_dates': [], 'stocks': 0, 'calls': calls}
+
+    # 覆盖区间从第一个入库日的前一个开市日之后开始，包含中间的休市日
+    pretrade = cal.set_index('cal_date')['pretrade_date'] if 'pretrade_date' in cal.columns else None
+    first = ingested[0]
+    if pretrade is not None and pd.notna(pretrade.get(first)):
+        window_start = bar_store.shift_date(str(pretrade[first]), 1)
+    else:
+        window_start = first
+    window = (min(window_start, start_date), ingested[-1])
+
+    if factors is not None:
+        bars = bars.merge(factors, on=['ts_code', 'trade_date'], how='left')
+    else:
+        bars['adj_factor'] = float('nan')
+
+    pieces = [(ts_code, piece.reset_index(drop=True))
+              for ts_code, piece in bars.groupby('ts_code', sort=False)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda item: _scatter(item[0], item[1], window), pieces))
+
+    core._get_manifest().put(STATE_KEY, {
+        'api_name': 'ingest',
+        'timestamp': expiry.now().isoformat(),
+        'row_count': len(bars),
+        'start_date': ingested[0],
+        'end_date': ingested[-1],
+        'last_trade_date': ingested[-1]
+    })
+    return {'trade_dates': ingested, 'stocks': bars['ts_code'].nunique(), 'calls': calls}
@@ -0,0 +1,96 @@
+"""
+缓存键级别的锁与请求合并
+
+key_lock 同时使用线程锁和文件锁（fcntl.flock），保证同一台机器上
+多个线程、多个工作进程对同一个缓存键的操作互斥。
+single_flight 在此基础上合并进程内的并发请求：同一个键只有一个调用者真正执行，
+其余调用者等待并直接拿到它的结果。
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只做进程内互斥
+    fcntl = None
+
+_registry_lock = threading.Lock()
+_thread_locks = {}
+_calls = {}
+
+
+@contextmanager
+def file_lock(path, shared=False):
+    """对 path 加咨询式文件锁，shared=True 时加共享锁。"""
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def key_lock(key, lock_dir):
+    """获取缓存键的独占锁，跨线程、跨进程生效。"""
+    with _registry_lock:
+        entry = _thread_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            with file_lock(os.path.join(lock_dir, f"{key}.lock")):
+                yield
+    finally:
+        with _registry_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _thread_locks[key]
+
+
+class _Call:
+    """一次正在进行中的调用。"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def single_flight(key, fn, lock_dir):
+    """
+    合并同一个键上的并发调用
+
+    进程内只有第一个调用者执行 fn，其余调用者等待并共享它的结果或异常；
+    fn 在 key_lock 中执行，其他进程的同键调用会排队，
+    因此 fn 应在开头重新检查缓存，直接使用别的进程刚写入的结果。
+    """
+    with _registry_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        with key_lock(key, lock_dir):
+            call.result = fn()
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _registry_lock:
+            del _calls[key]
+        call.done.set()
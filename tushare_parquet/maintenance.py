@@ -0,0 +1,307 @@
+"""
+缓存维护
+
+缓存目录只会不断增长：每个不同的查询都会留下一个 Parquet 文件。
+这里提供按容量和闲置时间的预算做清理的维护功能：
+    - prune: 删除超过闲置期限的条目，再按最后访问时间（LRU）淘汰到容量以内；
+    - vacuum: 删除没有清单记录的孤立文件、残留的临时文件和锁文件，并压缩清单数据库；
+    - verify: 检查每个条目的数据文件是否存在、签名一致且可以读取。
+容量和期限可以通过 set_quota 或环境变量 TUSHARE_PARQUET_MAX_CACHE_MB、
+TUSHARE_PARQUET_MAX_AGE_DAYS 设置，未设置时不做限制。
+"""
+
+import os
+import threading
+import time
+from datetime import timedelta
+
+from . import atomic
+from . import core
+from . import expiry
+from . import locks
+from . import memory_cache
+
+
+def _env_number(name):
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+# 缓存总容量上限（字节）和闲置期限（天，可以是小数），None 表示不限制
+_max_mb = _env_number('TUSHARE_PARQUET_MAX_CACHE_MB')
+_max_bytes = int(_max_mb * 1024 * 1024) if _max_mb is not None else None
+_max_age_days = _env_number('TUSHARE_PARQUET_MAX_AGE_DAYS')
+
+# 残留的临时文件和锁文件超过这个时间（秒）未修改才会被清理
+STALE_FILE_SECONDS = 24 * 3600
+DEFAULT_INTERVAL_SECONDS = 3600
+
+
+def set_quota(max_bytes=None, max_age_days=None):
+    """设置缓存容量上限（字节）和闲置期限（天），None 表示不限制。"""
+    global _max_bytes, _max_age_days
+    if max_bytes is not None and max_bytes < 0:
+        raise ValueError("max_bytes 不能为负数")
+    if max_age_days is not None and max_age_days < 0:
+        raise ValueError("max_age_days 不能为负数")
+    _max_bytes = max_bytes
+    _max_age_days = max_age_days
+
+
+def get_quota():
+    """返回当前的 (容量上限, 闲置期限)。"""
+    return _max_bytes, _max_age_days
+
+
+def _data_path(entry):
+    """条目对应的数据文件路径，没有数据文件的记录（如入库进度）返回 None。"""
+    key = entry['key']
+    if entry.get('api_name') == 'ingest':
+        return None
+    if key.startswith('bars_'):
+        return os.path.join(core._bar_dir, f"{key[len('bars_'):]}.parquet")
+    return core._get_cache_file_path(key)
+
+
+def _remove_entry(entry):
+    """在缓存键的锁内删除数据文件和清单记录，返回释放的字节数。"""
+    key = entry['key']
+    path = _data_path(entry)
+    with locks.key_lock(key, core._lock_dir):
+        freed = 0
+        if path is not None:
+            try:
+                freed = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                pass
+            memory_cache.invalidate(path)
+        core._get_manifest().delete([key])
+    return freed
+
+
+def stats():
+    """
+    汇总缓存状态
+
+    返回:
+        dict: {'apis': 各接口的条目数、行数、字节数和命中率,
+               'entries', 'bytes', 'max_bytes', 'max_age_days',
+               'disk_bytes': 缓存目录实际占用的字节数（不含批量数据集）}
+    """
+    manifest = core._get_manifest()
+    apis = manifest.stats()
+    disk_bytes = 0
+    for directory in (core._cache_dir, core._bar_dir, core._lock_dir):
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            try:
+                if entry.is_file():
+                    disk_bytes += entry.stat().st_size
+            except FileNotFoundError:
+                # 统计期间被其他进程删除
+                continue
+    return {
+        'apis': apis,
+        'entries': sum(api['entries'] for api in apis.values()),
+        'bytes': sum(api['bytes'] for api in apis.values()),
+        'disk_bytes': disk_bytes,
+        'max_bytes': _max_bytes,
+        'max_age_days': _max_age_days,
+    }
+
+
+def prune(max_bytes=None, max_age_days=None, dry_run=False):
+    """
+    按闲置期限和容量上限淘汰缓存条目
+
+    先删除最后访问时间早于 max_age_days 天前的条目，
+    剩余条目总大小超过 max_bytes 时，按最后访问时间从旧到新淘汰。
+    参数为 None 时使用 set_quota 的设置。
+
+    返回:
+        dict: {'removed': 删除的条目数, 'freed_bytes': 释放的字节数, 'keys': 删除的缓存键}
+    """
+    max_bytes = _max_bytes if max_bytes is None else max_bytes
+    max_age_days = _max_age_days if max_age_days is None else max_age_days
+
+    entries = [e for e in core._get_manifest().entries(order_by='last_access')
+               if _data_path(e) is not None]
+    total = sum(e['byte_size'] or 0 for e in entries)
+    cutoff = expiry.now() - timedelta(days=max_age_days) if max_age_days is not None else None
+
+    victims = []
+    for entry in entries:
+        last_access = entry['last_access'] or entry['timestamp']
+        expired = cutoff is not None and expiry.parse(last_access) < cutoff
+        over_quota = max_bytes is not None and total > max_bytes
+        if not expired and not over_quota:
+            # 按最后访问时间升序，之后的条目都更新
+            break
+        victims.append(entry)
+        total -= entry['byte_size'] or 0
+
+    freed = sum(e['byte_size'] or 0 for e in victims)
+    if not dry_run:
+        freed = sum(_remove_entry(e) for e in victims)
+    return {'removed': len(victims), 'freed_bytes': freed, 'keys': [e['key'] for e in victims]}
+
+
+def _remove_file(path):
+    """删除文件并返回释放的字节数，文件已经被其他进程删除时返回 None。"""
+    try:
+        size = os.path.getsize(path)
+        os.remove(path)
+    except FileNotFoundError:
+        return None
+    return size
+
+
+def _is_old(path, now):
+    try:
+        return now - os.path.getmtime(path) > STALE_FILE_SECONDS
+    except OSError:
+        return False
+
+
+def _remove_stale_lock(path):
+    """删除长时间未使用且当前没有被持有的锁文件。"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def vacuum(dry_run=False, compact=True):
+    """
+    清理孤立和残留文件
+
+    删除没有清单记录的数据文件、数据文件已经不存在的清单记录、
+    超过一天的临时文件和未被持有的锁文件，compact 为 True 时再压缩清单数据库。
+    清理期间被其他进程删除的文件直接跳过。
+
+    返回:
+        dict: 各类清理的数量以及释放的字节数
+    """
+    manifest = core._get_manifest()
+    entries = manifest.entries()
+    result = {'orphan_files': 0, 'missing_entries': 0, 'tmp_files': 0, 'lock_files': 0, 'freed_bytes': 0}
+
+    known = set()
+    for entry in entries:
+        path = _data_path(entry)
+        if path is not None and not os.path.exists(path):
+            result['missing_entries'] += 1
+            if not dry_run:
+                manifest.delete([entry['key']])
+        elif path is not None:
+            known.add(path)
+
+    now = time.time()
+    for directory in (core._cache_dir, core._bar_dir):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.tmp'):
+                # 正在写入的临时文件很快会被重命名，只清理长时间残留的
+                kind = 'tmp_files'
+            elif name.endswith('.parquet') and path not in known:
+                # 写入方先发布文件再登记清单，刚写入的文件留到下一次再判断
+                kind = 'orphan_files'
+            else:
+                continue
+            if not _is_old(path, now):
+                continue
+            if not dry_run:
+                freed = _remove_file(path)
+                if freed is None:
+                    continue
+                result['freed_bytes'] += freed
+                if kind == 'orphan_files':
+                    memory_cache.invalidate(path)
+            result[kind] += 1
+
+    if os.path.isdir(core._lock_dir):
+        for name in os.listdir(core._lock_dir):
+            path = os.path.join(core._lock_dir, name)
+            if name.endswith('.lock') and _is_old(path, now):
+                if dry_run or _remove_stale_lock(path):
+                    result['lock_files'] += 1
+
+    if compact and not dry_run:
+        manifest.vacuum()
+    return result
+
+
+def verify(repair=False):
+    """
+    检查缓存条目的完整性
+
+    数据文件缺失、签名与清单不一致或无法读取 Parquet 元数据的条目视为损坏，
+    repair 为 True 时删除这些条目，下次请求会重新从上游获取。
+
+    返回:
+        dict: {'checked': 检查的条目数, 'problems': {缓存键: 问题描述}}
+    """
+    import pyarrow.parquet as pq
+
+    problems = {}
+    entries = [e for e in core._get_manifest().entries() if _data_path(e) is not None]
+    for entry in entries:
+        path = _data_path(entry)
+        if not os.path.exists(path):
+            problems[entry['key']] = '数据文件不存在'
+        elif not atomic.is_consistent(entry, path):
+            problems[entry['key']] = '数据文件签名与清单不一致'
+        else:
+            try:
+                rows = pq.ParquetFile(path).metadata.num_rows
+            except Exception as e:
+                problems[entry['key']] = f'无法读取: {e}'
+                continue
+            if entry['row_count'] is not None and rows != entry['row_count']:
+                problems[entry['key']] = f'行数不一致: 清单 {entry["row_count"]}，文件 {rows}'
+
+    if repair:
+        for entry in entries:
+            if entry['key'] in problems:
+                _remove_entry(entry)
+    return {'checked': len(entries), 'problems': problems}
+
+
+def run_once():
+    """按当前预算执行一次淘汰和轻量清理（不压缩数据库）。"""
+    return {'prune': prune(), 'vacuum': vacuum(compact=False)}
+
+
+def start_background(interval_seconds=DEFAULT_INTERVAL_SECONDS):
+    """
+    启动后台维护线程，每隔 interval_seconds 秒执行一次 run_once
+
+    多进程部署时只应在一个进程中启动，或者改用定时任务运行命令行的 cache prune / vacuum。
+
+    返回:
+        threading.Event: set() 后线程在下一次等待结束时退出
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_seconds):
+            try:
+                run_once()
+            except Exception:
+                # 维护失败不影响服务，下一轮重试
+                pass
+
+    thread = threading.Thread(target=loop, name='tushare_parquet_maintenance', daemon=True)
+    thread.start()
+    return stop
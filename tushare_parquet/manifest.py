@@ -0,0 +1,257 @@
+"""
+缓存清单
+
+用一个内嵌的 SQLite 数据库记录所有缓存条目，取代每个缓存键一个 JSON 元数据文件。
+每条记录包含接口名、原始参数、写入时间、行数、字节数、日期覆盖范围、
+最后访问时间以及命中/未命中次数，查找只需一次主键查询，
+清点、清理和命中率统计都不再需要扫描目录。
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import time
+
+from . import expiry
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    api_name TEXT,
+    params TEXT,
+    timestamp TEXT NOT NULL,
+    row_count INTEGER,
+    byte_size INTEGER,
+    start_date TEXT,
+    end_date TEXT,
+    data_signature TEXT,
+    extra TEXT,
+    last_access TEXT,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_entries_api_name ON entries (api_name);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+"""
+
+# 元数据字典中由独立列保存的字段，其余字段序列化到 extra 列
+_COLUMNS = ('api_name', 'params', 'timestamp', 'row_count', 'byte_size',
+            'start_date', 'end_date', 'data_signature', 'last_access', 'hits', 'misses')
+
+# 候选的日期列，用于记录缓存数据的日期覆盖范围
+DATE_COLUMNS = ('trade_date', 'cal_date', 'end_date', 'ann_date', 'list_date')
+
+# 访问记录批量写入的时间间隔（秒）和条数阈值
+TOUCH_FLUSH_SECONDS = 5
+TOUCH_FLUSH_SIZE = 100
+
+
+def date_range(df):
+    """从 DataFrame 的日期列中找出覆盖范围，没有日期列时返回 (None, None)。"""
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            dates = df[col].dropna().astype(str)
+            if not dates.empty:
+                return dates.min(), dates.max()
+    return None, None
+
+
+class Manifest:
+    """基于 SQLite 的缓存清单，每个线程使用独立的连接。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _connect(self):
+        """获取当前线程的连接，fork 之后的子进程会重新建立连接。"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _to_metadata(row):
+        """把数据库行转换为元数据字典。"""
+        metadata = json.loads(row['extra']) if row['extra'] else {}
+        for col in _COLUMNS:
+            metadata[col] = row[col]
+        if metadata['params']:
+            metadata['params'] = json.loads(metadata['params'])
+        if metadata['data_signature']:
+            metadata['data_signature'] = json.loads(metadata['data_signature'])
+        return metadata
+
+    def get(self, key):
+        """按缓存键查询元数据，不存在时返回 None。"""
+        row = self._connect().execute('SELECT * FROM entries WHERE key = ?', (key,)).fetchone()
+        return self._to_metadata(row) if row is not None else None
+
+    def put(self, key, metadata):
+        """
+        写入或更新一条缓存记录
+
+        metadata 中不属于固定列的字段（如 K 线存储的 coverage）保存在 extra 列中，
+        命中次数和最后访问时间在更新时保留。
+        """
+        extra = {k: v for k, v in metadata.items() if k not in _COLUMNS}
+        params = metadata.get('params')
+        signature = metadata.get('data_signature')
+        values = (
+            key,
+            metadata.get('api_name'),
+            json.dumps(params, sort_keys=True, default=str) if params is not None else None,
+            metadata['timestamp'],
+            metadata.get('row_count'),
+            metadata.get('byte_size'),
+            metadata.get('start_date'),
+            metadata.get('end_date'),
+            json.dumps(list(signature)) if signature else None,
+            json.dumps(extra, default=str) if extra else None,
+            metadata.get('last_access') or metadata['timestamp'],
+        )
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO entries (key, api_name, params, timestamp, row_count, byte_size,
+                                     start_date, end_date, data_signature, extra, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    api_name = excluded.api_name,
+                    params = excluded.params,
+                    timestamp = excluded.timestamp,
+                    row_count = excluded.row_count,
+                    byte_size = excluded.byte_size,
+                    start_date = excluded.start_date,
+                    end_date = excluded.end_date,
+                    data_signature = excluded.data_signature,
+                    extra = excluded.extra,
+                    last_access = excluded.last_access
+                """,
+                values
+            )
+
+    def delete(self, keys):
+        """删除若干条缓存记录。"""
+        conn = self._connect()
+        with conn:
+            conn.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k in keys])
+
+    def touch(self, key, hit=True):
+        """
+        记录一次访问
+
+        访问记录先在内存中累积，定期批量写入，避免每次命中都争用数据库写锁。
+        """
+        now = expiry.now().isoformat()
+        with self._pending_lock:
+            hits, misses, _ = self._pending.get(key, (0, 0, now))
+            self._pending[key] = (hits + int(hit), misses + int(not hit), now)
+            due = (len(self._pending) >= TOUCH_FLUSH_SIZE
+                   or time.monotonic() - self._last_flush >= TOUCH_FLUSH_SECONDS)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """把累积的访问记录写入数据库。"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                """
+                UPDATE entries SET hits = hits + ?, misses = misses + ?,
+                    last_access = MAX(COALESCE(last_access, ''), ?)
+                WHERE key = ?
+                """,
+                [(hits, misses, last, key) for key, (hits, misses, last) in pending.items()]
+            )
+
+    def entries(self, api_name=None, order_by='last_access'):
+        """列出缓存记录，可按接口名过滤。"""
+        if order_by not in _COLUMNS:
+            raise ValueError(f"不支持的排序字段: {order_by}")
+        self.flush()
+        sql = 'SELECT * FROM entries'
+        args = ()
+        if api_name is not None:
+            sql += ' WHERE api_name = ?'
+            args = (api_name,)
+        sql += f' ORDER BY {order_by}'
+        conn = self._connect()
+        return [dict(self._to_metadata(row), key=row['key']) for row in conn.execute(sql, args)]
+
+    def stats(self):
+        """按接口名汇总条目数、行数、字节数和命中率。"""
+        self.flush()
+        rows = self._connect().execute(
+            """
+            SELECT COALESCE(api_name, 'unknown') AS api_name, COUNT(*) AS entries,
+                   SUM(row_count) AS rows, SUM(byte_size) AS bytes,
+                   SUM(hits) AS hits, SUM(misses) AS misses
+            FROM entries GROUP BY COALESCE(api_name, 'unknown') ORDER BY api_name
+            """
+        ).fetchall()
+        result = {}
+        for row in rows:
+            lookups = (row['hits'] or 0) + (row['misses'] or 0)
+            result[row['api_name']] = {
+                'entries': row['entries'],
+                'rows': row['rows'] or 0,
+                'bytes': row['bytes'] or 0,
+                'hits': row['hits'] or 0,
+                'misses': row['misses'] or 0,
+                'hit_rate': (row['hits'] or 0) / lookups if lookups else None
+            }
+        return result
+
+    def total_bytes(self):
+        """所有缓存记录的数据文件总字节数。"""
+        row = self._connect().execute('SELECT SUM(byte_size) FROM entries').fetchone()
+        return row[0] or 0
+
+    def vacuum(self):
+        """回收已删除记录占用的空间，并把 WAL 日志合并回数据库文件。"""
+        self.flush()
+        conn = self._connect()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+
+    def is_empty(self):
+        """清单中是否还没有任何记录。"""
+        return self._connect().execute('SELECT 1 FROM entries LIMIT 1').fetchone() is None
+
+    def import_json_dir(self, directory):
+        """导入旧版本的 JSON 元数据文件，导入成功后删除原文件。"""
+        if not os.path.isdir(directory):
+            return 0
+        count = 0
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, 'r') as f:
+                    metadata = json.load(f)
+                self.put(name[:-len('.json')], metadata)
+                os.remove(path)
+                count += 1
+            except (OSError, ValueError, KeyError):
+                continue
+        return count
@@ -0,0 +1,146 @@
+"""
+进程内内存缓存
+
+作为磁盘 Parquet 缓存前面的第一级缓存，保存已经解码的 DataFrame。
+按占用字节数做 LRU 淘汰，文件的 mtime 或大小变化时自动失效。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from . import query
+from . import schema
+from .atomic import file_signature
+
+# 默认容量 256MB，可通过环境变量或 set_max_bytes 调整，0 表示关闭
+DEFAULT_MAX_BYTES = int(float(os.getenv('TUSHARE_PARQUET_MEMORY_CACHE_MB', 256)) * 1024 * 1024)
+
+
+class MemoryCache:
+    """按字节数限制容量的 LRU 缓存，以文件路径为键。"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, signature):
+        """获取缓存值，文件签名不一致时丢弃旧条目并返回 None。"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != signature:
+                self._remove(path)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path, signature, value, nbytes):
+        """写入缓存，超过容量时淘汰最久未使用的条目。"""
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(path)
+            self._entries[path] = (signature, value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, path):
+        """移除指定路径的缓存条目。"""
+        with self._lock:
+            self._remove(path)
+
+    def clear(self):
+        """清空缓存。"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def set_max_bytes(self, max_bytes):
+        """调整容量，并立即淘汰超出部分。"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self._entries and self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self):
+        """返回当前条目数、占用字节数和命中次数。"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _remove(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+
+_cache = MemoryCache()
+
+
+def set_max_bytes(max_bytes):
+    """设置内存缓存容量（字节），0 表示关闭内存缓存。"""
+    _cache.set_max_bytes(max(0, int(max_bytes)))
+
+
+def stats():
+    """返回内存缓存的统计信息。"""
+    return _cache.stats()
+
+
+def clear():
+    """清空内存缓存。"""
+    _cache.clear()
+
+
+def invalidate(path):
+    """移除某个文件的内存缓存，用于文件被删除之后。"""
+    _cache.invalidate(path)
+
+
+def preload(path, signature, df):
+    """放入已经解码的数据，signature 为数据文件的签名，用于启动时加载预热快照。"""
+    if _cache.max_bytes > 0:
+        _cache.put(path, signature, df, int(df.memory_usage(deep=True).sum()))
+
+
+def read_parquet(path, columns=None, filters=None):
+    """
+    带内存缓存的缓存文件读取，返回还原编码后的数据（见 schema.read_parquet）
+
+    返回的是浅拷贝：调用方新增或替换列不会影响缓存，
+    但不应原地修改单元格的值。
+    指定 columns 或 filters 时，内存中已有完整数据则直接筛选，
+    否则把裁剪下推到磁盘读取，部分读取的结果不放入内存缓存。
+    """
+    if columns is not None or filters:
+        df = _cache.get(path, file_signature(path)) if _cache.max_bytes > 0 else None
+        if df is not None:
+            return query.apply(df.copy(deep=False), columns, filters)
+        return query.read_parquet(path, columns, filters)
+
+    if _cache.max_bytes <= 0:
+        return schema.read_parquet(path)
+
+    signature = file_signature(path)
+    df = _cache.get(path, signature)
+    if df is None:
+        df = schema.read_parquet(path)
+        _cache.put(path, signature, df, int(df.memory_usage(deep=True).sum()))
+    return df.copy(deep=False)
+
@@ -0,0 +1,158 @@
+"""
+缓存运行指标
+
+按接口名记录缓存的命中情况和各环节的耗时，用于根据真实数据调整 TTL 和容量：
+    - 计数器：缓存请求（按结果 hit、stale、miss）、上游错误、后台刷新失败、
+      上游返回的行数、从缓存提供和写入缓存的字节数；
+    - 耗时直方图：lookup（查询清单判断缓存是否有效）、read（读取缓存数据）、
+      fetch（访问上游）、write（写入缓存）；pro_bar 的区间合并存储在 read 中一并查询清单。
+snapshot 返回 Python 字典，render 生成 Prometheus 文本格式（见 api/server.py 的 /metrics）。
+所有指标保存在进程内，多进程部署时各进程分别统计。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = 'tushare_parquet'
+
+COUNTERS = {
+    'cache_requests_total': '缓存请求次数，result 为 hit（直接命中）、stale（返回旧数据并后台刷新）或 miss（等待上游）',
+    'upstream_errors_total': '上游调用失败次数',
+    'refresh_failures_total': '后台刷新失败次数',
+    'upstream_rows_total': '上游返回的行数',
+    'served_bytes_total': '从缓存提供的数据文件字节数',
+    'written_bytes_total': '写入缓存的数据文件字节数',
+}
+
+OPERATIONS = ('lookup', 'read', 'fetch', 'write')
+# 耗时直方图的桶上界（秒）
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+def inc(name, value=1, **labels):
+    """增加计数器，labels 通常包含 api（接口名）。"""
+    if name not in COUNTERS:
+        raise ValueError(f"未知的指标: {name}")
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(op, api_name, seconds):
+    """记录一次操作的耗时，op 为 OPERATIONS 之一。"""
+    if op not in OPERATIONS:
+        raise ValueError(f"未知的操作: {op}")
+    key = (api_name, op)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+
+@contextmanager
+def timer(op, api_name):
+    """记录 with 块的耗时，块内抛出异常时同样记录。"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(op, api_name, time.perf_counter() - start)
+
+
+def reset():
+    """清空所有指标。"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """
+    返回当前指标
+
+    返回:
+        dict: {'counters': {指标名: [{'labels': {...}, 'value': 数值}]},
+               'operations': {接口名: {操作: {'count', 'sum', 'mean', 'buckets': {上界: 累计次数}}}},
+               'memory_cache': 内存缓存的条目数、字节数和命中次数}
+    """
+    from . import memory_cache
+
+    with _lock:
+        counters = {}
+        for (name, labels), value in sorted(_counters.items()):
+            counters.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        operations = {}
+        for (api_name, op), histogram in sorted(_histograms.items(), key=lambda item: item[0]):
+            operations.setdefault(api_name, {})[op] = {
+                'count': histogram['count'],
+                'sum': histogram['sum'],
+                'mean': histogram['sum'] / histogram['count'] if histogram['count'] else None,
+                'buckets': dict(zip(BUCKETS, histogram['buckets'])),
+            }
+    return {'counters': counters, 'operations': operations, 'memory_cache': memory_cache.stats()}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """生成 Prometheus 文本格式（text/plain; version=0.0.4）的指标。"""
+    from . import memory_cache
+
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = [(key, dict(value, buckets=list(value['buckets'])))
+                      for key, value in sorted(_histograms.items(), key=lambda item: item[0])]
+
+    lines = []
+    for name, description in COUNTERS.items():
+        full_name = f'{PREFIX}_{name}'
+        lines.append(f'# HELP {full_name} {description}')
+        lines.append(f'# TYPE {full_name} counter')
+        for (counter, labels), value in counters:
+            if counter == name:
+                lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+
+    full_name = f'{PREFIX}_operation_seconds'
+    lines.append(f'# HELP {full_name} 缓存各环节的耗时（秒），op 为 lookup、read、fetch 或 write')
+    lines.append(f'# TYPE {full_name} histogram')
+    for (api_name, op), histogram in histograms:
+        labels = [('api', api_name), ('op', op)]
+        for bound, count in zip(BUCKETS, histogram['buckets']):
+            lines.append(f'{full_name}_bucket{_format_labels(labels + [("le", bound)])} {count}')
+        lines.append(f'{full_name}_bucket{_format_labels(labels + [("le", "+Inf")])} {histogram["count"]}')
+        lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(histogram["sum"])}')
+        lines.append(f'{full_name}_count{_format_labels(labels)} {histogram["count"]}')
+
+    memory = memory_cache.stats()
+    for name, kind, description in (('entries', 'gauge', '内存缓存的条目数'),
+                                    ('bytes', 'gauge', '内存缓存占用的字节数'),
+                                    ('max_bytes', 'gauge', '内存缓存的容量'),
+                                    ('hits', 'counter', '内存缓存命中次数'),
+                                    ('misses', 'counter', '内存缓存未命中次数')):
+        full_name = f'{PREFIX}_memory_cache_{name}' + ('_total' if kind == 'counter' else '')
+        lines.append(f'# HELP {full_name} {description}')
+        lines.append(f'# TYPE {full_name} {kind}')
+        lines.append(f'{full_name} {memory[name]}')
+    return '\n'.join(lines) + '\n'
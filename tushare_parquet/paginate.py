@@ -0,0 +1,177 @@
+"""
+单次返回行数受限接口的自动分页
+
+fina_indicator 每次最多返回 100 条，disclosure_date 每次最多返回 3000 条，
+超出部分会被上游直接截断。这里把一次请求拆成多个分块并发拉取，
+去重后合并为一个结果，交给 _fetch_and_cache 作为整体缓存：
+    - 按日期窗口拆分：用于有日期范围参数的接口，整个窗口返回满额时才按年拆分，
+      仍然满额的分块继续对半拆分，拆到单日仍然满额时抛出 RuntimeError，不缓存被截断的结果；
+    - 按 offset/limit 分页：用于无法按日期拆分的查询（如全市场单个报告期）。
+
+调用本模块的函数本身已经在调度器中占用了一次配额，
+因此第一次请求直接调用上游接口，其余分块各自经过调度器限流。
+限流重试只在外层的 scheduler.call 进行：分块只排队等待配额、调用一次，
+遇到限流错误时整个请求由外层退避后重试，而不是分块和外层各自重试。
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from . import bar_store
+from . import expiry
+from . import scheduler
+
+DEFAULT_MAX_WORKERS = 4
+# 按日期窗口拆分时每个分块的年数
+WINDOW_YEARS = 5
+
+
+def _is_full(df, page_size):
+    """返回的行数达到上限时，说明结果可能被截断。"""
+    return df is not None and len(df) >= page_size
+
+
+def _combine(frames):
+    """合并各分块并去掉重复行，全部为空时返回第一个分块的结果。"""
+    frames = [df for df in frames if df is not None]
+    if not frames:
+        return None
+    non_empty = [df for df in frames if not df.empty]
+    if not non_empty:
+        return frames[0]
+    return pd.concat(non_empty, ignore_index=True).drop_duplicates(ignore_index=True)
+
+
+def _map_scheduled(api_name, fetch, calls, max_workers):
+    """并发执行多个分块，每个分块按调用方的优先级等待配额，不单独重试。"""
+    if not calls:
+        return []
+    context = contextvars.copy_context()
+
+    def call(kwargs):
+        scheduler.acquire(api_name)
+        return fetch(**kwargs)
+
+    def run(kwargs):
+        return context.copy().run(call, kwargs)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+        return list(executor.map(run, calls))
+
+
+def _split_window(start, end, years=WINDOW_YEARS):
+    """把 [start, end] 按年数切成连续的分块，最新的分块在前。"""
+    chunks = []
+    chunk_end = end
+    while chunk_end >= start:
+        chunk_start = max(start, str(int(chunk_end[:4]) - years + 1) + '0101')
+        chunks.append((chunk_start, chunk_end))
+        chunk_end = bar_store.shift_date(chunk_start, -1)
+    return chunks
+
+
+def _truncated(api_name, start, end):
+    """无法再拆分的分块仍然满额时抛出的异常。"""
+    return RuntimeError(f"{api_name} 在 {start}~{end} 的结果已达到单次返回上限且无法再拆分，数据可能被截断")
+
+
+def _halve(start, end):
+    """把日期窗口对半拆成两个分块，无法再拆时返回 None。"""
+    first = datetime.strptime(start, bar_store.DATE_FORMAT)
+    last = datetime.strptime(end, bar_store.DATE_FORMAT)
+    if first >= last:
+        return None
+    middle = (first + (last - first) / 2).strftime(bar_store.DATE_FORMAT)
+    return [(bar_store.shift_date(middle, 1), end), (start, middle)]
+
+
+def fetch_by_window(api_name, fetch, page_size, max_workers=DEFAULT_MAX_WORKERS, **kwargs):
+    """
+    按 start_date/end_date 日期窗口拆分拉取
+
+    先按原始参数调用一次，结果未满额时直接返回，与不分页时的调用次数相同。
+    满额时才把窗口（未指定 start_date 时从最早的交易日开始，未指定 end_date 时到今天为止）
+    按年切成分块并发拉取，仍然满额的分块继续对半拆分直到不再截断。
+    单日的分块仍然满额时抛出 RuntimeError。
+
+    参数:
+        api_name (str): 接口名，用于调度限流
+        fetch (callable): 上游接口方法
+        page_size (int): 接口单次返回的行数上限
+        max_workers (int): 并发拉取的线程数
+        **kwargs: 传给上游接口的参数
+
+    返回:
+        pandas.DataFrame: 去重合并后的结果，按分块从新到旧排列
+    """
+    # 第一次调用在外层调度的配额内直接进行
+    first = fetch(**kwargs)
+    if not _is_full(first, page_size):
+        return first
+
+    start = kwargs.pop('start_date', None) or bar_store.EARLIEST_DATE
+    end = kwargs.pop('end_date', None) or expiry.now().strftime(bar_store.DATE_FORMAT)
+    chunks = _split_window(start, end)
+    if len(chunks) == 1:
+        chunks = _halve(start, end)
+        if not chunks:
+            raise _truncated(api_name, start, end)
+    results = {}
+    pending = list(chunks)
+
+    while pending:
+        frames = _map_scheduled(api_name, fetch,
+                                [dict(kwargs, start_date=s, end_date=e) for s, e in pending],
+                                max_workers)
+        retry = []
+        for chunk, df in zip(pending, frames):
+            if not _is_full(df, page_size):
+                results[chunk] = df
+                continue
+            halves = _halve(*chunk)
+            if not halves:
+                raise _truncated(api_name, *chunk)
+            retry.extend(halves)
+            chunks[chunks.index(chunk):chunks.index(chunk) + 1] = halves
+        pending = retry
+
+    return _combine([results.get(chunk) for chunk in chunks])
+
+
+def fetch_by_offset(api_name, fetch, page_size, max_workers=DEFAULT_MAX_WORKERS, **kwargs):
+    """
+    按 offset/limit 分页拉取
+
+    第一页未满时直接返回；否则每轮并发拉取 max_workers 页，
+    直到出现未满的一页为止。
+
+    参数:
+        api_name (str): 接口名，用于调度限流
+        fetch (callable): 上游接口方法，需要支持 offset 和 limit 参数
+        page_size (int): 接口单次返回的行数上限
+        max_workers (int): 并发拉取的线程数
+        **kwargs: 传给上游接口的参数
+
+    返回:
+        pandas.DataFrame: 去重合并后的结果，保持上游的返回顺序
+    """
+    # 第一页在外层调度的配额内直接调用
+    first = fetch(offset=0, limit=page_size, **kwargs)
+    if not _is_full(first, page_size):
+        return first
+
+    frames = [first]
+    offset = page_size
+    while True:
+        offsets = [offset + i * page_size for i in range(max_workers)]
+        pages = _map_scheduled(api_name, fetch,
+                               [dict(kwargs, offset=o, limit=page_size) for o in offsets],
+                               max_workers)
+        frames.extend(pages)
+        if not all(_is_full(page, page_size) for page in pages):
+            break
+        offset += max_workers * page_size
+    return _combine(frames)
@@ -0,0 +1,236 @@
+"""
+上游数据源
+
+core 通过数据源获取 pro_api 客户端和 pro_bar，而不是直接调用 tushare：
+    - TushareProvider：默认数据源，访问 Tushare Pro；
+    - ReplayProvider：离线数据源，返回录制的数据或合成数据（见 synthetic），
+      可以模拟上游的延迟和每分钟调用上限，用于压测、基准测试和 CI；
+    - RecordingProvider：包装另一个数据源，把每次接口调用的结果录制到目录，
+      之后由 ReplayProvider 按相同的参数回放。
+通过 tushare_parquet.set_provider 切换，或用环境变量配置（见 from_env）。
+"""
+
+import functools
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import pandas as pd
+
+from . import atomic
+from . import synthetic
+
+
+class Provider:
+    """
+    数据源接口
+
+    pro_api 返回与 tushare.pro_api() 相同形式的客户端：每个接口是一个接受查询参数、
+    返回 DataFrame 的方法。pro_bar 默认用 tushare.pro_bar 在客户端之上组合行情和复权因子。
+    """
+
+    # 是否需要 Tushare token 才能创建客户端
+    requires_token = True
+
+    def pro_api(self, token=None):
+        raise NotImplementedError
+
+    def pro_bar(self, api=None, **kwargs):
+        import tushare as ts
+        return ts.pro_bar(api=api if api is not None else self.pro_api(), **kwargs)
+
+
+class TushareProvider(Provider):
+    """访问 Tushare Pro 的默认数据源。"""
+
+    def pro_api(self, token=None):
+        """token 为 None 时使用 tushare 本地保存的 token。"""
+        import tushare as ts
+        return ts.pro_api(token) if token is not None else ts.pro_api()
+
+
+class ReplayThrottleError(Exception):
+    """回放数据源模拟的限流错误，错误信息与 Tushare 一致，会被调度器识别并退避重试。"""
+
+
+def _normalize(kwargs):
+    """去掉值为 None 的参数，与省略参数等价。"""
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def record_path(directory, api_name, kwargs):
+    """录制文件的路径：<directory>/<api_name>/<参数哈希>.parquet。"""
+    hasher = hashlib.md5()
+    for key, value in sorted(_normalize(kwargs).items()):
+        hasher.update(str(key).encode('utf-8'))
+        hasher.update(str(value).encode('utf-8'))
+    return os.path.join(directory, api_name, f"{hasher.hexdigest()}.parquet")
+
+
+class _ReplayApi:
+    """回放数据源的 pro_api 客户端。"""
+
+    def __init__(self, provider):
+        self._provider = provider
+
+    def query(self, api_name, **kwargs):
+        return self._provider.call(api_name, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return functools.partial(self._provider.call, name)
+
+
+class ReplayProvider(Provider):
+    """
+    离线回放数据源
+
+    每次调用先按参数查找录制的数据，找不到时生成合成数据（synthetic=True），
+    两者都没有时抛出 LookupError。
+
+    参数:
+        directory (str, 可选): RecordingProvider 录制的目录
+        synthetic (bool): 没有录制数据时是否生成合成数据
+        stock_count (int): 合成股票池的大小
+        latency (float): 每次调用的固定延迟（秒）
+        jitter (float): 在固定延迟之上附加 [0, jitter) 秒的随机延迟
+        calls_per_minute (int 或 dict, 可选): 每分钟调用上限，超过时抛出 ReplayThrottleError；
+            dict 按接口名设置，None 表示不限制
+    """
+
+    requires_token = False
+
+    def __init__(self, directory=None, synthetic=True, stock_count=synthetic.DEFAULT_STOCK_COUNT,
+                 latency=0.0, jitter=0.0, calls_per_minute=None):
+        self.directory = directory
+        self.synthetic = synthetic
+        self.stock_count = stock_count
+        self.latency = latency
+        self.jitter = jitter
+        self.calls_per_minute = calls_per_minute
+        self._lock = threading.Lock()
+        self._history = {}
+        self.calls = Counter()
+        self.throttled = Counter()
+
+    def pro_api(self, token=None):
+        return _ReplayApi(self)
+
+    def _limit(self, api_name):
+        if isinstance(self.calls_per_minute, dict):
+            return self.calls_per_minute.get(api_name)
+        return self.calls_per_minute
+
+    def _throttle(self, api_name):
+        """按 60 秒滑动窗口检查调用上限，被拒绝的调用不计入窗口。"""
+        limit = self._limit(api_name)
+        with self._lock:
+            if limit is not None:
+                history = self._history.setdefault(api_name, deque())
+                now = time.monotonic()
+                while history and now - history[0] >= 60:
+                    history.popleft()
+                if len(history) >= limit:
+                    self.throttled[api_name] += 1
+                    raise ReplayThrottleError(f"抱歉，您每分钟最多访问该接口{limit}次")
+                history.append(now)
+            self.calls[api_name] += 1
+
+    def _load(self, api_name, kwargs):
+        if self.directory:
+            path = record_path(self.directory, api_name, kwargs)
+            if os.path.exists(path):
+                return pd.read_parquet(path)
+        if not self.synthetic:
+            raise LookupError(f"没有录制的数据: {api_name} {kwargs}")
+        fields = kwargs.pop('fields', None)
+        df = synthetic.generate(api_name, self.stock_count, **kwargs)
+        if fields:
+            df = df[[c for c in fields.split(',') if c in df.columns]]
+        return df
+
+    def call(self, api_name, **kwargs):
+        """模拟一次上游接口调用。"""
+        kwargs = _normalize(kwargs)
+        self._throttle(api_name)
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        return self._load(api_name, kwargs)
+
+    def stats(self):
+        """返回各接口的调用次数和被限流次数。"""
+        with self._lock:
+            return {'calls': dict(self.calls), 'throttled': dict(self.throttled)}
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls.clear()
+            self.throttled.clear()
+            self._history.clear()
+
+
+class _RecordingApi:
+    """把每次接口调用的结果写入录制目录的 pro_api 客户端代理。"""
+
+    def __init__(self, api, directory):
+        self._api = api
+        self._directory = directory
+
+    def __getattr__(self, name):
+        method = getattr(self._api, name)
+        if not callable(method):
+            return method
+
+        def recorded(**kwargs):
+            df = method(**kwargs)
+            if isinstance(df, pd.DataFrame):
+                atomic.write_parquet(df, record_path(self._directory, name, kwargs))
+            return df
+        return recorded
+
+
+class RecordingProvider(Provider):
+    """包装另一个数据源，录制每次接口调用的结果。"""
+
+    def __init__(self, provider, directory):
+        self.provider = provider
+        self.directory = directory
+        self.requires_token = provider.requires_token
+
+    def pro_api(self, token=None):
+        return _RecordingApi(self.provider.pro_api(token), self.directory)
+
+
+def from_env():
+    """
+    按环境变量创建数据源
+
+    TUSHARE_PARQUET_PROVIDER: tushare（默认）、replay 或 record
+    TUSHARE_PARQUET_REPLAY_DIR: 录制目录，record 模式必须设置
+    TUSHARE_PARQUET_REPLAY_LATENCY_MS、TUSHARE_PARQUET_REPLAY_JITTER_MS: 回放的模拟延迟
+    TUSHARE_PARQUET_REPLAY_CALLS_PER_MINUTE: 回放的每分钟调用上限
+    TUSHARE_PARQUET_REPLAY_STOCKS: 合成股票池的大小
+    """
+    name = os.getenv('TUSHARE_PARQUET_PROVIDER', 'tushare').lower()
+    directory = os.getenv('TUSHARE_PARQUET_REPLAY_DIR') or None
+    if name == 'tushare':
+        return TushareProvider()
+    if name == 'replay':
+        calls_per_minute = os.getenv('TUSHARE_PARQUET_REPLAY_CALLS_PER_MINUTE')
+        return ReplayProvider(
+            directory=directory,
+            stock_count=int(os.getenv('TUSHARE_PARQUET_REPLAY_STOCKS', synthetic.DEFAULT_STOCK_COUNT)),
+            latency=float(os.getenv('TUSHARE_PARQUET_REPLAY_LATENCY_MS', 0)) / 1000,
+            jitter=float(os.getenv('TUSHARE_PARQUET_REPLAY_JITTER_MS', 0)) / 1000,
+            calls_per_minute=int(calls_per_minute) if calls_per_minute else None
+        )
+    if name == 'record':
+        if directory is None:
+            raise ValueError("record 模式需要设置 TUSHARE_PARQUET_REPLAY_DIR")
+        return RecordingProvider(TushareProvider(), directory)
+    raise ValueError(f"未知的数据源: {name}")
@@ -0,0 +1,101 @@
+"""
+缓存读取时的列裁剪和行过滤
+
+columns 和 filters 的格式与 pyarrow / pd.read_parquet 一致：
+    columns: 需要的列名列表，缓存中不存在的列会被忽略
+    filters: [(列名, 运算符, 值), ...] 表示各条件同时满足，
+             [[...], [...]] 表示满足其中任意一组条件；
+             运算符支持 =、==、!=、<、<=、>、>=、in、not in
+从磁盘读取时下推到 pyarrow，只解码需要的列和行组（日期列的过滤值会转换为文件中的整数编码）；
+数据已经在内存中（内存缓存命中或刚从上游获取）时用 pandas 完成同样的筛选。
+"""
+
+import operator
+
+import pandas as pd
+
+from . import schema
+
+_OPERATORS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _normalize_filters(filters):
+    """统一为 [[(列名, 运算符, 值), ...], ...] 的析取范式，并校验运算符。"""
+    if not filters:
+        return None
+    if isinstance(filters[0], tuple):
+        filters = [filters]
+    groups = []
+    for group in filters:
+        conditions = []
+        for condition in group:
+            column, op, value = condition
+            op = op.lower()
+            if op not in _OPERATORS and op not in ('in', 'not in'):
+                raise ValueError(f"不支持的过滤运算符: {op}")
+            conditions.append((column, op, value))
+        groups.append(conditions)
+    return groups
+
+
+def _filter_columns(groups):
+    return {column for group in groups for column, _, _ in group}
+
+
+def _check_filter_columns(groups, available):
+    missing = _filter_columns(groups) - set(available)
+    if missing:
+        raise ValueError(f"过滤条件中的列不存在: {', '.join(sorted(missing))}")
+
+
+def _project(columns, available):
+    """按请求顺序保留存在的列。"""
+    available = set(available)
+    return [col for col in columns if col in available]
+
+
+def apply(df, columns=None, filters=None):
+    """在内存中对 DataFrame 做与 read_parquet 相同的行过滤和列裁剪。"""
+    if df is None or (columns is None and not filters):
+        return df
+    groups = _normalize_filters(filters)
+    if groups:
+        _check_filter_columns(groups, df.columns)
+        mask = pd.Series(False, index=df.index)
+        for group in groups:
+            group_mask = pd.Series(True, index=df.index)
+            for column, op, value in group:
+                if op == 'in':
+                    group_mask &= df[column].isin(value)
+                elif op == 'not in':
+                    group_mask &= ~df[column].isin(value)
+                else:
+                    group_mask &= _OPERATORS[op](df[column], value)
+            mask |= group_mask
+        df = df[mask].reset_index(drop=True)
+    if columns is not None:
+        df = df[_project(columns, df.columns)]
+    return df
+
+
+def read_parquet(path, columns=None, filters=None):
+    """从磁盘读取 Parquet 文件，列裁剪和行过滤下推到 pyarrow。"""
+    import pyarrow.parquet as pq
+
+    groups = _normalize_filters(filters)
+    if columns is not None or groups:
+        names = pq.read_schema(path).names
+        if groups:
+            _check_filter_columns(groups, names)
+        if columns is not None:
+            columns = _project(columns, names)
+    df = schema.read_parquet(path, columns=columns, filters=groups)
+    return df.reset_index(drop=True) if groups else df
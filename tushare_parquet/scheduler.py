@@ -0,0 +1,213 @@
+"""
+上游调用调度器
+
+所有访问 Tushare 的调用都经过这里：
+    - 每个接口一个令牌桶，按每分钟调用次数限流，任意 60 秒窗口内都不会超过限额；
+    - 排队的调用按优先级出队，交互请求优先于后台预取；
+    - 遇到限流错误时清空令牌桶并按指数退避重试。
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 优先级，数值越小越优先
+INTERACTIVE = 0
+BACKGROUND = 10
+
+# 默认每分钟调用次数（以 2000 积分档为参考，可通过 set_rate_limit 调整）
+DEFAULT_RATE_LIMIT = 200
+DEFAULT_RATE_LIMITS = {
+    'pro_bar': 500,
+    'daily': 500,
+    'weekly': 500,
+    'monthly': 500,
+    'adj_factor': 500,
+    'fina_indicator': 60,
+    'disclosure_date': 60,
+}
+
+# 限流重试参数
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Tushare 限流时返回的错误信息片段
+_THROTTLE_MESSAGES = ('每分钟最多访问', '每小时最多访问', '每天最多访问', '最多访问该接口', 'too many requests')
+
+_priority = ContextVar('tushare_parquet_priority', default=INTERACTIVE)
+
+
+def is_throttle_error(error):
+    """判断异常是否为上游限流错误。"""
+    message = str(error).lower()
+    return any(fragment.lower() in message for fragment in _THROTTLE_MESSAGES)
+
+
+@contextmanager
+def priority(level):
+    """在 with 块内以指定优先级调度上游调用，例如后台预取使用 BACKGROUND。"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    容量为限额的 1/10，补充速率为剩余的 9/10，
+    保证任意 60 秒内的调用次数不超过 per_minute。
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 10)
+        self.rate = max(per_minute - self.capacity, 1.0) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """距离下一个令牌可用还需等待的秒数。"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def drain(self):
+        """清空令牌，用于收到限流错误之后。"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class _ApiQueue:
+    """单个接口的令牌桶和按优先级排序的等待队列。"""
+
+    def __init__(self, per_minute):
+        self.bucket = TokenBucket(per_minute)
+        self.heap = []
+        self.cond = threading.Condition()
+
+    def acquire(self, level, seq):
+        entry = (level, seq)
+        with self.cond:
+            heapq.heappush(self.heap, entry)
+            while True:
+                if self.heap[0] == entry:
+                    wait = self.bucket.wait_time()
+                    if wait <= 0:
+                        self.bucket.consume()
+                        heapq.heappop(self.heap)
+                        self.cond.notify_all()
+                        return
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait()
+
+
+class Scheduler:
+    """按接口限流、按优先级排队并在限流时重试的调度器。"""
+
+    def __init__(self, default_limit=DEFAULT_RATE_LIMIT, limits=None):
+        self.default_limit = default_limit
+        self.limits = dict(DEFAULT_RATE_LIMITS if limits is None else limits)
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def set_rate_limit(self, api_name, per_minute):
+        """设置接口每分钟的调用上限，api_name 为 None 时设置默认上限。"""
+        with self._lock:
+            if api_name is None:
+                self.default_limit = per_minute
+                self._queues.clear()
+            else:
+                self.limits[api_name] = per_minute
+                self._queues.pop(api_name, None)
+
+    def _queue(self, api_name):
+        with self._lock:
+            queue = self._queues.get(api_name)
+            if queue is None:
+                queue = self._queues[api_name] = _ApiQueue(self.limits.get(api_name, self.default_limit))
+            return queue
+
+    def acquire(self, api_name):
+        """按限流和当前优先级等待一个调用配额，不调用上游、不重试。"""
+        self._queue(api_name).acquire(_priority.get(), next(self._seq))
+
+    def call(self, api_name, fn, *args, **kwargs):
+        """
+        在限流和优先级约束下调用 fn
+
+        限流错误会清空该接口的令牌桶，并按指数退避（带随机抖动）重试，
+        其他异常直接抛出。
+        """
+        queue = self._queue(api_name)
+        level = _priority.get()
+        for attempt in range(MAX_RETRIES + 1):
+            queue.acquire(level, next(self._seq))
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_throttle_error(e) or attempt == MAX_RETRIES:
+                    raise
+                with queue.cond:
+                    queue.bucket.drain()
+                delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class ScheduledApi:
+    """
+    pro_api 客户端的代理
+
+    每个接口方法的调用都经过调度器，用于传给 ts.pro_bar(api=...)，
+    使其内部对 daily、adj_factor 等接口的调用同样受限流和重试控制。
+    """
+
+    def __init__(self, api, scheduler=None):
+        self._api = api
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        method = getattr(self._api, name)
+        if not callable(method):
+            return method
+        scheduler = self._scheduler or _scheduler
+
+        def scheduled(*args, **kwargs):
+            return scheduler.call(name, method, *args, **kwargs)
+        return scheduled
+
+
+_scheduler = Scheduler()
+
+
+def call(api_name, fn, *args, **kwargs):
+    """通过全局调度器调用上游接口。"""
+    return _scheduler.call(api_name, fn, *args, **kwargs)
+
+
+def acquire(api_name):
+    """在全局调度器中等待一个调用配额，用于已经在 call 内部、由外层负责重试的调用。"""
+    _scheduler.acquire(api_name)
+
+
+def set_rate_limit(api_name, per_minute):
+    """设置全局调度器中接口每分钟的调用上限。"""
+    _scheduler.set_rate_limit(api_name, per_minute)
@@ -0,0 +1,201 @@
+"""
+缓存文件的紧凑编码
+
+Tushare 返回的数据类型比较宽松：日期是字符串，代码是 Python 字符串，数值都是 float64。
+写入缓存时按接口的编码方案转换，读取时还原，调用方拿到的值与上游返回的完全相同：
+    - 日期列（YYYYMMDD 字符串）存为 int32，读取时还原为字符串，
+      文件中的行组统计信息可以直接用于按日期过滤；
+    - ts_code、exchange、industry 等重复度高的列在文件中使用字典编码，读取后还原为 object 类型；
+    - 小数位数固定的浮点列（如两位小数的价格）在 float32 能无损还原时存为 float32，
+      读取时转回 float64 并按原小数位数舍入；
+    - 每个接口使用各自的压缩算法和行组大小。
+编码信息保存在 Parquet 文件的 key-value 元数据中，没有编码信息的旧文件按原样读取。
+"""
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+# Parquet 文件元数据中保存编码信息的键
+METADATA_KEY = b'tushare_parquet'
+
+# 按 YYYYMMDD 存储的日期列
+DATE_COLUMNS = ('trade_date', 'cal_date', 'pretrade_date', 'ann_date', 'f_ann_date', 'end_date',
+                'list_date', 'delist_date', 'record_date', 'ex_date', 'pay_date', 'div_listdate',
+                'imp_ann_date', 'base_date', 'pre_date', 'actual_date')
+
+# 字典编码的列，只有重复度足够高时才转换
+CATEGORY_COLUMNS = ('ts_code', 'exchange', 'industry', 'area', 'market', 'list_status', 'is_hs',
+                    'curr_type', 'div_proc', 'report_type', 'comp_type', 'end_type', 'update_flag')
+
+# 尝试的小数位数，float32 只有在舍入到这些位数后能还原原值时才使用
+FLOAT32_DECIMALS = (0, 1, 2, 3, 4)
+
+DEFAULT_SCHEMA = {'compression': 'zstd', 'row_group_size': None}
+
+# 各接口的压缩算法和行组大小：
+# K 线和交易日历行数多、列少，使用较大的行组；财务报表列多，较小的行组便于按日期过滤跳过
+SCHEMAS = {
+    'pro_bar': {'compression': 'zstd', 'row_group_size': 64 * 1024},
+    'trade_cal': {'compression': 'zstd', 'row_group_size': 64 * 1024},
+    'stock_basic': {'compression': 'zstd', 'row_group_size': None},
+    'income': {'compression': 'zstd', 'row_group_size': 8 * 1024},
+    'fina_indicator': {'compression': 'zstd', 'row_group_size': 8 * 1024},
+    'dividend': {'compression': 'zstd', 'row_group_size': None},
+    'disclosure_date': {'compression': 'zstd', 'row_group_size': None},
+}
+
+_DATE_PATTERN = re.compile(r'^\d{8}$')
+
+
+def get_schema(api_name):
+    """返回接口的编码方案，未登记的接口使用默认方案。"""
+    return SCHEMAS.get(api_name, DEFAULT_SCHEMA)
+
+
+def _is_date_column(values):
+    """所有非空值都是 YYYYMMDD 字符串时才按日期编码。"""
+    if values.dtype.kind not in ('O', 'U', 'T') and not pd.api.types.is_string_dtype(values):
+        return False
+    present = values.dropna()
+    if present.empty:
+        return False
+    return all(isinstance(v, str) and _DATE_PATTERN.match(v) for v in present.unique())
+
+
+def _float32_decimals(values):
+    """返回 float32 能无损还原时的小数位数，不能安全转换时返回 None。"""
+    array = values.to_numpy(dtype=np.float64)
+    finite = np.isfinite(array)
+    if not finite.any():
+        return None
+    narrowed = array.astype(np.float32).astype(np.float64)
+    for decimals in FLOAT32_DECIMALS:
+        restored = np.round(narrowed, decimals)
+        if np.array_equal(restored[finite], array[finite]) and np.array_equal(finite, np.isfinite(narrowed)):
+            return decimals
+    return None
+
+
+def encode(df):
+    """
+    把 DataFrame 转换为紧凑的类型
+
+    返回:
+        (pandas.DataFrame, dict): 转换后的数据和还原所需的编码信息
+    """
+    encoded = {}
+    info = {'dates': [], 'decimals': {}}
+    for col in df.columns:
+        values = df[col]
+        if col in DATE_COLUMNS and _is_date_column(values):
+            encoded[col] = pd.array(pd.to_numeric(values), dtype='Int32')
+            info['dates'].append(col)
+        elif col in CATEGORY_COLUMNS and not isinstance(values.dtype, pd.CategoricalDtype) \
+                and values.nunique() <= len(values) // 2:
+            encoded[col] = values.astype('category')
+        elif values.dtype == np.float64:
+            decimals = _float32_decimals(values)
+            if decimals is not None:
+                encoded[col] = values.astype(np.float32)
+                info['decimals'][col] = decimals
+    if not encoded:
+        return df, info
+    return df.assign(**encoded), info
+
+
+def to_table(df, api_name=None):
+    """编码 DataFrame 并转换为带编码信息的 Arrow 表，返回 (表, 写入参数)。"""
+    import pyarrow as pa
+    encoded, info = encode(df)
+    table = pa.Table.from_pandas(encoded)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(info).encode('utf-8')
+    schema = get_schema(api_name)
+    options = {'compression': schema['compression']}
+    if schema['row_group_size']:
+        options['row_group_size'] = schema['row_group_size']
+    return table.replace_schema_metadata(metadata), options
+
+
+def read_info(metadata):
+    """从 Arrow schema 元数据中读取编码信息，没有时返回 None。"""
+    if not metadata or METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[METADATA_KEY])
+
+
+def needs_decode(arrow_schema):
+    """文件是否使用了需要还原的编码：日期、浮点编码或字典列。"""
+    import pyarrow as pa
+    info = read_info(arrow_schema.metadata)
+    if info and (info['dates'] or info['decimals']):
+        return True
+    return any(pa.types.is_dictionary(field.type) for field in arrow_schema)
+
+
+def _decode_dates(values):
+    """把 int32 日期还原为 YYYYMMDD 字符串，空值为 None。"""
+    null = values.isna().to_numpy()
+    strings = np.empty(len(values), dtype=object)
+    strings[~null] = values[~null].astype('int64').astype(str).to_numpy()
+    strings[null] = None
+    return pd.Series(strings, index=values.index, name=values.name, dtype=object)
+
+
+def _decode_category(values):
+    """把字典编码的列还原为 object 类型，空值为 None。"""
+    return values.astype(object).where(values.notna(), None)
+
+
+def decode(df, info):
+    """按编码信息还原日期、字典编码和浮点列。"""
+    if not info:
+        return df
+    decoded = {}
+    for col in CATEGORY_COLUMNS:
+        # 无序的 category 只支持相等比较，还原后 query.apply 的范围过滤与下推到文件时一致
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            decoded[col] = _decode_category(df[col])
+    for col in info['dates']:
+        if col in df.columns:
+            decoded[col] = _decode_dates(df[col])
+    for col, decimals in info['decimals'].items():
+        if col in df.columns:
+            decoded[col] = np.round(df[col].astype(np.float64), decimals)
+    return df.assign(**decoded) if decoded else df
+
+
+def encode_filters(groups, info):
+    """把过滤条件中日期列的字符串值转换为与文件中一致的整数。"""
+    if not groups or not info or not info['dates']:
+        return groups
+    dates = set(info['dates'])
+
+    def convert(value):
+        return int(value) if isinstance(value, str) and _DATE_PATTERN.match(value) else value
+
+    result = []
+    for group in groups:
+        conditions = []
+        for column, op, value in group:
+            if column in dates:
+                if op in ('in', 'not in'):
+                    value = [convert(v) for v in value]
+                else:
+                    value = convert(value)
+            conditions.append((column, op, value))
+        result.append(conditions)
+    return result
+
+
+def read_parquet(path, columns=None, filters=None):
+    """读取缓存文件并还原编码，columns 和 filters 下推到 pyarrow。"""
+    import pyarrow.parquet as pq
+    info = read_info(pq.read_schema(path).metadata) if filters else None
+    table = pq.read_table(path, columns=columns, filters=encode_filters(filters, info) if filters else None)
+    if info is None:
+        info = read_info(table.schema.metadata)
+    return decode(table.to_pandas(), info)
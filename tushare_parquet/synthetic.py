@@ -0,0 +1,259 @@
+"""
+合成行情数据
+
+为回放数据源生成结构与 Tushare 一致的 DataFrame，用于离线压测和基准测试：
+    - 股票池固定为 stock_count 只股票，代码和基础信息由序号决定；
+    - 同一股票同一交易日的行情和复权因子只由 (ts_code, 日期) 决定，
+      与请求的日期窗口无关，区间合并存储拼接不同窗口时数据一致；
+    - 交易日为工作日，不考虑节假日；
+    - fina_indicator、disclosure_date 等接口按 ROW_LIMITS 截断，模拟上游的单次行数上限。
+"""
+
+import hashlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = '%Y%m%d'
+DEFAULT_STOCK_COUNT = 500
+# 合成数据的起始日期，早于此日期没有数据
+EARLIEST_DATE = '20000101'
+# 与上游一致的单次返回行数上限
+ROW_LIMITS = {
+    'daily': 6000,
+    'fina_indicator': 100,
+    'disclosure_date': 3000,
+}
+
+_INDUSTRIES = ('银行', '证券', '保险', '白酒', '医药', '半导体', '软件', '汽车', '电力', '地产')
+_AREAS = ('北京', '上海', '深圳', '广东', '浙江', '江苏', '四川', '山东')
+_PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'pre_close')
+
+
+def stock_codes(stock_count=DEFAULT_STOCK_COUNT):
+    """合成股票池的代码，沪市和深市各占一半。"""
+    half = (stock_count + 1) // 2
+    return ([f"{600000 + i:06d}.SH" for i in range(half)]
+            + [f"{i + 1:06d}.SZ" for i in range(stock_count - half)])
+
+
+def _seed(ts_code):
+    """由股票代码得到稳定的随机种子。"""
+    return int(hashlib.md5(ts_code.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def _noise(ordinals, seed):
+    """由日期序号和种子确定的 [0, 1) 伪随机数，与窗口无关。"""
+    x = np.sin(ordinals * 12.9898 + (seed % 10007) * 78.233) * 43758.5453
+    return x - np.floor(x)
+
+
+def _window(kwargs):
+    """解析 start_date/end_date/trade_date，返回 (开始, 结束)。"""
+    trade_date = kwargs.get('trade_date')
+    if trade_date:
+        return trade_date, trade_date
+    start = max(kwargs.get('start_date') or EARLIEST_DATE, EARLIEST_DATE)
+    end = kwargs.get('end_date') or datetime.now().strftime(DATE_FORMAT)
+    return start, end
+
+
+def _trade_days(start, end, freq='D'):
+    """区间内的交易日，周线和月线取每周、每月最后一个交易日。"""
+    if start > end:
+        return pd.DatetimeIndex([])
+    days = pd.bdate_range(start, end)
+    if freq == 'D' or days.empty:
+        return days
+    period = 'W-FRI' if freq == 'W' else 'M'
+    series = pd.Series(days, index=days)
+    return pd.DatetimeIndex(series.groupby(days.to_period(period)).max().to_numpy())
+
+
+def _codes(kwargs, stock_count):
+    """请求涉及的股票，ts_code 可以是逗号分隔的多只股票。"""
+    ts_code = kwargs.get('ts_code')
+    if ts_code:
+        return [code.strip() for code in ts_code.split(',')]
+    return stock_codes(stock_count)
+
+
+def _finish(api_name, df, kwargs):
+    """应用 offset/limit 和接口的行数上限。"""
+    offset = int(kwargs.get('offset') or 0)
+    limit = kwargs.get('limit')
+    cap = ROW_LIMITS.get(api_name)
+    if limit is not None:
+        cap = min(int(limit), cap) if cap is not None else int(limit)
+    df = df.iloc[offset:]
+    if cap is not None:
+        df = df.iloc[:cap]
+    return df.reset_index(drop=True)
+
+
+def _bars_for_code(ts_code, days):
+    """单只股票在给定交易日上的不复权行情。"""
+    seed = _seed(ts_code)
+    ordinals = np.array([d.toordinal() for d in days], dtype=np.float64)
+    base = 5 + seed % 95
+    trend = 1 + 0.3 * np.sin(ordinals / 90.0 + seed % 360)
+    close = np.round(base * trend * (1 + 0.02 * (_noise(ordinals, seed) - 0.5)), 2)
+    prev = ordinals - np.where(np.array([d.weekday() for d in days]) == 0, 3, 1)
+    prev_trend = 1 + 0.3 * np.sin(prev / 90.0 + seed % 360)
+    pre_close = np.round(base * prev_trend * (1 + 0.02 * (_noise(prev, seed) - 0.5)), 2)
+    spread = 0.01 + 0.03 * _noise(ordinals, seed + 1)
+    open_ = np.round(pre_close * (1 + (_noise(ordinals, seed + 2) - 0.5) * spread), 2)
+    high = np.round(np.maximum(open_, close) * (1 + spread / 2), 2)
+    low = np.round(np.minimum(open_, close) * (1 - spread / 2), 2)
+    vol = np.round(1e4 + 1e6 * _noise(ordinals, seed + 3), 2)
+    change = np.round(close - pre_close, 2)
+    return pd.DataFrame({
+        'ts_code': ts_code,
+        'trade_date': [d.strftime(DATE_FORMAT) for d in days],
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'pre_close': pre_close,
+        'change': change,
+        'pct_chg': np.round(change / pre_close * 100, 4),
+        'vol': vol,
+        'amount': np.round(vol * close / 10, 3),
+    })
+
+
+def _bars(api_name, kwargs, stock_count):
+    freq = {'daily': 'D', 'weekly': 'W', 'monthly': 'M'}[api_name]
+    days = _trade_days(*_window(kwargs), freq=freq)
+    frames = [_bars_for_code(code, days) for code in _codes(kwargs, stock_count)] if len(days) else []
+    if not frames:
+        return pd.DataFrame(columns=['ts_code', 'trade_date', *_PRICE_COLUMNS, 'change', 'pct_chg', 'vol', 'amount'])
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(['trade_date', 'ts_code'], ascending=[False, True])
+
+
+def _adj_factor(kwargs, stock_count):
+    days = _trade_days(*_window(kwargs))
+    frames = []
+    for code in _codes(kwargs, stock_count):
+        seed = _seed(code)
+        # 每年在固定的日子除权一次，复权因子逐级上升
+        years = np.array([d.year - 2000 + (d.dayofyear > 120 + seed % 120) for d in days])
+        frames.append(pd.DataFrame({
+            'ts_code': code,
+            'trade_date': [d.strftime(DATE_FORMAT) for d in days],
+            'adj_factor': np.round(1 + 0.05 * years, 3),
+        }))
+    if not frames or not len(days):
+        return pd.DataFrame(columns=['ts_code', 'trade_date', 'adj_factor'])
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(['trade_date', 'ts_code'], ascending=[False, True])
+
+
+def _stock_basic(kwargs, stock_count):
+    codes = stock_codes(stock_count)
+    seeds = [_seed(code) for code in codes]
+    df = pd.DataFrame({
+        'ts_code': codes,
+        'symbol': [code[:6] for code in codes],
+        'name': [f"合成{code[:6]}" for code in codes],
+        'area': [_AREAS[s % len(_AREAS)] for s in seeds],
+        'industry': [_INDUSTRIES[s % len(_INDUSTRIES)] for s in seeds],
+        'market': ['主板' for _ in codes],
+        'exchange': ['SSE' if code.endswith('.SH') else 'SZSE' for code in codes],
+        'list_status': 'L',
+        'list_date': [f"{1995 + s % 25}0{1 + s % 9}15" for s in seeds],
+        'cnspell': [f"hc{code[:6]}" for code in codes],
+    })
+    for column in ('ts_code', 'exchange', 'list_status'):
+        if kwargs.get(column):
+            df = df[df[column] == kwargs[column]]
+    return df
+
+
+def _trade_cal(kwargs):
+    start, end = _window(kwargs)
+    days = pd.date_range(start, end, freq='D')
+    is_open = (days.weekday < 5).astype(int)
+    open_days = days[is_open == 1]
+    # 每天的上一个交易日
+    positions = np.searchsorted(open_days, days, side='left') - 1
+    pretrade = [open_days[p].strftime(DATE_FORMAT) if p >= 0 else None for p in positions]
+    df = pd.DataFrame({
+        'exchange': kwargs.get('exchange') or 'SSE',
+        'cal_date': days.strftime(DATE_FORMAT),
+        'is_open': is_open,
+        'pretrade_date': pretrade,
+    }).iloc[::-1]
+    if kwargs.get('is_open') is not None:
+        df = df[df['is_open'] == int(kwargs['is_open'])]
+    return df
+
+
+def _periods(kwargs):
+    """请求覆盖的报告期（季度末），period 指定单个报告期时只返回它。"""
+    period = kwargs.get('period')
+    if period:
+        return [period]
+    start, end = _window(kwargs)
+    ends = [p.end_time.strftime(DATE_FORMAT) for p in pd.period_range(start, end, freq='Q')]
+    return [e for e in ends if start <= e <= end][::-1]
+
+
+def _reports(api_name, kwargs, stock_count):
+    if api_name == 'disclosure_date' and kwargs.get('end_date') and not kwargs.get('start_date'):
+        periods = [kwargs['end_date']]
+    else:
+        periods = _periods(kwargs)
+    rows = []
+    for code in _codes(kwargs, stock_count):
+        seed = _seed(code)
+        for period in periods:
+            ann = (datetime.strptime(period, DATE_FORMAT) + pd.Timedelta(days=20 + seed % 60))
+            ann_date = ann.strftime(DATE_FORMAT)
+            noise = _noise(np.array([float(ann.toordinal())]), seed)[0]
+            row = {'ts_code': code, 'ann_date': ann_date, 'end_date': period}
+            if api_name == 'disclosure_date':
+                row.update({'pre_date': ann_date, 'actual_date': ann_date, 'modify_date': None})
+            elif api_name == 'dividend':
+                row.update({'div_proc': '实施', 'stk_div': 0.0, 'cash_div': round(0.1 + noise, 2),
+                            'record_date': ann_date, 'ex_date': ann_date})
+            elif api_name == 'income':
+                row.update({'f_ann_date': ann_date, 'report_type': '1', 'comp_type': '1',
+                            'total_revenue': round(1e8 * (1 + noise) * (1 + seed % 100), 2),
+                            'n_income': round(1e7 * (0.5 + noise) * (1 + seed % 100), 2)})
+            else:
+                row.update({'eps': round(noise * 2, 4), 'roe': round(5 + 20 * noise, 4),
+                            'grossprofit_margin': round(10 + 50 * noise, 4),
+                            'debt_to_assets': round(20 + 60 * noise, 4)})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def generate(api_name, stock_count=DEFAULT_STOCK_COUNT, **kwargs):
+    """
+    生成接口的合成数据
+
+    参数:
+        api_name (str): 接口名，支持 daily、weekly、monthly、adj_factor、stock_basic、
+                        trade_cal、income、fina_indicator、dividend、disclosure_date
+        stock_count (int): 股票池大小
+        **kwargs: 与 Tushare 接口相同的查询参数
+
+    返回:
+        pandas.DataFrame: 合成数据，不支持的接口抛出 LookupError
+    """
+    if api_name in ('daily', 'weekly', 'monthly'):
+        df = _bars(api_name, kwargs, stock_count)
+    elif api_name == 'adj_factor':
+        df = _adj_factor(kwargs, stock_count)
+    elif api_name == 'stock_basic':
+        df = _stock_basic(kwargs, stock_count)
+    elif api_name == 'trade_cal':
+        df = _trade_cal(kwargs)
+    elif api_name in ('income', 'fina_indicator', 'dividend', 'disclosure_date'):
+        df = _reports(api_name, kwargs, stock_count)
+    else:
+        raise LookupError(f"合成数据不支持接口: {api_name}")
+    return _finish(api_name, df, kwargs)
@@ -0,0 +1,118 @@
+"""
+启动预热快照
+
+把小而常用的数据集（默认 stock_basic、trade_cal）的缓存表保存到一个 Arrow IPC 文件，
+新实例启动时 load 一次性解码放入内存缓存，第一个请求直接命中内存，不需要再读取 Parquet。
+快照中的每个条目记录了数据文件的签名，数据文件更新之后对应条目自动作废。
+快照只包含 Arrow 数据，加载时不会执行文件中的任何代码。
+API 服务默认不加载快照，设置 TUSHARE_PARQUET_WARM_SNAPSHOT=true 开启。
+"""
+
+import json
+import os
+
+from . import atomic
+from . import core
+from . import memory_cache
+from . import schema
+
+DEFAULT_APIS = ('stock_basic', 'trade_cal')
+# 快照中数据的解码后总大小上限
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_path():
+    """默认的快照路径，位于缓存目录下。"""
+    return os.path.join(core._cache_dir, 'warm.arrow')
+
+
+def _serialize(table):
+    """把一个缓存表（保留编码信息的 schema 元数据）序列化为 Arrow IPC 字节。"""
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def save(apis=DEFAULT_APIS, path=None, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    生成预热快照
+
+    按最后访问时间从新到旧收录 apis 的缓存条目，解码后的总大小不超过 max_bytes，
+    跳过数据文件与清单不一致的条目。
+    每个条目的缓存表单独序列化为 IPC 字节，和数据文件路径、签名一起作为快照表的一行。
+
+    返回:
+        dict: {'entries': 收录的条目数, 'bytes': 解码后的总字节数}
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = path or default_path()
+    rows = {'data_path': [], 'signature': [], 'table': []}
+    total = 0
+    for entry in reversed(core._get_manifest().entries(order_by='last_access')):
+        if entry.get('api_name') not in apis or entry['key'].startswith('bars_'):
+            continue
+        data_path = core._get_cache_file_path(entry['key'])
+        if not atomic.is_consistent(entry, data_path):
+            continue
+        try:
+            signature = atomic.file_signature(data_path)
+            table = pq.read_table(data_path)
+        except (OSError, ValueError):
+            continue
+        nbytes = int(schema.decode(table.to_pandas(), schema.read_info(table.schema.metadata))
+                     .memory_usage(deep=True).sum())
+        if total + nbytes > max_bytes:
+            continue
+        rows['data_path'].append(data_path)
+        rows['signature'].append(json.dumps(list(signature)))
+        rows['table'].append(_serialize(table).to_pybytes())
+        total += nbytes
+
+    snapshot = pa.table({'data_path': pa.array(rows['data_path'], pa.string()),
+                         'signature': pa.array(rows['signature'], pa.string()),
+                         'table': pa.array(rows['table'], pa.binary())})
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, snapshot.schema) as writer:
+                writer.write_table(snapshot)
+
+    atomic.atomic_write(path, write)
+    return {'entries': len(rows['data_path']), 'bytes': total}
+
+
+def load(path=None):
+    """
+    加载预热快照到内存缓存，快照不存在或无法读取时什么也不做
+
+    返回:
+        int: 放入内存缓存的条目数
+    """
+    import pyarrow as pa
+
+    path = path or default_path()
+    try:
+        with pa.memory_map(path) as source:
+            snapshot = pa.ipc.open_file(source).read_all().to_pydict()
+    except (OSError, pa.ArrowInvalid):
+        return 0
+    loaded = 0
+    for data_path, signature, data in zip(snapshot['data_path'], snapshot['signature'], snapshot['table']):
+        try:
+            current = atomic.file_signature(data_path)
+        except OSError:
+            continue
+        if list(current) != json.loads(signature):
+            continue
+        try:
+            table = pa.ipc.open_stream(data).read_all()
+        except pa.ArrowInvalid:
+            continue
+        df = schema.decode(table.to_pandas(), schema.read_info(table.schema.metadata))
+        memory_cache.preload(data_path, current, df)
+        loaded += 1
+    return loaded
@@ -0,0 +1,120 @@
+"""
+API 服务的二进制响应格式
+
+数据接口按 format 参数或 Accept 头返回二进制数据，省去 JSON 的编码和解析：
+    - arrow：Arrow IPC 流（application/vnd.apache.arrow.stream），列类型与 DataFrame 一致；
+    - parquet：Parquet 文件（application/vnd.apache.parquet），列类型同样与 DataFrame 一致
+      （日期为字符串、价格为 float64，不使用缓存文件的紧凑编码），按接口的压缩算法写入；
+      缓存文件不需要还原编码时服务端直接发送（见 is_plain_file）。
+客户端用 read_table 零拷贝地读取响应，read_frame 转换为 DataFrame 并还原编码：
+
+    from tushare_parquet import wire
+
+    df = wire.get('http://localhost:5000/api/v1/stock_data', {'ts_code': '000001.SZ'})
+"""
+
+from . import schema
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/vnd.apache.parquet'
+
+# format 参数的取值 -> MIME 类型
+FORMATS = {'arrow': ARROW_STREAM, 'parquet': PARQUET}
+# Accept 头中可以识别的 MIME 类型 -> format
+MIME_TYPES = {
+    ARROW_STREAM: 'arrow',
+    'application/vnd.apache.arrow.file': 'arrow',
+    PARQUET: 'parquet',
+    'application/x-parquet': 'parquet',
+}
+
+
+def encode(df, fmt, api_name=None):
+    """
+    把 DataFrame 编码为响应内容
+
+    参数:
+        df (pandas.DataFrame): 数据
+        fmt (str): arrow 或 parquet
+        api_name (str, 可选): 接口名，parquet 按该接口的压缩算法和行组大小写入，
+                              列类型不做紧凑编码
+
+    返回:
+        pyarrow.Buffer: 响应内容，支持缓冲区协议
+    """
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        options = schema.get_schema(api_name)
+        pq.write_table(table, sink, compression=options['compression'],
+                       row_group_size=options['row_group_size'])
+    else:
+        raise ValueError(f"不支持的格式: {fmt}")
+    return sink.getvalue()
+
+
+def is_plain_file(path):
+    """缓存文件没有需要还原的编码时返回 True，此时可以原样作为 Parquet 响应发送。"""
+    import pyarrow.parquet as pq
+    return not schema.needs_decode(pq.read_schema(path))
+
+
+def _format_of(content_type):
+    mime = (content_type or '').split(';')[0].strip().lower()
+    if mime not in MIME_TYPES:
+        raise ValueError(f"不是二进制数据响应: {content_type}")
+    return MIME_TYPES[mime]
+
+
+def read_table(data, content_type=ARROW_STREAM):
+    """
+    读取响应内容为 pyarrow.Table，列数据直接引用 data 的内存，不复制
+
+    参数:
+        data (bytes 或其他支持缓冲区协议的对象): 响应内容
+        content_type (str): 响应的 Content-Type
+    """
+    import pyarrow as pa
+    buffer = pa.py_buffer(data)
+    if _format_of(content_type) == 'arrow':
+        return pa.ipc.open_stream(buffer).read_all()
+    import pyarrow.parquet as pq
+    return pq.read_table(pa.BufferReader(buffer))
+
+
+def read_frame(data, content_type=ARROW_STREAM):
+    """读取响应内容为 DataFrame，带有编码信息的 Parquet 数据（如直接读取的缓存文件）按编码信息还原。"""
+    table = read_table(data, content_type)
+    return schema.decode(table.to_pandas(), schema.read_info(table.schema.metadata))
+
+
+def get(url, params=None, fmt='arrow', session=None, timeout=60):
+    """
+    以二进制格式请求数据接口并返回 DataFrame
+
+    参数:
+        url (str): 接口地址，如 http://localhost:5000/api/v1/stock_data
+        params (dict, 可选): 查询参数
+        fmt (str): arrow 或 parquet
+        session (requests.Session, 可选): 复用连接的会话
+        timeout (float): 超时时间（秒）
+
+    返回:
+        pandas.DataFrame: 接口没有数据时返回空 DataFrame
+    """
+    import pandas as pd
+    import requests
+    response = (session or requests).get(url, params=params, headers={'Accept': FORMATS[fmt]},
+                                         timeout=timeout)
+    content_type = response.headers.get('Content-Type', '')
+    if response.ok and content_type.startswith('application/json'):
+        # 没有数据时接口仍然返回 JSON
+        return pd.DataFrame(response.json().get('data') or [])
+    response.raise_for_status()
+    return read_frame(response.content, content_type)